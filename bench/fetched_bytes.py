@@ -0,0 +1,148 @@
+"""
+Bytes each hot endpoint reads from study_sessions for one heavy session (user-028).
+
+Seeds one witness session with 30 turns, 30 ratings, 3000 UI events and a 2000-point
+mouse trajectory, calls each endpoint once, and reports the SELECTs it issued and the
+bytes their result rows hold (each captured SELECT is re-run on a separate connection
+and its values measured). Postgres only, since that is where the deferred columns matter.
+Runs in a throwaway schema, so other rows in the database do not count.
+
+    DATABASE_URL=postgresql://... python bench/fetched_bytes.py [TREE]
+
+TREE is the checkout to measure (default: this one). To compare with the code before a
+change: git worktree add /tmp/before <commit>~1, then pass /tmp/before.
+"""
+import atexit
+import json
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime
+
+from sqlalchemy import create_engine, event, text
+
+TREE = os.path.abspath(sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), ".."))
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+if not DATABASE_URL.startswith(("postgres://", "postgresql")):
+    sys.exit("Set DATABASE_URL to a Postgres database.")
+SCHEMA = f"bench_fetched_bytes_{os.getpid()}"
+_admin = create_engine(DATABASE_URL.replace("postgres://", "postgresql://", 1))
+with _admin.begin() as conn:
+    conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+
+
+def drop_schema():
+    with _admin.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+
+
+atexit.register(drop_schema)
+os.environ["STUDY_MODE"] = "HUMAN_WITNESS"
+os.environ.pop("ADMIN_CHECK_TOKEN", None)
+os.chdir(tempfile.mkdtemp(prefix="bench-fetched-bytes-"))  # session journal / checkpoint files
+sys.path.insert(0, TREE)
+
+import database as db
+
+
+@event.listens_for(db.engine, "connect")
+def use_bench_schema(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"SET search_path TO {SCHEMA}")
+    cursor.close()
+    dbapi_connection.commit()
+
+
+db.engine.dispose()   # older trees connect at import, before the listener existed
+
+SESSION_ID = "bench-heavy-witness"
+
+
+def seed():
+    conversation = [{"turn": i, "user": "x" * 200, "assistant": "y" * 200, "timestamp": 0.0} for i in range(30)]
+    ratings = [{"turn": i, "binary_choice": "ai", "confidence": 0.5,
+                "slider_interaction_log": [{"v": j, "t": j * 10} for j in range(50)]} for i in range(30)]
+    logs = {
+        "conversation_log": conversation,
+        "interrogator_turn_judgment_log": ratings,
+        "ddm_confidence_ratings": ratings,
+        "ui_event_log": [{"event": "typing", "ts_client": 0.0, "metadata": {"k": "v" * 40}} for _ in range(3000)],
+        "mouse_trajectory": [[random.random(), random.random(), i] for i in range(2000)],
+        "tactic_selection_log": [{"t": "z" * 300}] * 30,
+        "ai_researcher_notes": [{"n": "w" * 300}] * 30,
+    }
+    values = dict(id=SESSION_ID, user_id=SESSION_ID, role="witness", study_mode="HUMAN_WITNESS",
+                  session_status="active", match_status="matched", conversation_phase_reached=True,
+                  start_time=datetime.utcnow(), initial_tactic_analysis="t" * 4000, user_profile_survey={"a": 1})
+    if isinstance(db.StudySession.__table__.c.conversation_log.type, getattr(db, "JSONLog", ())):
+        values.update(logs)
+    else:   # trees from before JSONLog store the logs as JSON text
+        values.update({key: json.dumps(value) for key, value in logs.items()})
+        values["user_profile_survey"] = json.dumps(values["user_profile_survey"])
+    if hasattr(db.StudySession, "turn_count"):
+        values.update(turn_count=30, rating_count=30)
+    db.Base.metadata.create_all(db.engine)
+    session = db.SessionLocal()
+    session.add(db.StudySession(**values))
+    session.commit()
+    session.close()
+
+
+seed()
+
+import main
+from fastapi.testclient import TestClient
+
+captured = []
+
+
+@event.listens_for(db.engine, "after_cursor_execute")
+def capture_select(conn, cursor, statement, parameters, context, executemany):
+    if statement.lstrip().upper().startswith("SELECT"):
+        captured.append((statement, parameters))
+
+
+def fetched_bytes():
+    raw = db.engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        total = 0
+        for statement, parameters in captured:
+            cursor.execute(statement, parameters)
+            for row in cursor.fetchall():
+                for value in row:
+                    if isinstance(value, (dict, list)):
+                        total += len(json.dumps(value))
+                    elif value is not None:
+                        total += len(str(value))
+        raw.rollback()
+        return total
+    finally:
+        raw.close()
+
+
+def measure(label, call):
+    captured.clear()
+    call()
+    selects = len(captured)
+    print(f"{label:36s} {selects:3d} selects {fetched_bytes():>12,d} bytes")
+
+
+with TestClient(main.app) as client:
+    if hasattr(main, "startup_complete"):   # trees with the background startup
+        main.startup_complete.wait(30)
+    client.get("/check_match_status", params={"session_id": SESSION_ID})   # recovers it into memory
+    measure("check_match_status (poll)", lambda: client.get("/check_match_status", params={"session_id": SESSION_ID}))
+    measure("check_session_status", lambda: client.get("/check_session_status", params={"session_id": SESSION_ID}))
+    measure("get_or_assign_role (reload guard)",
+            lambda: client.post("/get_or_assign_role", json={"participant_id": SESSION_ID}))
+    measure("study_status_ping", lambda: client.get("/study_status_ping"))
+    measure("final_response_integrity_check", lambda: client.get("/final_response_integrity_check"))
+    measure("submit_witness_final_choice",
+            lambda: client.post("/submit_witness_final_choice", json={
+        "session_id": SESSION_ID, "partner_belief": "human", "binary_choice": "human"}))   # field name varies by tree
+    measure("record_timeout", lambda: client.post("/record_timeout", json={
+        "participant_id": SESSION_ID, "session_id": SESSION_ID, "timeout_screen": "feedback"}))
+drop_schema()
+os._exit(0)   # skip the background workers' shutdown
@@ -0,0 +1,72 @@
+"""
+Microbenchmark of json_codec against the stdlib paths it replaced (user-049).
+
+A 30-turn AI-witness session (conversation_log with per-turn timing traces, plus the
+per-turn judgments) is encoded as a DB column, decoded, and rendered as a response, and
+a poll-sized body is rendered, each with the old path (json / starlette JSONResponse) and
+with the codec. Best of 7 repeats, per call. --no-orjson measures the stdlib fallback.
+
+    python bench/json_codec_micro.py [--no-orjson]
+"""
+import json
+import os
+import random
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if "--no-orjson" in sys.argv:
+    sys.modules["orjson"] = None   # makes `import orjson` raise ImportError
+
+import json_codec
+from starlette.responses import JSONResponse
+
+CALLS = 300
+WORDS = "hey yeah lol i think so honestly not sure what about you haha weekend coffee work".split()
+random.seed(1)
+
+
+def words(n):
+    return " ".join(random.choice(WORDS) for _ in range(n))
+
+
+def gemini_call(call):
+    return {"call": call, "model": "gemini-pro", "model_role": "primary", "outcome": "ok",
+            "offset_seconds": 0.1, "queue_wait_seconds": 0.0002, "seconds": 0.9}
+
+
+conversation, judgments = [], []
+for turn in range(1, 31):
+    conversation.append({
+        "turn": turn, "user": words(18), "assistant": words(25), "timestamp": datetime.utcnow().isoformat(),
+        "tactic": "be casual", "tactic_justification": words(20),
+        "timing": {
+            "api_call_time_seconds": random.random() * 3, "target_visible_response_time_seconds": 7.2,
+            "sleep_duration_seconds": 4.1, "network_delay_seconds": 0.3, "send_attempts": 1,
+            "trace": {"tactic_selection_seconds": 0.9, "response_generation_seconds": 1.8,
+                      "answered_by": {"model": "gemini-pro", "model_role": "primary"},
+                      "gemini_calls": [gemini_call("tactic"), gemini_call("response")]},
+        },
+    })
+    judgments.append({"turn": turn, "binary_choice": random.choice(("ai", "human")), "confidence": random.random(),
+                      "confidence_percent": 55, "decision_time_seconds": 2.3,
+                      "timestamp": datetime.utcnow().isoformat()})
+payload = {"session_id": "bench", "conversation_log": conversation, "per_turn_judgments": judgments}
+poll = {"new_message": False, "partner_dropped": False, "study_completed": False, "messages": []}
+stored = json.dumps(conversation)
+
+
+def per_call_us(fn):
+    return min(timeit.repeat(fn, number=CALLS, repeat=7)) / CALLS * 1e6
+
+
+print(f"backend={json_codec.BACKEND}, session payload {len(json.dumps(payload)) / 1024:.1f} KiB")
+for label, old, new in (
+    ("conversation_log column encode", lambda: json.dumps(conversation), lambda: json_codec.dumps(conversation)),
+    ("conversation_log column decode", lambda: json.loads(stored), lambda: json_codec.loads(stored)),
+    ("session response render", lambda: JSONResponse(payload).body, lambda: json_codec.FastJSONResponse(payload).body),
+    ("poll response render", lambda: JSONResponse(poll).body, lambda: json_codec.FastJSONResponse(poll).body),
+):
+    print(f"  {label:32s} old {per_call_us(old):7.1f}us   codec {per_call_us(new):7.1f}us")
+assert json.loads(json_codec.dumps(payload)) == json.loads(json.dumps(payload))
@@ -0,0 +1,50 @@
+"""
+TCP proxy to Postgres that delays every chunk by a fixed time, to model network latency
+between the app and the database (role_burst.py).
+
+    python bench/pg_delay_proxy.py 0.001 --upstream /tmp/pgdata/.s.PGSQL.5432 --port 15432
+    DATABASE_URL=postgresql://postgres@127.0.0.1:15432/postgres python bench/role_burst.py
+
+The upstream is a unix socket path or host:port.
+"""
+import argparse
+import asyncio
+
+
+async def pipe(reader, writer, delay):
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            await asyncio.sleep(delay)
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(args):
+    async def handle(client_reader, client_writer):
+        if ":" in args.upstream:
+            host, port = args.upstream.rsplit(":", 1)
+            server_reader, server_writer = await asyncio.open_connection(host, int(port))
+        else:
+            server_reader, server_writer = await asyncio.open_unix_connection(args.upstream)
+        await asyncio.gather(pipe(client_reader, server_writer, args.delay),
+                             pipe(server_reader, client_writer, args.delay))
+
+    server = await asyncio.start_server(handle, "127.0.0.1", args.port)
+    print(f"Delaying each hop by {args.delay * 1000:g}ms: 127.0.0.1:{args.port} -> {args.upstream}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("delay", type=float, help="seconds added to each chunk, each direction")
+    parser.add_argument("--upstream", default="/var/run/postgresql/.s.PGSQL.5432")
+    parser.add_argument("--port", type=int, default=15432)
+    asyncio.run(serve(parser.parse_args()))
@@ -0,0 +1,67 @@
+"""
+Per-request cost of a /check_partner_message poll through the app's full middleware
+stack (user-048).
+
+Drives the ASGI app in-process (httpx.ASGITransport, no sockets) with TOTAL polls at
+CONCURRENCY, ROUNDS times, and prints the median and best per-request time. The poll
+is answered from memory, so the number is mostly middleware and routing overhead.
+
+    python bench/poll_middleware.py [TREE] [TOTAL=2000] [CONCURRENCY=1] [ROUNDS=5]
+
+TREE is the checkout to measure (default: this one). To compare with the code before a
+change: git worktree add /tmp/before <commit>~1, then pass /tmp/before. Interleave runs
+of the two trees; the spread between runs is larger than on the other benchmarks.
+"""
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+import scratch_db
+
+TREE = os.path.abspath(sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), ".."))
+TOTAL, CONCURRENCY, ROUNDS = (int(arg) for arg in (sys.argv[2:] + ["2000", "1", "5"][len(sys.argv[2:]):]))
+os.environ["STUDY_MODE"] = "HUMAN_WITNESS"
+schema = scratch_db.prepare("poll_middleware")
+sys.path.insert(0, TREE)
+
+import database as db
+scratch_db.attach(db, schema)
+import httpx
+import main
+
+
+async def run():
+    await main.run_startup()
+    for session_id, partner_id in (("bench-a", "bench-b"), ("bench-b", "bench-a")):
+        main.sessions[session_id] = {
+            "session_id": session_id, "matched_session_id": partner_id, "match_status": "matched",
+            "conversation_log": [], "role": "interrogator", "study_mode": "HUMAN_WITNESS",
+        }
+    per_request = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.get("/check_partner_message", params={"session_id": "bench-a"})
+        assert response.status_code == 200, response.text
+        limit = asyncio.Semaphore(CONCURRENCY)
+
+        async def poll():
+            async with limit:
+                await client.get("/check_partner_message", params={"session_id": "bench-a"})
+
+        for _ in range(ROUNDS):
+            started = time.perf_counter()
+            await asyncio.gather(*(poll() for _ in range(TOTAL)))
+            per_request.append((time.perf_counter() - started) / TOTAL * 1e6)
+    return per_request
+
+
+with contextlib.redirect_stdout(io.StringIO()):   # request logging is part of the cost, not the output
+    results = asyncio.run(run())
+print(f"{TOTAL} polls x {ROUNDS} at concurrency {CONCURRENCY}: "
+      f"median {statistics.median(results):.0f}us per request (best round {min(results):.0f}us)")
+scratch_db.cleanup()
+os._exit(0)
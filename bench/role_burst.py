@@ -0,0 +1,85 @@
+"""
+N simultaneous /get_or_assign_role page loads in HUMAN_WITNESS mode (user-034).
+
+All N requests are released together through a barrier, each on its own thread and
+database session, as a launch burst does to the threadpool. Prints wall time, latency
+percentiles, and the role split from the responses, the counter row and the stored rows;
+all three must show an exact N/2 split. Postgres only (the counter row lock is the point).
+Run it through pg_delay_proxy.py to add network latency.
+
+    DATABASE_URL=postgresql://... python bench/role_burst.py [TREE]
+
+TREE is the checkout to measure (default: this one). To compare with the code before a
+change: git worktree add /tmp/before <commit>~1, then pass /tmp/before.
+"""
+import builtins
+import os
+import statistics
+import sys
+import threading
+import time
+
+import scratch_db
+
+TREE = os.path.abspath(sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), ".."))
+N = int(os.getenv("N", "200"))
+if not os.getenv("DATABASE_URL", "").startswith(("postgres://", "postgresql")):
+    sys.exit("Set DATABASE_URL to a Postgres database.")
+os.environ["STUDY_MODE"] = "HUMAN_WITNESS"
+os.environ["CLEANUP_RECONCILE_SECONDS"] = "36000"
+schema = scratch_db.prepare("role_burst")
+sys.path.insert(0, TREE)
+
+import database as db
+scratch_db.attach(db, schema)
+import main
+from sqlalchemy import text
+
+time.sleep(1)   # older trees start their cleanup thread at import
+session = db.SessionLocal()
+session.add(db.RoleAssignmentCounter(id=1, interrogator_count=0, witness_count=0))
+session.commit()
+session.close()
+
+barrier = threading.Barrier(N)
+latencies, roles, errors = [], [], []
+
+
+def page_load(i):
+    request = main.GetOrAssignRoleRequest(participant_id=f"bench-{i:04d}", prolific_pid=None)
+    barrier.wait()
+    started = time.perf_counter()
+    db_session = db.SessionLocal()
+    try:
+        roles.append(main.get_or_assign_role(request, db_session)["role"])
+    except Exception as e:
+        errors.append(repr(e)[:120])
+    finally:
+        db_session.close()
+    latencies.append(time.perf_counter() - started)
+
+
+threads = [threading.Thread(target=page_load, args=(i,)) for i in range(N)]
+print_ = builtins.print
+builtins.print = lambda *args, **kwargs: None   # per-request banners would dominate the timing
+started = time.perf_counter()
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+wall = time.perf_counter() - started
+builtins.print = print_
+
+session = db.SessionLocal()
+counter = session.get(db.RoleAssignmentCounter, 1)
+stored = dict(session.execute(text("SELECT role, count(*) FROM study_sessions GROUP BY role")).all())
+latencies.sort()
+print(f"{N} page loads: wall {wall:.2f}s | p50 {statistics.median(latencies) * 1000:.0f}ms "
+      f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f}ms max {latencies[-1] * 1000:.0f}ms")
+print(f"  responses interrogator={roles.count('interrogator')} witness={roles.count('witness')} | "
+      f"counter interrogator={counter.interrogator_count} witness={counter.witness_count} | stored {stored}")
+if errors:
+    print(f"  {len(errors)} errors, e.g. {errors[:2]}")
+session.close()
+scratch_db.cleanup()
+os._exit(0)
@@ -0,0 +1,60 @@
+"""
+Throwaway database for the bench scripts.
+
+prepare() runs before the tree's database module is imported: it moves into a temp
+directory (session journal, SQLite file) and, when DATABASE_URL names Postgres, creates a
+fresh schema that is dropped at exit. Without DATABASE_URL it points the app at a temp
+SQLite file. attach(db, schema) then routes every connection of db.engine to that schema.
+The scripts end with os._exit() (the app's background threads are not daemons), which
+skips atexit, so they call cleanup() first.
+"""
+import atexit
+import os
+import tempfile
+
+from sqlalchemy import create_engine, event, text
+
+_cleanups = []
+
+
+def prepare(name):
+    workdir = tempfile.mkdtemp(prefix=f"bench-{name}-")
+    os.chdir(workdir)
+    url = os.getenv("DATABASE_URL", "")
+    if not url.startswith(("postgres://", "postgresql")):
+        os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+        return None
+    schema = f"bench_{name}_{os.getpid()}"
+    admin = create_engine(url.replace("postgres://", "postgresql://", 1))
+    with admin.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+
+    def drop_schema():
+        with admin.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+
+    _cleanups.append(drop_schema)
+    atexit.register(cleanup)
+    return schema
+
+
+def attach(db, schema):
+    """Route db.engine to the scratch schema (if any) and create the tables there."""
+    if schema is None:
+        db.Base.metadata.create_all(db.engine)
+        return
+
+    @event.listens_for(db.engine, "connect")
+    def use_schema(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"SET search_path TO {schema}")
+        cursor.close()
+        dbapi_connection.commit()
+
+    db.engine.dispose()   # older trees connect at import, before the listener existed
+    db.Base.metadata.create_all(db.engine)
+
+
+def cleanup():
+    while _cleanups:
+        _cleanups.pop()()
@@ -0,0 +1,123 @@
+"""
+Plain-dict turns/ratings vs the slotted records of 897c834 at 30 turns (user-040).
+
+The records module was removed again in d896637; this is the measurement behind that.
+Its source is read from git (RECORDS_COMMIT), so run it from a checkout that has the
+history. A 30-turn AI-witness session (conversation turns with their timing/trace block,
+plus the per-turn judgments) is decoded from its stored JSON the way recovery loads it,
+once as dicts and once compacted into records, and for each layout it reports:
+
+  - memory of the two logs (tracemalloc, KiB per session, averaged over SESSIONS)
+  - json.dumps of both logs, as the DB column binds do
+  - the journal encode of conversation_log (compact separators, as encode_entry)
+  - a turn["timing"][key] read
+
+Timings are best of 15 repeats, per call.
+
+    python bench/session_records.py
+"""
+import json
+import os
+import random
+import subprocess
+import timeit
+import tracemalloc
+import types
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+RECORDS_COMMIT = "897c834"
+SESSIONS = 50
+CALLS = 300
+WORDS = "hey yeah lol i think so honestly not sure what about you haha weekend coffee work".split()
+random.seed(1)
+
+source = subprocess.run(["git", "-C", ROOT, "show", f"{RECORDS_COMMIT}:session_records.py"],
+                        check=True, capture_output=True, text=True).stdout
+records = types.ModuleType("session_records")
+exec(compile(source, f"{RECORDS_COMMIT}:session_records.py", "exec"), records.__dict__)
+
+
+def words(n):
+    return " ".join(random.choice(WORDS) for _ in range(n))
+
+
+def gemini_call(call):
+    return {"call": call, "model": "gemini-pro", "model_role": "primary", "outcome": "ok",
+            "offset_seconds": 0.1, "queue_wait_seconds": 0.0002, "seconds": 0.9}
+
+
+def stored_session():
+    """JSON text of one session's conversation_log and judgment log, as the DB holds them."""
+    conversation, judgments = [], []
+    for turn in range(1, 31):
+        conversation.append({
+            "turn": turn, "user": words(18), "user_timestamp": datetime.utcnow().isoformat(),
+            "assistant": words(25), "assistant_timestamp": datetime.utcnow().isoformat(),
+            "tactic_used": random.choice(("be_casual", "ask_back", "deflect")),
+            "tactic_selection_justification": words(20),
+            "timing": {
+                "api_call_time_seconds": random.random() * 3, "sleep_duration_seconds": 4.1,
+                "target_visible_response_time_seconds": 7.2, "typing_indicator_delay_seconds": 1.1,
+                "network_delay_seconds": 0.3, "send_attempts": 1, "excessive_delay_flag": False,
+                "response_delay_components": {"reading": 1.2, "thinking": 0.8, "typing": 3.1},
+                "trace": {"tactic_selection_seconds": 0.9, "response_generation_seconds": 1.8,
+                          "answered_by": {"model": "gemini-pro", "model_role": "primary"},
+                          "gemini_calls": [gemini_call("tactic"), gemini_call("response")]},
+            },
+        })
+        judgments.append({
+            "turn": turn, "binary_choice": random.choice(("ai", "human")), "binary_choice_time_ms": 1800,
+            "confidence": random.random(), "confidence_percent": 55, "decision_time_seconds": 2.3,
+            "reading_time_seconds": 3.1, "active_decision_time_seconds": 1.4,
+            "slider_interaction_log": [{"v": step, "t": step * 40} for step in range(6)],
+            "reading_mouse_move_count": 12, "reading_scroll_count": 1, "reading_keypress_count": 0,
+        })
+    return json.dumps(conversation), json.dumps(judgments)
+
+
+def load_dicts(stored):
+    return json.loads(stored[0]), json.loads(stored[1])
+
+
+def load_records(stored):
+    conversation, judgments = load_dicts(stored)
+    return (records.compact_records(records.TurnRecord, conversation),
+            records.compact_records(records.RatingRecord, judgments))
+
+
+def kib_per_session(load, stored):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [load(one) for one in stored]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(kept) == len(stored)
+    return (after - before) / len(stored) / 1024
+
+
+def per_call(fn, scale=1e6):
+    return min(timeit.repeat(fn, number=CALLS, repeat=15)) / CALLS * scale
+
+
+stored = [stored_session() for _ in range(SESSIONS)]
+as_dicts, as_records = load_dicts(stored[0]), load_records(stored[0])
+assert [turn.to_dict() for turn in as_records[0]] == as_dicts[0]
+assert json.loads(json.dumps(as_records, default=records.json_default)) == json.loads(json.dumps(as_dicts))
+
+print(f"30-turn session, {sum(map(len, stored[0])) / 1024:.1f} KiB of stored JSON")
+print(f"  {'':38s} {'dicts':>10s} {'records':>10s}")
+print(f"  {'memory (KiB/session)':38s} {kib_per_session(load_dicts, stored):10.1f} "
+      f"{kib_per_session(load_records, stored):10.1f}")
+for label, dicts, recs, scale in (
+    ("json.dumps both logs (ms)",
+     lambda: json.dumps(as_dicts),
+     lambda: json.dumps(as_records, default=records.json_default), 1e3),
+    ("journal encode conversation_log (ms)",
+     lambda: json.dumps(as_dicts[0], separators=(",", ":")),
+     lambda: json.dumps(as_records[0], default=records.json_default, separators=(",", ":")), 1e3),
+    ("turn['timing'][key] read (ns)",
+     lambda: as_dicts[0][15]["timing"]["network_delay_seconds"],
+     lambda: as_records[0][15]["timing"]["network_delay_seconds"], 1e9),
+):
+    print(f"  {label:38s} {per_call(dicts, scale):10.2f} {per_call(recs, scale):10.2f}")
@@ -0,0 +1,72 @@
+"""
+One cleanup_orphaned_sessions() sweep over 10k stale sessions (user-032).
+
+Seeds N (default 10000) HUMAN_WITNESS rows split evenly between stale waiting, assigned
+and pre_consent, 10% of them already counter_decremented, then times one sweep and
+prints the resulting statuses and role counters (these must not differ between trees).
+
+    python bench/stale_sweep.py [TREE]                                 # temp SQLite file
+    DATABASE_URL=postgresql://... python bench/stale_sweep.py [TREE]   # throwaway schema
+
+TREE is the checkout to measure (default: this one). To compare with the code before a
+change: git worktree add /tmp/before <commit>~1, then pass /tmp/before.
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import scratch_db
+
+TREE = os.path.abspath(sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), ".."))
+N = int(os.getenv("N", "10000"))
+os.environ["STUDY_MODE"] = "HUMAN_WITNESS"
+os.environ["CLEANUP_RECONCILE_SECONDS"] = "36000"   # keep the background sweep out of the timing
+schema = scratch_db.prepare("stale_sweep")
+sys.path.insert(0, TREE)
+
+import database as db
+scratch_db.attach(db, schema)
+import main
+from sqlalchemy import Integer, func
+
+time.sleep(1)   # older trees start their cleanup thread at import; let its first pass finish
+
+session = db.SessionLocal()
+session.add(db.RoleAssignmentCounter(id=1, interrogator_count=N, witness_count=N))
+stale = datetime.utcnow() - timedelta(minutes=10)
+rows = []
+for i in range(N):
+    kind = ("waiting", "assigned", "pre_consent")[i % 3]
+    rows.append({
+        "id": f"bench-{i:06d}", "study_mode": "HUMAN_WITNESS", "role": ("interrogator", "witness")[i % 2],
+        "session_status": "pre_consent" if kind == "pre_consent" else "active",
+        "match_status": "unmatched" if kind == "pre_consent" else kind,
+        "waiting_room_entered_at": stale if kind == "waiting" else None,
+        "start_time": stale - timedelta(minutes=5), "last_updated": stale,
+        "counter_decremented": i % 10 == 0,
+    })
+session.execute(db.StudySession.__table__.insert(), rows)
+session.commit()
+
+started = time.perf_counter()
+main.cleanup_orphaned_sessions(session)
+elapsed = time.perf_counter() - started
+session.close()
+
+session = db.SessionLocal()
+counter = session.get(db.RoleAssignmentCounter, 1)
+table = db.StudySession
+outcome = session.query(
+    table.match_status, table.session_status, func.count(),
+    func.min(table.total_study_time_minutes), func.max(table.total_study_time_minutes),
+    func.sum(table.counter_decremented.cast(Integer)),
+).group_by(table.match_status, table.session_status).order_by(table.match_status, table.session_status).all()
+print(f"{db.engine.dialect.name}: swept {N} stale rows in {elapsed:.2f}s | "
+      f"counter interrogator={counter.interrogator_count} witness={counter.witness_count}")
+for match_status, session_status, count, shortest, longest, decremented in outcome:
+    print(f"  {match_status}/{session_status}: {count} rows, study time {shortest}-{longest} min, "
+          f"{decremented} decremented")
+session.close()
+scratch_db.cleanup()
+os._exit(0)   # skip the background workers' shutdown
@@ -1,36 +1,119 @@
 import os
-from sqlalchemy import create_engine, Column, String, Text, Float, Boolean, DateTime, Integer, Index, inspect, text
+from sqlalchemy import create_engine, Column, String, Text, Float, Boolean, DateTime, Integer, BigInteger, Index, LargeBinary, inspect, text
+from sqlalchemy import JSON, bindparam, cast, func, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import deferred, sessionmaker
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.types import TypeDecorator
 from datetime import datetime
+import hashlib
 import json
+import time
+
+import json_codec
+import metrics
+import sql_timing
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
+
+def _json_serializer(value):
+    # 19Oct26: JSON/JSONB binds are encoded by json_codec (orjson when installed).
+    return json_codec.dumps(value)
+
+
+pool_checkout_seconds = metrics.histogram(
+    "db_pool_checkout_seconds", "Time to get a connection from the pool (queueing + connect).",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited (pool exhaustion shows up
+    here long before pool_timeout errors do)."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_checkout_seconds.observe(time.perf_counter() - start)
+
+
 # Configure connection pooling for better concurrent performance
 if DATABASE_URL and DATABASE_URL.startswith("postgresql://"):
     # Production: PostgreSQL with optimized pooling
     engine = create_engine(
         DATABASE_URL,
+        poolclass=TimedQueuePool,
         pool_size=25,              # 07Aug26: raised 10->25 — evening launch load exhausted the pool
         max_overflow=35,           # 07Aug26: raised 20->35 (60 max; PG default cap is ~100 shared with the AI service)
         pool_timeout=10,           # 07Aug26: fail fast (30s waits stacked up hung requests during exhaustion)
         pool_recycle=3600,         # Recycle connections after 1 hour
         pool_pre_ping=True,        # Test connections before using them
+        json_serializer=_json_serializer,
         connect_args={
             "connect_timeout": 10,  # Connection timeout in seconds
             "options": "-c statement_timeout=30000"  # 30 second query timeout
         }
     )
 else:
-    # Development: SQLite without pooling
-    engine = create_engine(DATABASE_URL or "sqlite:///./test.db")
+    # Development: SQLite (file database; pooled so checkouts are timed the same way)
+    engine = create_engine(DATABASE_URL or "sqlite:///./test.db", json_serializer=_json_serializer,
+                           poolclass=TimedQueuePool)
+
+# 19Oct26: per-statement timing by SQL fingerprint + slow-query log (see sql_timing.py)
+sql_timing.install(engine)
+
+metrics.gauge(
+    "db_pool_connections", "Pooled connections by state.", ("state",),
+    fn=lambda: {("checked_out",): engine.pool.checkedout(), ("idle",): engine.pool.checkedin(),
+                ("overflow",): max(engine.pool.overflow(), 0)},
+)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+
+class JSONLog(TypeDecorator):
+    """JSON document column: native JSONB on Postgres, JSON-encoded Text on SQLite.
+
+    Values are plain Python lists/dicts on both dialects, so callers assign
+    objects directly instead of json.dumps()/json.loads() around every access.
+    """
+    impl = Text
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(JSONB(none_as_null=True))
+        return dialect.type_descriptor(JSON(none_as_null=True))
+
+    def process_result_value(self, value, dialect):
+        # A Postgres column that has not been converted yet still returns TEXT.
+        if isinstance(value, str):
+            try:
+                return json_codec.loads(value)
+            except ValueError:
+                return value
+        return value
+
+    def compare_values(self, x, y):
+        # Logs are mutable lists that the in-memory session keeps appending to; an
+        # equality check against an aliased committed value would silently skip the
+        # UPDATE. Every assignment is treated as a change, same as the old Text column.
+        return False
+
+# Deferred-load group for the large log/text columns (often hundreds of KB per row).
+# Plain ORM loads skip them; code that needs them uses undefer()/undefer_group(HEAVY_COLUMNS)
+# or selects the one column it reads.
+HEAVY_COLUMNS = "heavy"
+
+
 class StudySession(Base):
     __tablename__ = "study_sessions"
 
@@ -41,17 +124,17 @@ class StudySession(Base):
     social_style = Column(String, nullable=True)  # Social style assigned (WARM, PLAYFUL, DIRECT, GUARDED, CONTRARIAN, ADAPTIVE, HYBRID, NEUTRAL)
     domain = Column(String)
     condition = Column(String)
-    user_profile_survey = Column(Text)  # JSON
+    user_profile_survey = deferred(Column(JSONLog), group=HEAVY_COLUMNS)  # JSON
     ai_detected_final = Column(Boolean)
-    ddm_confidence_ratings = Column(Text)  # JSON
-    conversation_log = Column(Text)  # JSON
-    initial_tactic_analysis = Column(Text)
-    tactic_selection_log = Column(Text)  # JSON
-    ai_researcher_notes = Column(Text)  # JSON
-    feels_off_comments = Column(Text)  # JSON
+    ddm_confidence_ratings = deferred(Column(JSONLog), group=HEAVY_COLUMNS)  # JSON
+    conversation_log = deferred(Column(JSONLog), group=HEAVY_COLUMNS)  # JSON
+    initial_tactic_analysis = deferred(Column(Text), group=HEAVY_COLUMNS)
+    tactic_selection_log = deferred(Column(JSONLog), group=HEAVY_COLUMNS)  # JSON
+    ai_researcher_notes = deferred(Column(JSONLog), group=HEAVY_COLUMNS)  # JSON
+    feels_off_comments = deferred(Column(JSONLog), group=HEAVY_COLUMNS)  # JSON
     final_decision_time = Column(Float)
     final_user_comment = Column(Text, nullable=True)
-    ui_event_log = Column(Text, nullable=True)  # JSON string of UI events
+    ui_event_log = deferred(Column(JSONLog, nullable=True), group=HEAVY_COLUMNS)  # JSON string of UI events
     consent_accepted = Column(Boolean, default=False)  # Explicit consent flag
     total_study_time_minutes = Column(Float, nullable=True)  # Total time spent in study
     forced_completion = Column(Boolean, default=False)  # Whether study ended due to time limit
@@ -74,10 +157,10 @@ class StudySession(Base):
 
     # Confirmatory per-turn judgment log. This mirrors ddm_confidence_ratings
     # with clearer naming for new exports while keeping old data intact.
-    interrogator_turn_judgment_log = Column(Text, nullable=True)  # JSON
+    interrogator_turn_judgment_log = deferred(Column(JSONLog, nullable=True), group=HEAVY_COLUMNS)  # JSON
     reading_time_seconds = Column(Float, nullable=True)  # Time from AI response to first slider touch
     active_decision_time_seconds = Column(Float, nullable=True)  # Time from first slider touch to submit
-    slider_interaction_log = Column(Text, nullable=True)  # JSON of all slider interactions per turn
+    slider_interaction_log = deferred(Column(JSONLog, nullable=True), group=HEAVY_COLUMNS)  # JSON of all slider interactions per turn
     # NEW: reading-phase engagement telemetry (latest turn; full history in the per-turn JSON log)
     reading_first_mouse_move_ms = Column(Float, nullable=True)  # ms from AI msg appearance to first mousemove (reading window)
     reading_first_scroll_ms = Column(Float, nullable=True)
@@ -85,7 +168,7 @@ class StudySession(Base):
     reading_mouse_move_count = Column(Integer, nullable=True)  # events before first slider touch
     reading_scroll_count = Column(Integer, nullable=True)
     reading_keypress_count = Column(Integer, nullable=True)
-    mouse_trajectory = Column(Text, nullable=True)  # JSON [[x,y,ms],...] latest turn; full history in per-turn log
+    mouse_trajectory = deferred(Column(JSONLog, nullable=True), group=HEAVY_COLUMNS)  # JSON [[x,y,ms],...] latest turn; full history in per-turn log
     # NEW: Session status tracking for incremental saves
     session_status = Column(String, default="active", index=True)  # active, completed, interrupted - indexed for faster queries
     last_updated = Column(DateTime, default=datetime.utcnow, index=True)  # Track when session was last updated - indexed for queries
@@ -119,7 +202,7 @@ class StudySession(Base):
     context_menu_event_count = Column(Integer, default=0)
     text_selection_event_count = Column(Integer, default=0)
     page_exit_event_count = Column(Integer, default=0)
-    pasted_text_log = Column(Text, nullable=True)  # JSON list of pasted text events
+    pasted_text_log = deferred(Column(JSONLog, nullable=True), group=HEAVY_COLUMNS)  # JSON list of pasted text events
     beforeinput_event_count = Column(Integer, default=0)
     beforeinput_paste_event_count = Column(Integer, default=0)
     beforeinput_drop_event_count = Column(Integer, default=0)
@@ -169,6 +252,45 @@ class StudySession(Base):
     prolific_completion_code = Column(String, nullable=True)  # Which Prolific code was sent: CR0KFVQO, C120SCQ9, C1B54A7Q, C19WFTZR, CZSGWT2I
     study_mode = Column(String, nullable=True, index=True)  # "AI_WITNESS" or "HUMAN_WITNESS" — which condition this session ran under
 
+    # Integrity counters written in the same UPDATE as the logs they describe, so a save
+    # can be verified from its RETURNING row instead of re-reading and re-parsing the logs.
+    turn_count = Column(Integer, default=0)  # len(conversation_log)
+    rating_count = Column(Integer, default=0)  # len(interrogator_turn_judgment_log)
+    messages_sent = Column(Integer, default=0)  # conversation_log messages this participant wrote
+    messages_received = Column(Integer, default=0)  # conversation_log messages from the partner / AI witness
+    content_checksum = Column(String, nullable=True)  # log_content_checksum() at the last full save; NULL after a partial append
+    journal_seq = Column(BigInteger, nullable=True)  # seq of the last session_journal entry applied (idempotent replay)
+
+    # Composite/partial indexes shaped to the matching, cleanup, status and integrity
+    # queries (each leads with study_mode because both conditions share this table).
+    # create_all() only builds these for new tables; ensure_study_session_indexes()
+    # adds any that are missing on an existing database.
+    __table_args__ = (
+        # attempt_match._oldest_live_waiting + stale-waiting sweep (FIFO by entry time)
+        Index("ix_study_sessions_waiting_queue", "study_mode", "role", "match_status", "waiting_room_entered_at",
+              postgresql_where=text("match_status = 'waiting'"), sqlite_where=text("match_status = 'waiting'")),
+        # stale-match sweep (matched > 2 min ago, never started talking)
+        Index("ix_study_sessions_matched_at", "study_mode", "matched_at",
+              postgresql_where=text("match_status = 'matched'"), sqlite_where=text("match_status = 'matched'")),
+        # stale-assigned sweep
+        Index("ix_study_sessions_assigned_idle", "study_mode", "last_updated",
+              postgresql_where=text("match_status = 'assigned'"), sqlite_where=text("match_status = 'assigned'")),
+        # (the stale pre_consent sweep is served by the session_status index; see
+        # OBSOLETE_STUDY_SESSION_INDEXES)
+        # study_status_ping (index-only: turn_count is included) + startup interrupted-session sweep
+        Index("ix_study_sessions_live_counts", "study_mode", "session_status", "role", "match_status",
+              postgresql_include=["turn_count"],
+              postgresql_where=text("session_status IN ('active', 'pre_consent')"),
+              sqlite_where=text("session_status IN ('active', 'pre_consent')")),
+        # final_response_integrity_check
+        Index("ix_study_sessions_conversation_phase", "study_mode", "role",
+              postgresql_where=text("conversation_phase_reached = true"),
+              sqlite_where=text("conversation_phase_reached = 1")),
+        # assign_social_style_counterbalanced (index-only GROUP BY)
+        Index("ix_study_sessions_style_balance", "study_mode", "social_style", "session_status",
+              postgresql_where=text("social_style IS NOT NULL"), sqlite_where=text("social_style IS NOT NULL")),
+    )
+
 
 class DroppedParticipant(Base):
     """
@@ -194,6 +316,73 @@ class RoleAssignmentCounter(Base):
     id = Column(Integer, primary_key=True, default=1)
     interrogator_count = Column(Integer, default=0, nullable=False)
     witness_count = Column(Integer, default=0, nullable=False)
+    last_assigned_role = Column(String, nullable=True)  # set by the same UPDATE that picks the role
+
+
+class ServerCheckpoint(Base):
+    """
+    Snapshot of one study mode's in-memory sessions, written on graceful shutdown and
+    consumed (deleted) by the next process on boot. See session_checkpoint.py.
+    """
+    __tablename__ = "server_checkpoints"
+
+    study_mode = Column(String, primary_key=True)  # one checkpoint per condition's process
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    session_count = Column(Integer, default=0, nullable=False)
+    payload = Column(LargeBinary, nullable=False)  # zlib-compressed JSON
+
+
+class FrontendDebugLog(Base):
+    """
+    Frontend error/debug reports posted to /debug_log, written in batches by
+    frontend_debug.py. A report repeated by the same session within the dedup window is
+    one row whose repeat_count / last_seen_at are bumped instead of a new row.
+    """
+    __tablename__ = "frontend_debug_logs"
+
+    id = Column(String, primary_key=True)  # uuid4 hex, assigned at ingestion
+    session_id = Column(String, nullable=False)
+    received_at = Column(DateTime, nullable=False, index=True)
+    last_seen_at = Column(DateTime, nullable=False)
+    repeat_count = Column(Integer, default=1, nullable=False)
+    signature = Column(String, nullable=False)  # hash of type + normalized message + top frame
+    log_type = Column(String, nullable=False)
+    is_error = Column(Boolean, default=False, nullable=False)
+    message = Column(Text, nullable=True)
+    stack_trace = Column(Text, nullable=True)
+    additional_context = Column(Text, nullable=True)  # JSON, truncated to the ingestion limit
+    current_turn = Column(String, nullable=True)
+    client_timestamp = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index("ix_frontend_debug_logs_session_received", "session_id", "received_at"),
+    )
+
+
+class ServiceSchema(Base):
+    """
+    One row per study-mode service sharing this database, recording what its running code
+    can read. Migrations that would break the other service's older code wait for its row.
+    """
+    __tablename__ = "service_schema"
+
+    study_mode = Column(String, primary_key=True)
+    schema_version = Column(String, nullable=False)  # SCHEMA_FINGERPRINT of that service's code
+    json_log_storage = Column(Integer, default=1, nullable=False)  # JSON_LOG_STORAGE_VERSION
+    seen_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class SchemaMeta(Base):
+    """
+    Single row recording the model schema the migrations below last completed for.
+    A boot whose SCHEMA_FINGERPRINT matches skips create_all and every ensure_* step.
+    """
+    __tablename__ = "schema_meta"
+
+    id = Column(Integer, primary_key=True, default=1)
+    schema_version = Column(String, nullable=False)
+    jsonb_columns = Column(Text, nullable=True)  # JSON list: JSONB_NATIVE_COLUMNS as of that migration
+    migrated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
 
 def ensure_study_session_columns():
@@ -201,46 +390,476 @@ def ensure_study_session_columns():
 
     SQLAlchemy's create_all() does not migrate existing tables. This lightweight
     additive migration keeps Railway/Postgres and local SQLite usable without
-    introducing destructive schema changes.
+    introducing destructive schema changes. Covers study_sessions and the
+    role_assignment_counter row. Returns False if any table could not be checked.
+    """
+    ok = True
+    for table in (StudySession.__table__, RoleAssignmentCounter.__table__):
+        try:
+            inspector = inspect(engine)
+            if table.name not in inspector.get_table_names():
+                continue
+
+            existing_columns = {
+                column_info["name"]
+                for column_info in inspector.get_columns(table.name)
+            }
+
+            missing_columns = [
+                column
+                for column in table.columns
+                if column.name not in existing_columns
+            ]
+
+            if not missing_columns:
+                continue
+
+            with engine.begin() as connection:
+                for column in missing_columns:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    connection.execute(
+                        text(
+                            f"ALTER TABLE {table.name} "
+                            f"ADD COLUMN {column.name} {column_type}"
+                        )
+                    )
+                    print(f"Added missing {table.name} column: {column.name}")
+        except Exception as e:
+            print(f"WARNING: Could not add missing {table.name} columns: {e}")
+            ok = False
+    return ok
+
+
+# JSON log columns stored as JSONB on Postgres (see JSONLog). Populated from the
+# live schema by ensure_json_columns(); append_json_log() only takes the
+# server-side path for columns listed here, so a failed migration falls back safely.
+JSON_LOG_COLUMNS = [
+    column.name
+    for column in StudySession.__table__.columns
+    if isinstance(column.type, JSONLog)
+]
+JSONB_NATIVE_COLUMNS = set()
+JSON_MIGRATION_BATCH_SIZE = int(os.getenv("JSON_MIGRATION_BATCH_SIZE", "500"))
+_JSON_MIGRATION_LOCK_KEY = 7250126  # pg_advisory_lock key shared by both services
+
+# The Text -> JSONB swap renames columns, which breaks code that still expects Text (it
+# json.loads() what is now a decoded list). The AI_WITNESS and HUMAN_WITNESS services share
+# this database and deploy separately, so the swap waits until every service listed here has
+# registered code with JSON_LOG_STORAGE_VERSION >= 2 in service_schema. Until then the columns
+# keep their names and this code uses them as Text. Single-service deployments set
+# JSON_SWAP_SERVICES to their own STUDY_MODE.
+JSON_LOG_STORAGE_VERSION = 2  # 1: Text JSON log columns only; 2: reads and writes Text or JSONB
+JSON_SWAP_SERVICES = [
+    mode.strip() for mode in os.getenv("JSON_SWAP_SERVICES", "AI_WITNESS,HUMAN_WITNESS").split(",")
+    if mode.strip()
+]
+SERVICE_STUDY_MODE = os.getenv("STUDY_MODE", "HUMAN_WITNESS")
+
+
+def register_service(connection, study_mode=None):
+    """Record this service's code in service_schema (caller commits)."""
+    study_mode = study_mode or SERVICE_STUDY_MODE
+    table = ServiceSchema.__table__
+    connection.execute(table.delete().where(table.c.study_mode == study_mode))
+    connection.execute(table.insert().values(
+        study_mode=study_mode, schema_version=SCHEMA_FINGERPRINT,
+        json_log_storage=JSON_LOG_STORAGE_VERSION, seen_at=datetime.utcnow(),
+    ))
+
+
+def json_swap_ready(connection):
+    """True once every JSON_SWAP_SERVICES service runs code that reads JSONB log columns."""
+    table = ServiceSchema.__table__
+    ready = set(connection.execute(
+        select(table.c.study_mode).where(table.c.json_log_storage >= JSON_LOG_STORAGE_VERSION)
+    ).scalars())
+    return set(JSON_SWAP_SERVICES) <= ready
+
+
+def _convert_text_column_to_jsonb(connection, name, batch_size, swap=True):
+    """Online Text -> JSONB conversion of one study_sessions column.
+
+    A shadow JSONB column is kept in sync by a temporary trigger while existing
+    rows are copied in keyset batches (each batch commits on its own, so no long
+    table lock). The swap is a rename; the original Text column is kept as
+    <name>_text_legacy, so nothing is destroyed. Rows whose text is not valid
+    JSON get NULL in the new column and stay readable in the legacy column.
+
+    With swap=False it stops after the copy: the trigger stays installed, so the
+    shadow keeps following writes from code that only knows the Text column, and
+    a later call only copies rows the shadow is still missing. Returns True if swapped.
+    """
+    shadow = f"{name}__jsonb"
+    trigger = f"study_sessions_{name}_jsonb_sync"
+
+    with connection.begin():
+        connection.execute(text(f"ALTER TABLE study_sessions ADD COLUMN IF NOT EXISTS {shadow} JSONB"))
+        connection.execute(text(f"""
+            CREATE OR REPLACE FUNCTION {trigger}() RETURNS trigger AS $$
+            BEGIN
+                BEGIN
+                    NEW.{shadow} := NULLIF(NEW.{name}, '')::jsonb;
+                EXCEPTION WHEN others THEN
+                    NEW.{shadow} := NULL;
+                END;
+                RETURN NEW;
+            END $$ LANGUAGE plpgsql
+        """))
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger} ON study_sessions"))
+        connection.execute(text(
+            f"CREATE TRIGGER {trigger} BEFORE INSERT OR UPDATE OF {name} ON study_sessions "
+            f"FOR EACH ROW EXECUTE FUNCTION {trigger}()"
+        ))
+
+    # Touch every row in id order; the trigger fills the shadow column.
+    last_id = ""
+    converted = 0
+    while True:
+        with connection.begin():
+            batch_ids = connection.execute(
+                text(f"""
+                    WITH batch AS (
+                        SELECT id FROM study_sessions
+                        WHERE id > :last_id AND {name} IS NOT NULL AND {shadow} IS NULL
+                        ORDER BY id LIMIT :batch_size
+                    )
+                    UPDATE study_sessions AS s SET {name} = s.{name}
+                    FROM batch WHERE s.id = batch.id
+                    RETURNING s.id
+                """),
+                {"last_id": last_id, "batch_size": batch_size},
+            ).scalars().all()
+        if not batch_ids:
+            break
+        converted += len(batch_ids)
+        last_id = max(batch_ids)
+
+    if not swap:
+        print(f"Copied study_sessions.{name} to {shadow} ({converted} rows); swap waits for "
+              f"{', '.join(JSON_SWAP_SERVICES)} to run JSONB-aware code")
+        return False
+
+    with connection.begin():
+        connection.execute(text("LOCK TABLE study_sessions IN ACCESS EXCLUSIVE MODE"))
+        invalid = connection.execute(text(
+            f"SELECT count(*) FROM study_sessions "
+            f"WHERE {name} IS NOT NULL AND {name} <> '' AND {shadow} IS NULL"
+        )).scalar()
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger} ON study_sessions"))
+        connection.execute(text(f"DROP FUNCTION IF EXISTS {trigger}()"))
+        connection.execute(text(f"ALTER TABLE study_sessions RENAME COLUMN {name} TO {name}_text_legacy"))
+        connection.execute(text(f"ALTER TABLE study_sessions RENAME COLUMN {shadow} TO {name}"))
+
+    print(f"Converted study_sessions.{name} to JSONB ({converted} rows)")
+    if invalid:
+        print(f"WARNING: {invalid} rows of study_sessions.{name} were not valid JSON; "
+              f"originals kept in {name}_text_legacy")
+    return True
+
+
+def ensure_json_columns(batch_size=JSON_MIGRATION_BATCH_SIZE, bind=None):
+    """Convert legacy Text JSON log columns to JSONB on Postgres.
+
+    Same spirit as ensure_study_session_columns(): additive, idempotent and safe
+    to run on every boot. SQLite keeps Text storage and is left untouched.
+    Registers this service first; the swap itself waits for json_swap_ready().
+    Returns True when every column is JSONB, None while the swap is waiting for
+    the other service, False if the conversion could not run.
+    """
+    bind = engine if bind is None else bind
+    JSONB_NATIVE_COLUMNS.clear()
+    if bind.dialect.name != "postgresql":
+        return True
+
+    pending = False
+    try:
+        with bind.connect() as connection:
+            # Both services share this database; only one converts at a time.
+            connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _JSON_MIGRATION_LOCK_KEY})
+            connection.commit()
+            try:
+                register_service(connection)
+                swap = json_swap_ready(connection)
+                connection.commit()
+                inspector = inspect(connection)
+                if "study_sessions" not in inspector.get_table_names():
+                    return True
+                column_types = {
+                    column_info["name"]: column_info["type"]
+                    for column_info in inspector.get_columns("study_sessions")
+                }
+                connection.commit()
+                for name in JSON_LOG_COLUMNS:
+                    if name not in column_types:
+                        continue
+                    if not isinstance(column_types[name], JSONB):
+                        if not _convert_text_column_to_jsonb(connection, name, batch_size, swap=swap):
+                            pending = True
+                            continue
+                    JSONB_NATIVE_COLUMNS.add(name)
+            finally:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _JSON_MIGRATION_LOCK_KEY})
+                connection.commit()
+    except Exception as e:
+        print(f"WARNING: Could not convert JSON columns to JSONB: {e}")
+        return False
+    return None if pending else True
+
+
+def append_json_log(db_session, session_id, column, items, extra_values=None, returning=False, condition=None):
+    """Append items to a StudySession JSON log column.
+
+    On Postgres with a native JSONB column this is one server-side
+    `col = COALESCE(col, '[]') || :items` UPDATE, so the existing document is
+    never shipped to Python and back. Elsewhere it falls back to read-modify-write.
+    extra_values are set in the same UPDATE; condition is an extra WHERE clause.
+    The caller commits.
+
+    Returns the full updated log when returning=True, otherwise True. Returns
+    None if there is no row for session_id (or condition excluded it).
+    """
+    table = StudySession.__table__
+    target = table.c[column]
+    values = dict(extra_values or {})
+    where = [table.c.id == session_id]
+    if condition is not None:
+        where.append(condition)
+
+    if column in JSONB_NATIVE_COLUMNS and db_session.get_bind().dialect.name == "postgresql":
+        empty = cast(literal([], JSONB), JSONB)
+        values[column] = func.coalesce(target, empty).op("||", return_type=target.type)(
+            cast(literal(list(items), JSONB), JSONB)
+        )
+        stmt = update(table).where(*where).values(values)
+        stmt = stmt.returning(target) if returning else stmt.returning(table.c.id)
+        row = db_session.execute(stmt).first()
+        if row is None:
+            return None
+        return (row[0] or []) if returning else True
+
+    current = db_session.execute(
+        select(target).where(*where)
+    ).first()
+    if current is None:
+        return None
+    log = list(current[0] or [])
+    log.extend(items)
+    values[column] = log
+    db_session.execute(update(table).where(*where).values(values))
+    return log if returning else True
+
+
+# Indexes earlier versions created that the planner does not use (checked by
+# tests/test_query_plans.py); dropped by ensure_study_session_indexes().
+#   ix_study_sessions_pre_consent_idle  Postgres picks ix_study_sessions_session_status
+#                                       for the pre_consent sweep instead
+#   ix_study_sessions_live_by_role      replaced by ix_study_sessions_live_counts (covers turn_count)
+OBSOLETE_STUDY_SESSION_INDEXES = ("ix_study_sessions_pre_consent_idle", "ix_study_sessions_live_by_role")
+
+
+def ensure_study_session_indexes():
+    """Create any of StudySession's indexes missing from an existing table, and drop
+    OBSOLETE_STUDY_SESSION_INDEXES.
+
+    Covers the __table_args__ composites and the Column(index=True) ones, which
+    ensure_study_session_columns() does not create for columns it adds.
+
+    Idempotent; on Postgres each index is built CONCURRENTLY so live traffic is not
+    blocked, and an INVALID leftover from an interrupted build is dropped and rebuilt.
+    Returns False if the indexes could not be checked.
     """
     try:
         inspector = inspect(engine)
         if "study_sessions" not in inspector.get_table_names():
-            return
+            return True
+        existing = {index_info["name"] for index_info in inspector.get_indexes("study_sessions")}
+        is_postgres = engine.dialect.name == "postgresql"
 
-        existing_columns = {
-            column_info["name"]
-            for column_info in inspector.get_columns("study_sessions")
-        }
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            if is_postgres:
+                invalid = set(connection.execute(text("""
+                    SELECT c.relname FROM pg_index i
+                    JOIN pg_class c ON c.oid = i.indexrelid
+                    WHERE i.indrelid = 'study_sessions'::regclass AND NOT i.indisvalid
+                """)).scalars())
+                for name in invalid:
+                    connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+                    existing.discard(name)
 
-        missing_columns = [
-            column
-            for column in StudySession.__table__.columns
-            if column.name not in existing_columns
-        ]
+            for name in OBSOLETE_STUDY_SESSION_INDEXES:
+                if name in existing:
+                    connection.execute(text(f"DROP INDEX {'CONCURRENTLY ' if is_postgres else ''}IF EXISTS {name}"))
+                    print(f"Dropped obsolete study_sessions index: {name}")
+
+            for index in StudySession.__table__.indexes:
+                if index.name in existing:
+                    continue
+                ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect))
+                if is_postgres:
+                    ddl = ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1)
+                connection.execute(text(ddl))
+                print(f"Added missing study_sessions index: {index.name}")
+    except Exception as e:
+        print(f"WARNING: Could not add missing study_sessions indexes: {e}")
+        return False
+    return True
 
-        if not missing_columns:
-            return
 
-        with engine.begin() as connection:
-            for column in missing_columns:
-                column_type = column.type.compile(dialect=engine.dialect)
-                connection.execute(
-                    text(
-                        f"ALTER TABLE study_sessions "
-                        f"ADD COLUMN {column.name} {column_type}"
+def log_content_checksum(conversation_log, judgment_log):
+    """sha256 of the canonical JSON of the conversation and per-turn judgment logs."""
+    # Stays on the stdlib encoder: the bytes must match checksums already stored.
+    payload = json.dumps(
+        [conversation_log or [], judgment_log or []],
+        sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def conversation_message_counts(conversation_log, role):
+    """(sent, received) message counts for one participant's conversation_log.
+
+    Human-human entries carry sender_role; AI-witness entries are one turn holding the
+    participant's message ("user") and the AI reply ("assistant").
+    """
+    sent = received = 0
+    for entry in conversation_log or []:
+        if "sender_role" in entry:
+            if entry["sender_role"] == role:
+                sent += 1
+            else:
+                received += 1
+        else:
+            sent += 1 if entry.get("user") else 0
+            received += 1 if entry.get("assistant") else 0
+    return sent, received
+
+
+def backfill_session_counters(batch_size=JSON_MIGRATION_BATCH_SIZE):
+    """Fill turn_count/rating_count/messages_*/content_checksum for rows saved before they existed.
+
+    Keyset batches over rows with a NULL counter; a no-op once every row is done.
+    Returns False if the backfill did not finish.
+    """
+    table = StudySession.__table__
+    try:
+        last_id = ""
+        filled = 0
+        while True:
+            with engine.begin() as connection:
+                rows = connection.execute(
+                    select(table.c.id, table.c.role, table.c.conversation_log, table.c.interrogator_turn_judgment_log)
+                    .where(
+                        or_(table.c.turn_count.is_(None), table.c.messages_sent.is_(None)),
+                        table.c.id > last_id,
                     )
+                    .order_by(table.c.id)
+                    .limit(batch_size)
+                ).all()
+                if not rows:
+                    break
+                params = []
+                for row in rows:
+                    sent, received = conversation_message_counts(row.conversation_log, row.role)
+                    params.append({
+                        "row_id": row.id,
+                        "turns": len(row.conversation_log or []),
+                        "ratings": len(row.interrogator_turn_judgment_log or []),
+                        "sent": sent,
+                        "received": received,
+                        "checksum": log_content_checksum(row.conversation_log, row.interrogator_turn_judgment_log),
+                    })
+                connection.execute(
+                    update(table).where(table.c.id == bindparam("row_id")).values(
+                        turn_count=bindparam("turns"),
+                        rating_count=bindparam("ratings"),
+                        messages_sent=bindparam("sent"),
+                        messages_received=bindparam("received"),
+                        content_checksum=bindparam("checksum"),
+                    ),
+                    params,
                 )
-                print(f"Added missing study_sessions column: {column.name}")
+            filled += len(rows)
+            last_id = rows[-1].id
+        if filled:
+            print(f"Backfilled integrity counters for {filled} study_sessions rows")
     except Exception as e:
-        print(f"WARNING: Could not add missing study_sessions columns: {e}")
+        print(f"WARNING: Could not backfill study_sessions integrity counters: {e}")
+        return False
+    return True
 
 
-# Create tables - wrapped in try/except to prevent import failures
-try:
-    Base.metadata.create_all(bind=engine)
-    ensure_study_session_columns()
-    print("Database tables created/verified successfully")
-except Exception as e:
-    print(f"WARNING: Could not create database tables during import: {e}")
-    print("Tables will be created on first database access")
+def schema_fingerprint():
+    """Hash of every table, column type and index the models declare (plus the dialect).
+    Changes whenever a model change would need create_all / an ensure_* migration."""
+    parts = [engine.dialect.name]
+    for table in sorted(Base.metadata.tables.values(), key=lambda t: t.name):
+        parts.append(table.name)
+        parts.extend(f"{column.name}:{column.type!r}" for column in table.columns)
+        parts.extend(sorted(index.name for index in table.indexes))
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+SCHEMA_FINGERPRINT = schema_fingerprint()
+# Set to re-run the full create_all / ensure_* pass even when schema_meta is current.
+FORCE_SCHEMA_CHECK = os.getenv("FORCE_SCHEMA_CHECK", "").lower() in ("1", "true", "yes")
+
+
+def _read_schema_meta():
+    try:
+        with engine.connect() as connection:
+            return connection.execute(
+                select(SchemaMeta.schema_version, SchemaMeta.jsonb_columns).where(SchemaMeta.id == 1)
+            ).first()
+    except Exception:
+        return None  # no schema_meta table yet: first boot of this version of the code
+
+
+def _write_schema_meta():
+    table = SchemaMeta.__table__
+    with engine.begin() as connection:
+        connection.execute(table.delete().where(table.c.id == 1))
+        connection.execute(table.insert().values(
+            id=1, schema_version=SCHEMA_FINGERPRINT,
+            jsonb_columns=json_codec.dumps(sorted(JSONB_NATIVE_COLUMNS)), migrated_at=datetime.utcnow(),
+        ))
+
+
+def init_database():
+    """Create / migrate the schema, skipping all of it when schema_meta already records
+    this SCHEMA_FINGERPRINT (one SELECT instead of a full inspection on every boot).
+
+    Called from main's startup, not at import. Returns "current", "migrated", "pending"
+    (done, except for the JSONB swap waiting on the other service) or "failed".
+    """
+    started = time.perf_counter()
+    stored = None if FORCE_SCHEMA_CHECK else _read_schema_meta()
+    if stored is not None and stored.schema_version == SCHEMA_FINGERPRINT:
+        JSONB_NATIVE_COLUMNS.clear()
+        JSONB_NATIVE_COLUMNS.update(json_codec.loads(stored.jsonb_columns or "[]"))
+        print(f"Database schema {SCHEMA_FINGERPRINT} current — migrations skipped "
+              f"({time.perf_counter() - started:.2f}s)")
+        return "current"
+
+    # Wrapped in try/except so a database outage does not stop the server from starting
+    try:
+        Base.metadata.create_all(bind=engine)
+        columns_added = ensure_study_session_columns()
+        json_columns = ensure_json_columns()
+        results = [
+            columns_added,
+            json_columns is not False,
+            backfill_session_counters(),
+            ensure_study_session_indexes(),
+        ]
+        # A pending JSONB swap leaves schema_meta stale, so the next boot runs it again.
+        if all(results) and json_columns:
+            _write_schema_meta()
+        print(f"Database tables created/verified successfully (schema {SCHEMA_FINGERPRINT}, "
+              f"{time.perf_counter() - started:.2f}s)")
+        if not all(results):
+            return "failed"
+        return "migrated" if json_columns else "pending"
+    except Exception as e:
+        print(f"WARNING: Could not create database tables during startup: {e}")
+        print("Tables will be created on first database access")
+        return "failed"
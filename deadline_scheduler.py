@@ -0,0 +1,100 @@
+"""
+Deadline timers for session state timeouts.
+
+A single thread sleeps until the earliest (deadline, session_id, kind) in a min-heap and
+hands it to the handler exactly when it is due, instead of a fixed-period sweep finding
+it up to a full period late. Rescheduling the same (session_id, kind) replaces the
+previous deadline; superseded heap entries are skipped lazily when they surface.
+
+Timers live in memory only — main.py's low-frequency reconciliation sweep re-seeds them
+after a restart and catches anything a missed hook never scheduled.
+"""
+import heapq
+import threading
+import traceback
+from datetime import datetime
+
+
+class DeadlineScheduler:
+    """Min-heap of (deadline, session_id, kind) fired on one background thread.
+
+    handler(session_id, kind) runs outside the lock and is responsible for re-checking
+    the session's state — a timer firing only means "look at this session now".
+    """
+
+    def __init__(self, handler, name="deadline-scheduler"):
+        self._handler = handler
+        self._name = name
+        self._cond = threading.Condition()
+        self._heap = []
+        self._deadlines = {}    # (session_id, kind) -> current deadline
+        self._thread = None
+        self.counters = {"scheduled": 0, "fired": 0, "errors": 0}
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+            self._thread.start()
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def schedule(self, session_id, kind, deadline):
+        """Fire handler(session_id, kind) at deadline (naive UTC), replacing any earlier
+        timer for the same pair."""
+        with self._cond:
+            key = (session_id, kind)
+            if self._deadlines.get(key) == deadline:
+                return
+            self._deadlines[key] = deadline
+            heapq.heappush(self._heap, (deadline, session_id, kind))
+            self.counters["scheduled"] += 1
+            self._cond.notify()
+
+    def deadline(self, session_id, kind):
+        """The pending deadline for (session_id, kind), or None."""
+        with self._cond:
+            return self._deadlines.get((session_id, kind))
+
+    def cancel(self, session_id, kind):
+        with self._cond:
+            self._deadlines.pop((session_id, kind), None)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    deadline, session_id, kind = self._heap[0]
+                    if self._deadlines.get((session_id, kind)) != deadline:
+                        heapq.heappop(self._heap)   # superseded or cancelled
+                        continue
+                    delay = (deadline - datetime.utcnow()).total_seconds()
+                    if delay <= 0:
+                        heapq.heappop(self._heap)
+                        del self._deadlines[(session_id, kind)]
+                        break
+                    self._cond.wait(delay)
+                self.counters["fired"] += 1
+
+            try:
+                self._handler(session_id, kind)
+            except Exception as e:
+                self.counters["errors"] += 1
+                print(f"⚠️ DEADLINE HANDLER ERROR | {kind} | {str(session_id)[:8]}... | {e}")
+                traceback.print_exc()
+
+    def stats(self):
+        with self._cond:
+            next_due = min(self._deadlines.values()) if self._deadlines else None
+            return {
+                **self.counters,
+                "pending": len(self._deadlines),
+                "next_due_in_seconds": (
+                    round((next_due - datetime.utcnow()).total_seconds(), 1) if next_due else None
+                ),
+            }
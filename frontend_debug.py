@@ -0,0 +1,317 @@
+"""
+Ingestion, storage and lookup for frontend reports posted to /debug_log.
+
+/debug_log is unauthenticated and a broken frontend can post the same error from a
+render loop many times a second, so every report passes through, in order:
+
+  1. size limits: the body and each field are capped, oversized context is truncated;
+  2. dedup: a report whose signature (type + digit-normalized message + top stack frame)
+     the same session already sent within DEDUP_WINDOW_SECONDS only bumps repeat_count;
+  3. token buckets: one per session and one global; over either, the report is dropped.
+
+Accepted reports go to an in-memory ring buffer (newest RING_SIZE, queryable at once) and
+to a pending batch that a background thread writes to frontend_debug_logs every
+FLUSH_SECONDS (bulk INSERT, plus an executemany UPDATE for rows whose repeat_count moved).
+Researchers read them back through /admin/frontend_debug_log instead of scraping logs.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from sqlalchemy import bindparam, insert, select, update
+
+MAX_BODY_BYTES = 32 * 1024
+MAX_MESSAGE_CHARS = 2000
+MAX_STACK_CHARS = 8000
+MAX_CONTEXT_CHARS = 8000
+MAX_SHORT_FIELD_CHARS = 200
+
+SESSION_RATE_PER_SECOND = 0.5
+SESSION_BURST = 20
+GLOBAL_RATE_PER_SECOND = 20.0
+GLOBAL_BURST = 200
+DEDUP_WINDOW_SECONDS = 60.0
+RING_SIZE = 2000
+FLUSH_SECONDS = 2.0
+FLUSH_BATCH_SIZE = 500
+MAX_PENDING = 5000              # unwritten reports kept while the database is unreachable
+MAX_TRACKED_SESSIONS = 5000     # per-session buckets / dedup keys, LRU-bounded
+
+_DIGITS = re.compile(r"\d+")
+
+
+def _truncate(value, limit):
+    if value is None:
+        return None
+    value = value if isinstance(value, str) else str(value)
+    return value if len(value) <= limit else value[:limit] + f"... [truncated {len(value) - limit} chars]"
+
+
+def _context_json(context):
+    if not context:
+        return None
+    try:
+        text = json.dumps(context, default=str, ensure_ascii=False)
+    except (TypeError, ValueError):
+        text = str(context)
+    return _truncate(text, MAX_CONTEXT_CHARS)
+
+
+def error_signature(log_type, message, stack_trace):
+    """Stable identity of 'the same error': numbers (ids, line/col, timings) normalized away."""
+    top_frame = ""
+    if stack_trace:
+        for line in stack_trace.splitlines():
+            if line.strip():
+                top_frame = line.strip()
+                break
+    raw = "\x1f".join((log_type, _DIGITS.sub("#", message or ""), _DIGITS.sub("#", top_frame)))
+    return hashlib.sha1(raw.encode("utf-8", "replace")).hexdigest()[:16]
+
+
+class _Bucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def take(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class FrontendDebugStore:
+    """Rate limiting, dedup, ring buffer and batched DB writer for /debug_log reports.
+
+    ingest() is cheap and never touches the database; the writer thread does. Entries are
+    dicts with the FrontendDebugLog column names (datetimes as datetime objects).
+    """
+
+    def __init__(self, session_factory, model):
+        self._session_factory = session_factory
+        self._model = model
+        self._lock = threading.Lock()
+        self._global_bucket = _Bucket(GLOBAL_RATE_PER_SECOND, GLOBAL_BURST, time.monotonic())
+        self._session_buckets = OrderedDict()   # session_id -> _Bucket
+        self._recent = OrderedDict()            # (session_id, signature) -> (entry, monotonic first seen)
+        self._ring = deque(maxlen=RING_SIZE)
+        self._pending = []                      # entries not yet inserted
+        self._dirty = {}                        # id -> entry inserted, repeat_count changed since
+        self._written_counts = {}               # id -> repeat_count as last written
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._failing = False   # report a write outage once, not on every retry
+        self.counters = {
+            "accepted": 0, "deduplicated": 0, "rate_limited_session": 0, "rate_limited_global": 0,
+            "rejected_oversize": 0, "written": 0, "updated": 0, "write_errors": 0, "dropped_pending": 0,
+        }
+
+    # ---------------------------------------------------------------- ingestion
+    def reject_oversize(self):
+        with self._lock:
+            self.counters["rejected_oversize"] += 1
+
+    def ingest(self, data):
+        """Returns (status, entry): status is "logged", "duplicate", "rate_limited_session" or
+        "rate_limited_global"; entry is the stored report (None when rate limited)."""
+        log_type = _truncate(data.get("error_type") or "Unknown", MAX_SHORT_FIELD_CHARS)
+        message = _truncate(data.get("error_message", "No message"), MAX_MESSAGE_CHARS)
+        session_id = _truncate(data.get("session_id") or "Unknown", MAX_SHORT_FIELD_CHARS)
+        stack_trace = data.get("stack_trace")
+        stack_trace = None if stack_trace in (None, "", "No stack trace") else _truncate(stack_trace, MAX_STACK_CHARS)
+        signature = error_signature(log_type, message, stack_trace)
+        now = time.monotonic()
+        received_at = datetime.utcnow()
+
+        with self._lock:
+            key = (session_id, signature)
+            recent = self._recent.get(key)
+            if recent is not None and now - recent[1] < DEDUP_WINDOW_SECONDS:
+                entry = recent[0]
+                entry["repeat_count"] += 1
+                entry["last_seen_at"] = received_at
+                if entry["id"] in self._written_counts:
+                    self._dirty[entry["id"]] = entry
+                self.counters["deduplicated"] += 1
+                return "duplicate", entry
+
+            bucket = self._session_buckets.get(session_id)
+            if bucket is None:
+                bucket = self._session_buckets[session_id] = _Bucket(SESSION_RATE_PER_SECOND, SESSION_BURST, now)
+                while len(self._session_buckets) > MAX_TRACKED_SESSIONS:
+                    self._session_buckets.popitem(last=False)
+            else:
+                self._session_buckets.move_to_end(session_id)
+            if not bucket.take(now):
+                self.counters["rate_limited_session"] += 1
+                return "rate_limited_session", None
+            if not self._global_bucket.take(now):
+                bucket.tokens += 1   # not this session's fault; give its token back
+                self.counters["rate_limited_global"] += 1
+                return "rate_limited_global", None
+
+            entry = {
+                "id": uuid.uuid4().hex,
+                "session_id": session_id,
+                "received_at": received_at,
+                "last_seen_at": received_at,
+                "repeat_count": 1,
+                "signature": signature,
+                "log_type": log_type,
+                "is_error": "ERROR" in log_type,   # same rule the /debug_log banner always used
+                "message": message,
+                "stack_trace": stack_trace,
+                "additional_context": _context_json(data.get("additional_context")),
+                "current_turn": _truncate(data.get("current_turn"), MAX_SHORT_FIELD_CHARS),
+                "client_timestamp": _truncate(data.get("timestamp"), MAX_SHORT_FIELD_CHARS),
+            }
+            self._recent[key] = (entry, now)
+            self._recent.move_to_end(key)
+            while len(self._recent) > MAX_TRACKED_SESSIONS:
+                self._recent.popitem(last=False)
+            self._ring.append(entry)
+            self._pending.append(entry)
+            if len(self._pending) > MAX_PENDING:
+                del self._pending[0]
+                self.counters["dropped_pending"] += 1
+            self.counters["accepted"] += 1
+            if len(self._pending) >= FLUSH_BATCH_SIZE:
+                self._wake.set()
+            return "logged", entry
+
+    # ------------------------------------------------------------------ writing
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._flush_loop, name="frontend-debug-writer", daemon=True)
+            self._thread.start()
+
+    def close(self, timeout=10.0):
+        """Stop the writer and write whatever is still pending (shutdown)."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def _flush_loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(FLUSH_SECONDS)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write pending inserts and repeat_count updates. Returns the number of rows written;
+        on a database error everything stays queued for the next attempt."""
+        with self._flush_lock:
+            with self._lock:
+                batch = self._pending[:FLUSH_BATCH_SIZE]
+                inserts = [dict(entry) for entry in batch]
+                dirty = list(self._dirty.values())
+                updates = [{"row_id": entry["id"], "repeat_count": entry["repeat_count"],
+                            "last_seen_at": entry["last_seen_at"]} for entry in dirty]
+                self._dirty.clear()
+            if not inserts and not updates:
+                return 0
+            table = self._model.__table__
+            db_session = self._session_factory()
+            try:
+                if inserts:
+                    db_session.execute(insert(table), inserts)
+                if updates:
+                    db_session.execute(
+                        update(table).where(table.c.id == bindparam("row_id")).values(
+                            repeat_count=bindparam("repeat_count"), last_seen_at=bindparam("last_seen_at")),
+                        updates,
+                    )
+                db_session.commit()
+            except Exception as e:
+                db_session.rollback()
+                with self._lock:
+                    self.counters["write_errors"] += 1
+                    for entry in dirty:
+                        self._dirty.setdefault(entry["id"], entry)
+                if not self._failing:
+                    print(f"⚠️ frontend_debug_logs write failed ({len(inserts)} new, {len(updates)} updates "
+                          f"kept for retry): {e}")
+                self._failing = True
+                return 0
+            finally:
+                db_session.close()
+
+            if self._failing:
+                print("✅ frontend_debug_logs writes recovered")
+                self._failing = False
+            with self._lock:
+                written = {entry["id"] for entry in batch}
+                self._pending = [entry for entry in self._pending if entry["id"] not in written]
+                for entry, row in zip(batch, inserts):
+                    self._written_counts[entry["id"]] = row["repeat_count"]
+                    if entry["repeat_count"] != row["repeat_count"]:   # repeated while we were writing
+                        self._dirty[entry["id"]] = entry
+                for row in updates:
+                    self._written_counts[row["row_id"]] = row["repeat_count"]
+                # Only entries still dedup candidates can receive further updates
+                live = {recent[0]["id"] for recent in self._recent.values()}
+                for row_id in [row_id for row_id in self._written_counts if row_id not in live]:
+                    del self._written_counts[row_id]
+                self.counters["written"] += len(inserts)
+                self.counters["updated"] += len(updates)
+            if len(self._pending) >= FLUSH_BATCH_SIZE:
+                self._wake.set()
+            return len(inserts) + len(updates)
+
+    # ------------------------------------------------------------------ reading
+    def recent(self, session_id=None, errors_only=False, limit=200):
+        """Newest-first reports from the ring buffer (this process only)."""
+        with self._lock:
+            entries = list(self._ring)
+        result = []
+        for entry in reversed(entries):
+            if session_id is not None and entry["session_id"] != session_id:
+                continue
+            if errors_only and not entry["is_error"]:
+                continue
+            result.append(dict(entry))
+            if len(result) >= limit:
+                break
+        return result
+
+    def query(self, session_id=None, errors_only=False, limit=200):
+        """Newest-first reports from frontend_debug_logs (all processes, all time). Pending
+        reports are flushed first so the result includes everything ingested so far."""
+        self.flush()
+        table = self._model.__table__
+        statement = select(table).order_by(table.c.received_at.desc()).limit(limit)
+        if session_id is not None:
+            statement = statement.where(table.c.session_id == session_id)
+        if errors_only:
+            statement = statement.where(table.c.is_error.is_(True))
+        db_session = self._session_factory()
+        try:
+            return [dict(row._mapping) for row in db_session.execute(statement)]
+        finally:
+            db_session.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self.counters,
+                "ring_entries": len(self._ring),
+                "pending": len(self._pending) + len(self._dirty),
+                "tracked_sessions": len(self._session_buckets),
+            }
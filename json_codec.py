@@ -0,0 +1,81 @@
+"""
+JSON encoding for database columns and API responses.
+
+Every poll renders a JSONResponse and every session save encodes the conversation /
+judgment logs (tens of KB per active session), so these go through one codec:
+
+  dumps(value) -> str      JSON / JSONB column binds, researcher export fields
+  dumpb(value) -> bytes    response bodies
+  loads(data)              str or bytes
+  FastJSONResponse         the app's default response class
+
+orjson is used when installed (see requirements.txt), else the stdlib json module with
+the same compact output. Both encode datetimes as ISO 8601 - session dicts carry
+start_time etc. as datetime objects, which the stdlib JSONResponse could not render.
+Anything orjson refuses (integers over 64 bits, nesting deeper than 254) is retried with
+the stdlib encoder rather than failing.
+
+Not routed through here: database.log_content_checksum (its canonical bytes must match
+checksums already stored) and the conversation history embedded in Gemini prompts (the
+prompt text must stay byte-identical across the study).
+"""
+import json
+from datetime import date, datetime, time
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:   # optional: stdlib fallback below
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def _default(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _stdlib_dumps(value):
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":"))
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumpb(value):
+        try:
+            return orjson.dumps(value, default=_default, option=_OPTIONS)
+        except orjson.JSONEncodeError:
+            return _stdlib_dumps(value).encode("utf-8")
+
+    def dumps(value):
+        return dumpb(value).decode("utf-8")
+
+    def dumps_pretty(value):
+        try:
+            return orjson.dumps(value, default=_default, option=_OPTIONS | orjson.OPT_INDENT_2).decode("utf-8")
+        except orjson.JSONEncodeError:
+            return json.dumps(value, default=_default, ensure_ascii=False, indent=2)
+
+    loads = orjson.loads   # raises orjson.JSONDecodeError, a json.JSONDecodeError / ValueError
+
+else:
+    def dumpb(value):
+        return _stdlib_dumps(value).encode("utf-8")
+
+    dumps = _stdlib_dumps
+
+    def dumps_pretty(value):
+        return json.dumps(value, default=_default, ensure_ascii=False, indent=2)
+
+    loads = json.loads
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by the codec (datetimes included)."""
+
+    def render(self, content):
+        return dumpb(content)
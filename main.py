@@ -2,9 +2,12 @@
 # main.py
 
 
-import numpy as np
 import time
+_IMPORT_STARTED = time.perf_counter()  # import cost is reported by /health/live
+import numpy as np
 import os
+import csv
+import io
 import json
 import uuid
 import random
@@ -13,10 +16,15 @@ import re
 import asyncio
 import threading
 import copy
+import atexit
+import signal
+import traceback
+from collections import deque
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 
 from fastapi import FastAPI, Request, Depends, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
@@ -25,6 +33,10 @@ from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime, timedelta
 import pytz
 
+import request_profiler  # installed as the innermost middleware right after app creation
+import json_codec
+from json_codec import FastJSONResponse
+
 
 # --- Configuration ---
 API_KEY = os.getenv("GEMINI_API_KEY")
@@ -194,7 +206,48 @@ INTERNET_USAGE_MAP = {1: "Less than 1 hour", 2: "1-5 hours", 3: "6-10 hours", 4:
 
 
 # --- Initialize FastAPI App ---
-app = FastAPI()
+# 19Oct26: schema checks, journal replay, checkpoint restore, the interrupted sweep and the
+# Gemini client used to run at import, before uvicorn could even bind. They now run in the
+# background once the server is up (see run_startup); /health/live answers immediately,
+# /health/ready and the request gate below wait for startup to finish.
+startup_complete = threading.Event()
+startup_failed = threading.Event()   # gate stays closed (503) and the process exits non-zero
+startup_state = {"ready": False, "seconds": None, "steps": {}, "schema": None, "error": None}
+STARTUP_GATE_TIMEOUT_SECONDS = float(os.getenv("STARTUP_GATE_TIMEOUT_SECONDS", "30"))
+
+
+@asynccontextmanager
+async def lifespan(app):
+    install_drain_signal_handlers()
+    study_log.start_log_writer()
+    request_profiler.install(app, asyncio.get_running_loop(), db.engine)
+    startup_task = asyncio.create_task(run_startup())
+    startup_task.add_done_callback(_shut_down_after_failed_startup)
+    try:
+        yield
+    finally:
+        server_draining.set()
+        if not startup_task.done():
+            await asyncio.wait({startup_task}, timeout=30)
+        # Never write a checkpoint before this boot has taken the previous one
+        if "restore_checkpoint" in startup_state["steps"]:
+            await asyncio.to_thread(checkpoint_sessions_for_restart)
+        await asyncio.to_thread(frontend_debug_store.close)
+        await asyncio.to_thread(study_log.stop_log_writer)   # write out anything still queued
+        if startup_failed.is_set() and threading.current_thread() is threading.main_thread():
+            # uvicorn exits 0 after a clean shutdown; a failed start must exit non-zero so
+            # Railway's ON_FAILURE restart policy brings up a fresh process.
+            await asyncio.to_thread(session_journal.close)
+            print(f"🛑 EXITING ({STARTUP_FAILURE_EXIT_CODE}) after failed startup: {startup_state['error']}")
+            os._exit(STARTUP_FAILURE_EXIT_CODE)
+
+
+# 19Oct26: responses (returned dicts included) are rendered by json_codec (orjson when installed)
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+# 19Oct26: opt-in per-request profiles (PROFILE_SAMPLE_PERCENT, or X-Profile-Token: <admin
+# token>); see request_profiler.py and /admin/profiles. Added first so it is the innermost
+# middleware and runs in the same task as the endpoint.
+app.add_middleware(request_profiler.ProfilingMiddleware)
 origins = [
     "https://imnmv.github.io",  # Old frontend domain
     "https://research-studies.github.io",  # New organization frontend
@@ -208,6 +261,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"], # Allows all methods (GET, POST, etc.)
     allow_headers=["*"], # Allows all headers
+    expose_headers=["ETag", "X-Next-Poll-After-Ms"],  # 19Oct26: poll revalidation + hints (poll_hints.py)
 )
 
 # FIX D1b (03Aug26): navigator.sendBeacon payloads are sent as text/plain so the
@@ -217,24 +271,98 @@ app.add_middleware(
 _BEACON_JSON_PATHS = ("/submit_rating", "/submit_witness_final_choice",
                       "/submit_interrogator_final_choice", "/report_abandonment")
 
-@app.middleware("http")
-async def _beacon_content_type_fix(request, call_next):
-    if (request.url.path in _BEACON_JSON_PATHS
-            and request.headers.get("content-type", "").startswith("text/plain")):
-        request.scope["headers"] = [
-            (k, v) if k != b"content-type" else (b"content-type", b"application/json")
-            for (k, v) in request.scope["headers"]
-        ]
-    return await call_next(request)
+# 19Oct26: both gates are plain ASGI middleware rather than @app.middleware("http")
+# (BaseHTTPMiddleware), which ran every request - polls included - through an extra task
+# and a streamed body wrapper just to look at the path.
+class _BeaconContentTypeFix:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in _BEACON_JSON_PATHS:
+            headers = scope["headers"]
+            if any(k == b"content-type" and v.startswith(b"text/plain") for (k, v) in headers):
+                scope["headers"] = [
+                    (k, v) if k != b"content-type" else (b"content-type", b"application/json")
+                    for (k, v) in headers
+                ]
+        await self.app(scope, receive, send)
+
+
+class _WaitForStartup:
+    """Hold requests that arrive while startup is still running (health checks excepted)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not startup_complete.is_set() and not scope["path"].startswith("/health"):
+            deadline = time.monotonic() + STARTUP_GATE_TIMEOUT_SECONDS
+            while not startup_complete.is_set():
+                if startup_failed.is_set():
+                    response = FastJSONResponse(status_code=503, content={"detail": "Server failed to start, please retry shortly"})
+                    return await response(scope, receive, send)
+                if time.monotonic() >= deadline:
+                    response = FastJSONResponse(status_code=503, content={"detail": "Server is starting, please retry in a moment"})
+                    return await response(scope, receive, send)
+                await asyncio.sleep(0.05)
+        await self.app(scope, receive, send)
+
+
+app.add_middleware(_BeaconContentTypeFix)
+app.add_middleware(_WaitForStartup)
 # Note: Frontend is hosted separately (GitHub Pages). If you need to
 # serve a local UI, mount static files and templates explicitly.
 # app.mount("/static", StaticFiles(directory="interaction-study-main-2/static"), name="static")
 # templates = Jinja2Templates(directory="interaction-study-main-2")
 
 # --- Database Imports ---
-from sqlalchemy import text, or_, and_
+from sqlalchemy import text, or_, and_, func, select, update, case, cast, extract, literal, DateTime, Numeric
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 import database as db
+import sql_timing
+from session_journal import SessionJournal
+import session_checkpoint
+from session_cache import SessionCache
+from status_snapshot import SnapshotCache
+import study_log
+import frontend_debug
+import poll_hints
+import turn_trace
+import metrics
+
+# 19Oct26: /metrics instruments (exposition in metrics.py). Children for fixed label values
+# are resolved once here so the hot paths only do an observe().
+send_message_stage_seconds = metrics.histogram(
+    "send_message_stage_seconds", "Time spent in each send_message stage.", ("stage",),
+)
+SEND_MESSAGE_STAGES = {
+    stage: send_message_stage_seconds.labels(stage)
+    for stage in ("tactic_llm", "response_llm", "pacing_sleep", "journal_enqueue")
+}
+gemini_calls_total = metrics.counter(
+    "gemini_calls_total", "Gemini generate_content attempts by outcome.", ("call", "model", "outcome"),
+)
+gemini_call_seconds = metrics.histogram(
+    "gemini_call_seconds", "Latency of one Gemini generate_content attempt.", ("call", "model"),
+)
+gemini_queue_wait_seconds = metrics.histogram(
+    "gemini_queue_wait_seconds", "Wait for a thread-pool worker before a Gemini call started.",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+ai_turn_target_delay_total = metrics.counter(
+    "ai_turn_target_delay_total", "AI turns whose backend time was within / exceeded the target visible delay.",
+    ("outcome",),
+)
+gemini_fallbacks_total = metrics.counter(
+    "gemini_fallbacks_total", "Primary-model failures: switched to fallback, recovered, all_failed.", ("result",),
+)
+match_attempt_seconds = metrics.histogram(
+    "match_attempt_seconds", "attempt_match latency including the matching_lock wait.", ("outcome",),
+)
+# Added last = outermost, so request latency includes the startup gate and beacon rewrite.
+app.add_middleware(metrics.RequestMetricsMiddleware)
 
 # --- Database Dependency ---
 def get_db():
@@ -275,9 +403,9 @@ def _create_initial_session_record_once(session_data, db_session: Session):
             social_style=session_data.get("social_style"),
             domain=session_data["assigned_domain"],
             condition=session_data["experimental_condition"],
-            user_profile_survey=json.dumps(session_data["initial_user_profile_survey"]),
+            user_profile_survey=session_data["initial_user_profile_survey"],
             initial_tactic_analysis=session_data["initial_tactic_analysis"]["full_analysis"],
-            ui_event_log=json.dumps(ui_events),
+            ui_event_log=ui_events,
             consent_accepted=consent_accepted,
             session_status="active",
             study_mode=STUDY_MODE,
@@ -293,146 +421,313 @@ def _create_initial_session_record_once(session_data, db_session: Session):
         db_session.rollback()
         return False
 
-def update_session_after_message(session_data, db_session: Session):
-    """Update database record after each conversation turn"""
-    try:
-        session_record = db_session.query(db.StudySession).filter(db.StudySession.id == session_data["session_id"]).first()
-        if not session_record:
-            # FIX F4 (01Aug26): loud + self-heal — if the initial create failed, the row
-            # is missing and every save used to silently no-op. Recreate it now.
-            print(f"🚨 SESSION ROW MISSING at turn save | session {session_data.get('session_id', '?')[:8]}... | attempting recreate")
-            if create_initial_session_record(session_data, db_session):
-                session_record = db_session.query(db.StudySession).filter(db.StudySession.id == session_data["session_id"]).first()
-        if session_record:
-            # Robustness: any saved turn means the conversation phase was reached, even if
-            # /log_conversation_start never landed. This keeps not-collected tracking alive.
-            if session_data.get("conversation_log"):
-                mark_conversation_phase_reached(session_record)
-            session_record.conversation_log = json.dumps(session_data["conversation_log"])
-            session_record.tactic_selection_log = json.dumps(session_data["tactic_selection_log"])
-            session_record.ai_researcher_notes = json.dumps(session_data["ai_researcher_notes_log"])
-            session_record.interrogator_turn_judgment_log = json.dumps(session_data.get("intermediate_ddm_confidence_ratings", []))
-            session_record.ui_event_log = json.dumps(session_data.get("ui_event_log", []))
-            update_suspicious_behavior_summary(session_record, session_data.get("ui_event_log", []))
-            session_record.last_updated = datetime.utcnow()
-            db_session.commit()
-            # Read-after-write confirmation so Railway logs visibly show the turn persisted.
-            turns_in_db = 0
-            try:
-                turns_in_db = len(json.loads(session_record.conversation_log)) if session_record.conversation_log else 0
-            except Exception:
-                turns_in_db = -1
-            print(f"💾✅ TURN SAVED | session {session_data['session_id'][:8]}... | "
-                  f"turn {session_data.get('turn_count','?')} | conversation turns in DB: {turns_in_db}")
-            return True
-    except Exception as e:
-        print(f"💾🛑❌ TURN SAVE FAILED | session {session_data.get('session_id','?')[:8]}... | {e}")
-        db_session.rollback()
-        return False
+INTEGRITY_COLUMNS = ("turn_count", "rating_count", "content_checksum")
 
-def update_session_after_rating(session_data, db_session: Session, is_final=False):
-    """Update database record after each rating submission"""
-    try:
-        session_record = db_session.query(db.StudySession).filter(db.StudySession.id == session_data["session_id"]).first()
-        if not session_record:
-            # FIX F4 (01Aug26): same self-heal as update_session_after_message
-            print(f"🚨 SESSION ROW MISSING at rating save | session {session_data.get('session_id', '?')[:8]}... | attempting recreate")
-            if create_initial_session_record(session_data, db_session):
-                session_record = db_session.query(db.StudySession).filter(db.StudySession.id == session_data["session_id"]).first()
-        if session_record:
-            # Always update confidence ratings and timing data
-            session_record.ddm_confidence_ratings = json.dumps(session_data["intermediate_ddm_confidence_ratings"])
-            session_record.interrogator_turn_judgment_log = json.dumps(session_data["intermediate_ddm_confidence_ratings"])
-            session_record.feels_off_comments = json.dumps(session_data["feels_off_data"])
-            session_record.ui_event_log = json.dumps(session_data.get("ui_event_log", []))
-            update_suspicious_behavior_summary(session_record, session_data.get("ui_event_log", []))
-            
-            # Update pure DDM data if present
-            if "pure_ddm_decision" in session_data:
-                session_record.pure_ddm_decision = session_data["pure_ddm_decision"]
-                session_record.pure_ddm_timestamp = session_data["pure_ddm_timestamp"]
-                session_record.pure_ddm_turn_number = session_data["pure_ddm_turn_number"]
-                session_record.pure_ddm_decision_time_seconds = session_data["pure_ddm_decision_time_seconds"]
-
-            if "first_confidence_slider_endpoint_value_percent" in session_data:
-                session_record.first_confidence_slider_endpoint_value_percent = session_data["first_confidence_slider_endpoint_value_percent"]
-                session_record.first_confidence_slider_endpoint_choice = session_data["first_confidence_slider_endpoint_choice"]
-                session_record.first_confidence_slider_endpoint_timestamp = session_data["first_confidence_slider_endpoint_timestamp"]
-                session_record.first_confidence_slider_endpoint_turn_number = session_data["first_confidence_slider_endpoint_turn_number"]
-                session_record.first_confidence_slider_endpoint_decision_time_seconds = session_data["first_confidence_slider_endpoint_decision_time_seconds"]
-            
-            # If this is the final rating (study completed)
-            if is_final:
-                set_interrogator_final_response(
-                    session_record,
-                    session_data.get("final_binary_choice"),
-                    session_data.get("final_confidence_percent"),
-                    session_data.get("final_decision_time_seconds_ddm"),
-                    session_data.get("final_response_reason", "time_expired")
-                )
-                session_record.session_status = "completed"
-                
-                # Calculate and save study time (use conversation start if available)
-                conversation_start = session_data.get("conversation_start_time")
-                session_start = session_data.get("session_start_time", time.time())
-                
-                if conversation_start:
-                    conversation_elapsed = time.time() - conversation_start
-                    conversation_minutes = conversation_elapsed / 60
-                    session_record.total_study_time_minutes = conversation_minutes
-                    session_record.forced_completion = conversation_minutes >= 7.5
-                else:
-                    # Fallback to session start time
-                    elapsed_seconds = time.time() - session_start
-                    elapsed_minutes = elapsed_seconds / 60
-                    session_record.total_study_time_minutes = elapsed_minutes
-                    session_record.forced_completion = elapsed_minutes >= 7.5
-                
-                # Extract current turn's enhanced timing data
-                current_rating = session_data["intermediate_ddm_confidence_ratings"][-1] if session_data["intermediate_ddm_confidence_ratings"] else {}
-                session_record.reading_time_seconds = current_rating.get("reading_time_seconds")
-                session_record.active_decision_time_seconds = current_rating.get("active_decision_time_seconds")
-                session_record.slider_interaction_log = json.dumps(current_rating.get("slider_interaction_log")) if current_rating.get("slider_interaction_log") else None
-                session_record.reading_first_mouse_move_ms = current_rating.get("reading_first_mouse_move_ms")
-                session_record.reading_first_scroll_ms = current_rating.get("reading_first_scroll_ms")
-                session_record.reading_first_keypress_ms = current_rating.get("reading_first_keypress_ms")
-                session_record.reading_mouse_move_count = current_rating.get("reading_mouse_move_count")
-                session_record.reading_scroll_count = current_rating.get("reading_scroll_count")
-                session_record.reading_keypress_count = current_rating.get("reading_keypress_count")
-                session_record.mouse_trajectory = json.dumps(current_rating.get("mouse_trajectory")) if current_rating.get("mouse_trajectory") else None
-            
-            session_record.last_updated = datetime.utcnow()
-            db_session.commit()
+# Columns log_data_integrity_banner() reads; a final save returns exactly these so the
+# banner needs no second round trip.
+INTEGRITY_BANNER_COLUMNS = (
+    "id", "role", "study_mode", "session_status", "turn_count", "rating_count",
+    "witness_final_partner_belief", "witness_final_response_collected",
+    "interrogator_final_binary_choice", "interrogator_final_confidence_percent",
+    "interrogator_final_response_collected",
+)
 
-            # --- Read-after-write confirmation that this rating actually persisted ---
-            # Re-read the row from the DB (not the in-memory ORM object) so the log
-            # reflects what is truly stored, not just what we attempted to write.
-            db_session.refresh(session_record)
-            ratings_in_memory = session_data.get("intermediate_ddm_confidence_ratings", []) or []
-            try:
-                ratings_in_db = json.loads(session_record.interrogator_turn_judgment_log) if session_record.interrogator_turn_judgment_log else []
-            except Exception:
-                ratings_in_db = []
-            latest = ratings_in_memory[-1] if ratings_in_memory else {}
-
-            if len(ratings_in_db) >= len(ratings_in_memory) and len(ratings_in_memory) > 0:
-                print(f"⭐💾✅ RATING SAVED & VERIFIED | session {session_data['session_id'][:8]}... | "
-                      f"turn {latest.get('turn','?')} | choice={latest.get('binary_choice','?')} "
-                      f"conf={latest.get('confidence_percent', latest.get('confidence','?'))}% | "
-                      f"ratings persisted in DB: {len(ratings_in_db)} | final={is_final}")
-            else:
-                print(f"🛑❌ RATING SAVE MISMATCH | session {session_data['session_id'][:8]}... | "
-                      f"in-memory ratings={len(ratings_in_memory)} but DB has {len(ratings_in_db)} "
-                      f"— POSSIBLE DATA LOSS, INVESTIGATE | final={is_final}")
+# How long a FINAL rating waits for its journal entry to reach the database before the
+# request reports failure (the entry itself stays journaled and keeps retrying).
+JOURNAL_FINAL_WAIT_SECONDS = float(os.getenv("SESSION_JOURNAL_FINAL_WAIT_SECONDS", "8"))
 
-            # On the final rating, print the big end-of-conversation integrity banner.
-            if is_final:
-                log_data_integrity_banner(session_record, db_session, context="interrogator_final_rating")
-            return True
-    except Exception as e:
-        print(f"🛑❌ RATING SAVE FAILED | session {session_data.get('session_id','?')[:8]}... | final={is_final} | {e}")
+
+def log_integrity_values(conversation_log, ratings):
+    """Counters + checksum describing the logs written by a full save."""
+    return {
+        "turn_count": len(conversation_log or []),
+        "rating_count": len(ratings or []),
+        "content_checksum": db.log_content_checksum(conversation_log, ratings),
+    }
+
+
+def message_count_values(conversation_log, role):
+    """messages_sent / messages_received for the conversation_log being written."""
+    sent, received = db.conversation_message_counts(conversation_log, role)
+    return {"messages_sent": sent, "messages_received": received}
+
+
+def journal_seq_condition(seq):
+    """Apply a journal entry only if nothing newer was applied to the row (idempotent replay)."""
+    return or_(db.StudySession.journal_seq.is_(None), db.StudySession.journal_seq < seq)
+
+
+def save_session_values(session_data, db_session: Session, values, what, returning=INTEGRITY_COLUMNS, journal_seq=None):
+    """Write values to the session row in ONE UPDATE ... RETURNING (caller commits).
+
+    With journal_seq, the UPDATE is conditional on journal_seq_condition() and stamps the
+    row with it. Returns the RETURNING row; None if that entry was already applied/superseded.
+    Raises LookupError if the row is missing and could not be recreated.
+    """
+    table = db.StudySession.__table__
+    where = [table.c.id == session_data["session_id"]]
+    if journal_seq is not None:
+        where.append(journal_seq_condition(journal_seq))
+        values = {**values, "journal_seq": journal_seq}
+    stmt = (
+        update(table)
+        .where(*where)
+        .values(values)
+        .returning(*[table.c[name] for name in returning])
+    )
+    row = db_session.execute(stmt).first()
+    if row is not None:
+        return row
+    if db_session.execute(select(table.c.id).where(table.c.id == session_data["session_id"])).first():
+        return None  # a newer journal entry already landed on this row
+
+    # FIX F4 (01Aug26): loud + self-heal — if the initial create failed, the row
+    # is missing and every save used to silently no-op. Recreate it now.
+    print(f"🚨 SESSION ROW MISSING at {what} save | session {session_data.get('session_id', '?')[:8]}... | attempting recreate")
+    db_session.rollback()
+    if create_initial_session_record(session_data, db_session):
+        row = db_session.execute(stmt).first()
+    if row is None:
+        raise LookupError(f"study_sessions row {session_data.get('session_id')} missing and could not be recreated")
+    return row
+
+
+def integrity_matches(row, values):
+    """True when the RETURNING row carries exactly the counters/checksum this save wrote."""
+    return all(getattr(row, name) == values[name] for name in INTEGRITY_COLUMNS)
+
+
+def derive_integrity_values(data):
+    """Journal prepare hook for session_values entries: fills in the integrity counters,
+    checksum and UI-event summary from the journal's detached copy of the logs, so they
+    describe exactly the logs written (and are computed off the event loop)."""
+    values = data["values"]
+    conversation_log = data.pop("integrity_conversation_log", None)
+    if conversation_log is None:
+        conversation_log = values.get("conversation_log") or []
+    ratings = values.get("interrogator_turn_judgment_log") or []
+    if "ui_event_log" in values:
+        values.update(suspicious_behavior_summary_values(values["ui_event_log"] or []))
+    values.update(log_integrity_values(conversation_log, ratings))
+    if "message_count_role" in data:
+        values.update(message_count_values(conversation_log, data.pop("message_count_role")))
+
+
+async def update_session_after_message(session_data, traced_turn=None):
+    """Journal the post-turn snapshot of the session's logs.
+
+    19Oct26: the write goes through session_journal (fsync'd locally, applied to the DB
+    in the background by apply_journaled_session_values), so the turn no longer waits on
+    the commit and is not lost if the database is briefly unavailable. traced_turn: the AI
+    turn whose trace gets journal_enqueue_seconds (time until the snapshot was encoded)."""
+    enqueue_started = time.perf_counter()
+    conversation_log = session_data["conversation_log"]
+    values = {
+        "conversation_log": conversation_log,
+        "tactic_selection_log": session_data["tactic_selection_log"],
+        "ai_researcher_notes": session_data["ai_researcher_notes_log"],
+        "interrogator_turn_judgment_log": session_data.get("intermediate_ddm_confidence_ratings", []),
+        "ui_event_log": session_data.get("ui_event_log", []),
+        "last_updated": datetime.utcnow(),
+    }
+    return await session_journal.record_async("session_values", session_data["session_id"], {
+        "what": "turn",
+        "turn": session_data.get("turn_count"),
+        "values": values,
+        "message_count_role": session_data.get("role"),
+        # Robustness: any saved turn means the conversation phase was reached, even if
+        # /log_conversation_start never landed. This keeps not-collected tracking alive.
+        "mark_conversation_phase": bool(conversation_log),
+    }, prepare=derive_integrity_values if traced_turn is None else
+        lambda data: stamp_journal_enqueue(data, traced_turn, enqueue_started))
+
+
+def stamp_journal_enqueue(data, traced_turn, enqueue_started):
+    """Prepare hook for a traced AI turn: writes journal_enqueue_seconds into the turn's
+    trace, in the live turn and in the journaled copy, before the integrity values are
+    derived from that copy."""
+    seconds = round(time.perf_counter() - enqueue_started, 4)
+    traced_turn["timing"]["trace"]["journal_enqueue_seconds"] = seconds
+    for entry in reversed(data["values"]["conversation_log"]):
+        if entry.get("turn") == traced_turn.get("turn") and not entry.get("sender_role"):
+            entry["timing"]["trace"]["journal_enqueue_seconds"] = seconds
+            break
+    derive_integrity_values(data)
+
+async def update_session_after_rating(session_data, is_final=False):
+    """Journal the post-rating snapshot. Non-final ratings return once journaled; the
+    FINAL rating waits until the applier has confirmed it in the database."""
+    ratings = session_data["intermediate_ddm_confidence_ratings"]
+    # Always update confidence ratings and timing data
+    values = {
+        "ddm_confidence_ratings": ratings,
+        "interrogator_turn_judgment_log": ratings,
+        "feels_off_comments": session_data["feels_off_data"],
+        "ui_event_log": session_data.get("ui_event_log", []),
+    }
+
+    # Update pure DDM data if present
+    if "pure_ddm_decision" in session_data:
+        values["pure_ddm_decision"] = session_data["pure_ddm_decision"]
+        values["pure_ddm_timestamp"] = session_data["pure_ddm_timestamp"]
+        values["pure_ddm_turn_number"] = session_data["pure_ddm_turn_number"]
+        values["pure_ddm_decision_time_seconds"] = session_data["pure_ddm_decision_time_seconds"]
+
+    if "first_confidence_slider_endpoint_value_percent" in session_data:
+        values["first_confidence_slider_endpoint_value_percent"] = session_data["first_confidence_slider_endpoint_value_percent"]
+        values["first_confidence_slider_endpoint_choice"] = session_data["first_confidence_slider_endpoint_choice"]
+        values["first_confidence_slider_endpoint_timestamp"] = session_data["first_confidence_slider_endpoint_timestamp"]
+        values["first_confidence_slider_endpoint_turn_number"] = session_data["first_confidence_slider_endpoint_turn_number"]
+        values["first_confidence_slider_endpoint_decision_time_seconds"] = session_data["first_confidence_slider_endpoint_decision_time_seconds"]
+
+    # If this is the final rating (study completed)
+    if is_final:
+        values.update(interrogator_final_response_values(
+            session_data.get("final_binary_choice"),
+            session_data.get("final_confidence_percent"),
+            session_data.get("final_decision_time_seconds_ddm"),
+            session_data.get("final_response_reason", "time_expired")
+        ))
+        values["session_status"] = "completed"
+
+        # Calculate and save study time (use conversation start if available)
+        conversation_start = session_data.get("conversation_start_time")
+        session_start = session_data.get("session_start_time", time.time())
+
+        if conversation_start:
+            conversation_elapsed = time.time() - conversation_start
+            conversation_minutes = conversation_elapsed / 60
+            values["total_study_time_minutes"] = conversation_minutes
+            values["forced_completion"] = conversation_minutes >= 7.5
+        else:
+            # Fallback to session start time
+            elapsed_seconds = time.time() - session_start
+            elapsed_minutes = elapsed_seconds / 60
+            values["total_study_time_minutes"] = elapsed_minutes
+            values["forced_completion"] = elapsed_minutes >= 7.5
+
+        # Extract current turn's enhanced timing data
+        current_rating = ratings[-1] if ratings else {}
+        values["reading_time_seconds"] = current_rating.get("reading_time_seconds")
+        values["active_decision_time_seconds"] = current_rating.get("active_decision_time_seconds")
+        values["slider_interaction_log"] = current_rating.get("slider_interaction_log") or None
+        values["reading_first_mouse_move_ms"] = current_rating.get("reading_first_mouse_move_ms")
+        values["reading_first_scroll_ms"] = current_rating.get("reading_first_scroll_ms")
+        values["reading_first_keypress_ms"] = current_rating.get("reading_first_keypress_ms")
+        values["reading_mouse_move_count"] = current_rating.get("reading_mouse_move_count")
+        values["reading_scroll_count"] = current_rating.get("reading_scroll_count")
+        values["reading_keypress_count"] = current_rating.get("reading_keypress_count")
+        values["mouse_trajectory"] = current_rating.get("mouse_trajectory") or None
+
+    values["last_updated"] = datetime.utcnow()
+
+    saved = await session_journal.record_async("session_values", session_data["session_id"], {
+        "what": "rating",
+        "turn": session_data.get("turn_count"),
+        "is_final": is_final,
+        "values": values,
+        # The checksum covers the conversation log too; it is not rewritten by a rating.
+        "integrity_conversation_log": session_data.get("conversation_log", []),
+    }, wait=is_final, timeout=JOURNAL_FINAL_WAIT_SECONDS, prepare=derive_integrity_values)
+    if is_final and not saved:
+        print(f"🛑❌ RATING SAVE NOT CONFIRMED | session {session_data.get('session_id','?')[:8]}... | final=True | "
+              f"still journaled, applier retrying")
+    return saved
+
+
+def apply_journaled_session_values(db_session: Session, entry):
+    """Journal applier for full turn/rating snapshots (see update_session_after_*)."""
+    data = entry["data"]
+    session_id = entry["session_id"]
+    what = data["what"]
+    is_final = data.get("is_final", False)
+    values = dict(data["values"])
+    if data.get("mark_conversation_phase"):
+        values.update(conversation_phase_values())
+
+    returning = INTEGRITY_COLUMNS + (INTEGRITY_BANNER_COLUMNS if is_final else ())
+    row = save_session_values(sessions.get(session_id) or {"session_id": session_id}, db_session,
+                              values, what, returning=returning, journal_seq=entry["seq"])
+    if row is None:
         db_session.rollback()
-        return False
+        print(f"↩️ JOURNAL {what} save for {session_id[:8]}... superseded by a newer entry (seq {entry['seq']})")
+        return True
+    db_session.commit()
+
+    # Read-after-write confirmation comes from the UPDATE's RETURNING row (stored
+    # counters + checksum written in the same statement), not a re-read of the logs.
+    if what == "turn":
+        if integrity_matches(row, values):
+            print(f"💾✅ TURN SAVED | session {session_id[:8]}... | "
+                  f"turn {data.get('turn','?')} | conversation turns in DB: {row.turn_count}")
+        else:
+            print(f"💾🛑❌ TURN SAVE MISMATCH | session {session_id[:8]}... | "
+                  f"wrote {values['turn_count']} turns but row reports {row.turn_count} "
+                  f"(checksum {'ok' if row.content_checksum == values['content_checksum'] else 'DIFFERS'}) — INVESTIGATE")
+        return True
+
+    ratings = values["interrogator_turn_judgment_log"] or []
+    latest = ratings[-1] if ratings else {}
+    if integrity_matches(row, values) and row.rating_count > 0:
+        print(f"⭐💾✅ RATING SAVED & VERIFIED | session {session_id[:8]}... | "
+              f"turn {latest.get('turn','?')} | choice={latest.get('binary_choice','?')} "
+              f"conf={latest.get('confidence_percent', latest.get('confidence','?'))}% | "
+              f"ratings persisted in DB: {row.rating_count} | final={is_final}")
+    else:
+        print(f"🛑❌ RATING SAVE MISMATCH | session {session_id[:8]}... | "
+              f"in-memory ratings={len(ratings)} but DB has {row.rating_count} "
+              f"— POSSIBLE DATA LOSS, INVESTIGATE | final={is_final}")
+
+    # On the final rating, print the big end-of-conversation integrity banner.
+    if is_final:
+        log_data_integrity_banner(row, db_session, context="interrogator_final_rating", do_refresh=False)
+    return True
+
+
+def apply_journaled_json_append(db_session: Session, entry):
+    """Journal applier for single-item log appends (UI events, received turns)."""
+    data = entry["data"]
+    values = dict(data.get("values") or {})
+    if data.get("mark_conversation_phase"):
+        values.update(conversation_phase_values())
+    values["journal_seq"] = entry["seq"]
+    summarize = data.get("summarize_ui_events", False)
+
+    log = db.append_json_log(db_session, entry["session_id"], data["column"], data["items"], values,
+                             returning=summarize, condition=journal_seq_condition(entry["seq"]))
+    if log is None:
+        # No row yet (event before the pre-consent record exists) or already applied.
+        db_session.rollback()
+        return True
+    if summarize:
+        db_session.execute(
+            update(db.StudySession.__table__)
+            .where(db.StudySession.id == entry["session_id"])
+            .values(suspicious_behavior_summary_values(log))
+        )
+    db_session.commit()
+    return True
+
+
+session_journal = SessionJournal(
+    os.getenv("SESSION_JOURNAL_PATH", "./session_journal.jsonl"),
+    db.SessionLocal,
+    appliers={
+        "session_values": apply_journaled_session_values,
+        "json_append": apply_journaled_json_append,
+    },
+    fsync_interval=float(os.getenv("SESSION_JOURNAL_FSYNC_MS", "20")) / 1000,
+    apply_workers=int(os.getenv("SESSION_JOURNAL_APPLY_WORKERS", "4")),
+)
+atexit.register(session_journal.close)
+
+
+def _stored_log_count(record, counter, log_column):
+    """Stored integrity counter, falling back to the log length if it was never filled."""
+    count = getattr(record, counter, None)
+    if count is None:
+        count = len(getattr(record, log_column, None) or [])
+    return count
 
 
 def log_data_integrity_banner(session_record, db_session: Session, context: str = "conversation_end", do_refresh: bool = True):
@@ -440,11 +735,19 @@ def log_data_integrity_banner(session_record, db_session: Session, context: str
     critical data is fully saved. By default re-reads from the DB (read-after-write) so the
     banner reflects committed state — pass do_refresh=False when called mid-transaction
     (before commit) so pending in-memory values are shown instead of being reverted.
+    The re-read is a narrow SELECT of INTEGRITY_BANNER_COLUMNS (stored counters, not the
+    logs); session_record may also be a RETURNING row carrying those columns.
     Role-aware: interrogators need a final binary+confidence judgment; witnesses need a
     final partner belief."""
     if do_refresh:
         try:
-            db_session.refresh(session_record)
+            table = db.StudySession.__table__
+            fresh = db_session.execute(
+                select(*[table.c[name] for name in INTEGRITY_BANNER_COLUMNS])
+                .where(table.c.id == session_record.id)
+            ).first()
+            if fresh is not None:
+                session_record = fresh
         except Exception:
             pass
 
@@ -452,14 +755,8 @@ def log_data_integrity_banner(session_record, db_session: Session, context: str
     role = session_record.role or "interrogator"
     mode = session_record.study_mode or "?"
 
-    try:
-        turns = len(json.loads(session_record.conversation_log)) if session_record.conversation_log else 0
-    except Exception:
-        turns = -1
-    try:
-        per_turn_ratings = len(json.loads(session_record.interrogator_turn_judgment_log)) if session_record.interrogator_turn_judgment_log else 0
-    except Exception:
-        per_turn_ratings = -1
+    turns = _stored_log_count(session_record, "turn_count", "conversation_log")
+    per_turn_ratings = _stored_log_count(session_record, "rating_count", "interrogator_turn_judgment_log")
 
     if role == "witness":
         belief = session_record.witness_final_partner_belief
@@ -484,7 +781,21 @@ def log_data_integrity_banner(session_record, db_session: Session, context: str
     status_ok = (session_record.session_status == "completed")
     all_ok = all(ok for _, ok, _ in checks)
 
-    if all_ok and status_ok:
+    # 19Oct26: structured record; the banner below is rendered on the log writer thread.
+    study_log.log_event(
+        "data_integrity",
+        "study data complete" if all_ok and status_ok else "study data incomplete",
+        level=study_log.INFO if all_ok and status_ok else study_log.ERROR,
+        session_id=sid, role=role, study_mode=mode, context=context,
+        session_status=session_record.session_status, status_ok=status_ok,
+        turns_saved=turns, ratings_saved=per_turn_ratings, final_summary=final_summary,
+        complete=all_ok and status_ok, checks=[[name, ok, val] for name, ok, val in checks],
+    )
+
+
+@study_log.renderer("data_integrity")
+def render_data_integrity_banner(message, fields):
+    if fields["complete"]:
         head = "🎉🟢✅ STUDY DATA COMPLETE — ALL CRITICAL FIELDS SAVED ✅🟢🎉"
     else:
         head = "🚨🔴❌ STUDY DATA INCOMPLETE — MISSING FINAL DATA ❌🔴🚨"
@@ -494,17 +805,16 @@ def log_data_integrity_banner(session_record, db_session: Session, context: str
         "╔══════════════════════════════════════════════════════════════╗",
         f"  {head}",
         "╠══════════════════════════════════════════════════════════════╣",
-        f"  session {sid}... | role={role} | mode={mode} | context={context}",
-        f"  session_status={session_record.session_status}  (need 'completed': {'✅' if status_ok else '❌'})",
-        f"  conversation turns saved: {turns} | per-turn ratings saved: {per_turn_ratings}",
-        f"  final judgment: {final_summary}",
+        f"  session {fields['session_id']}... | role={fields['role']} | mode={fields['study_mode']} | context={fields['context']}",
+        f"  session_status={fields['session_status']}  (need 'completed': {'✅' if fields['status_ok'] else '❌'})",
+        f"  conversation turns saved: {fields['turns_saved']} | per-turn ratings saved: {fields['ratings_saved']}",
+        f"  final judgment: {fields['final_summary']}",
         "  ── field-by-field ──",
     ]
-    for name, ok, val in checks:
+    for name, ok, val in fields["checks"]:
         lines.append(f"     {'✅' if ok else '❌'} {name}: {val}")
     lines.append("╚══════════════════════════════════════════════════════════════╝")
-    lines.append("")
-    print("\n".join(lines))
+    return "\n".join(lines) + "\n"
 
 
 def log_incomplete_final_banner_if_conversation_phase(session_record, db_session: Session, reason: str):
@@ -537,9 +847,139 @@ def flag_session_as_recovered(session_id: str, db_session: Session):
         return False
 
 # --- Session Management (In-memory for active sessions) ---
-sessions: Dict[str, Dict[str, Any]] = {}
+# 19Oct26: bounded, idle-evicting caches (were plain dicts pruned only after an interrogator's
+# final rating, so everything else stayed resident for the life of the process). An evicted
+# session is rebuilt from study_sessions by recover_session_from_database() on its next request.
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "2000"))
+SESSION_CACHE_IDLE_TTL_SECONDS = int(os.getenv("SESSION_CACHE_IDLE_TTL_SECONDS", "1800"))
+PRE_SESSION_EVENTS_MAX_ENTRIES = int(os.getenv("PRE_SESSION_EVENTS_MAX_ENTRIES", "5000"))
+PRE_SESSION_EVENTS_IDLE_TTL_SECONDS = int(os.getenv("PRE_SESSION_EVENTS_IDLE_TTL_SECONDS", "3600"))
+
+
+def _log_cache_eviction(key, value, reason):
+    # Idle evictions are summarized by the periodic sweep; a capacity eviction means the
+    # cache is undersized for the load and is worth seeing individually.
+    if reason == "capacity":
+        print(f"⚠️ CACHE FULL: evicted {str(key)[:8]}... (least recently used) — "
+              f"consider raising SESSION_CACHE_MAX_ENTRIES / PRE_SESSION_EVENTS_MAX_ENTRIES")
+
+
+def _keep_idle_session(session_id, session_data):
+    # 19Oct26: recovery only rebuilds active/interrupted rows, so a participant still in the
+    # waiting room or before consent would lose their place if evicted. Their deadlines move
+    # them out of these states, after which the next sweep can evict them.
+    return (session_data.get("match_status") == "waiting"
+            or session_data.get("session_status") in ("pre_consent", "waiting"))
+
+
+# Buffers evicted from pre_session_events, written out by flush_evicted_pre_session_events()
+# on the periodic sweep (eviction can happen on the event loop, so no DB work in the callback).
+evicted_pre_session_events = deque()
+
+
+def _on_pre_session_events_evicted(participant_id, events, reason):
+    _log_cache_eviction(participant_id, events, reason)
+    if events:
+        evicted_pre_session_events.append((participant_id, events))
+
+
+sessions: Dict[str, Dict[str, Any]] = SessionCache(
+    "sessions", SESSION_CACHE_MAX_ENTRIES, SESSION_CACHE_IDLE_TTL_SECONDS, on_evict=_log_cache_eviction,
+    keep_idle=_keep_idle_session
+)
 # Store UI events before a session is initialized, keyed by participant_id
-pre_session_events: Dict[str, List[Dict[str, Any]]] = {}
+pre_session_events: Dict[str, List[Dict[str, Any]]] = SessionCache(
+    "pre_session_events", PRE_SESSION_EVENTS_MAX_ENTRIES, PRE_SESSION_EVENTS_IDLE_TTL_SECONDS,
+    on_evict=_on_pre_session_events_evicted
+)
+
+
+def _ui_event_key(event):
+    return (event.get("event"), event.get("ts_server"), event.get("ts_client"))
+
+
+@study_log.renderer("pre_session_events_evicted")
+def render_evicted_pre_session_events(message, fields):
+    # The full events, so a buffer with no row to land in can still be recovered from the logs.
+    return f"⚠️ {message}\n   events: {json_codec.dumps(fields['events'])}"
+
+
+def flush_evicted_pre_session_events(db_session: Session):
+    """Write out evicted pre-session event buffers (periodic sweep and shutdown).
+
+    Each event was also journaled onto the participant's row, but events logged before
+    /get_or_assign_role created that row were skipped, so the buffer can be the only copy.
+    With a row, the events it is missing are appended to its ui_event_log; without one
+    there is nowhere to put them, so they are logged in full instead of dropped.
+    """
+    buffers = {}
+    while evicted_pre_session_events:
+        participant_id, events = evicted_pre_session_events.popleft()
+        buffers.setdefault(participant_id, []).extend(events)
+    if not buffers:
+        return 0
+    try:
+        for participant_id in buffers:
+            session_journal.wait_for_session(participant_id)  # compare against the applied log
+        stored = dict(db_session.query(db.StudySession.id, db.StudySession.ui_event_log).filter(
+            db.StudySession.id.in_(list(buffers))
+        ).all())
+    except Exception as e:
+        db_session.rollback()
+        print(f"⚠️ Could not look up rows for {len(buffers)} evicted pre-session event buffers: {e}")
+        stored = {}
+    flushed = 0
+    for participant_id, events in buffers.items():
+        if participant_id in stored:
+            have = {_ui_event_key(event) for event in stored[participant_id] or []}
+            missing = [event for event in events if _ui_event_key(event) not in have]
+            if missing:
+                session_journal.record("json_append", participant_id, {
+                    "column": "ui_event_log",
+                    "items": missing,
+                    "values": {"last_updated": datetime.utcnow()},
+                    "summarize_ui_events": True,
+                })
+                flushed += len(missing)
+        else:
+            study_log.log_event(
+                "pre_session_events_evicted",
+                f"Evicted {len(events)} pre-session UI events for {participant_id[:8]}... (no session row)",
+                level=study_log.WARNING, participant_id=participant_id, events=events,
+            )
+    if flushed:
+        print(f"🧹 PRE-SESSION EVENTS: {flushed} evicted events appended to their session rows")
+    return flushed
+
+
+# Deep-sizing the caches takes ~0.5ms per cached session, so it is measured by the periodic
+# sweep and /health reports the last measurement instead of stalling the event loop.
+cache_memory_snapshot: Dict[str, Any] = {}
+
+
+def evict_idle_sessions():
+    """Drop idle entries from both caches and re-measure their memory (periodic sweep)."""
+    evicted_sessions = sessions.evict_idle()
+    evicted_buffers = pre_session_events.evict_idle()
+    if evicted_sessions or evicted_buffers:
+        print(f"🧹 CACHE EVICTION: {evicted_sessions} sessions idle > {SESSION_CACHE_IDLE_TTL_SECONDS}s, "
+              f"{evicted_buffers} pre-session event buffers idle > {PRE_SESSION_EVENTS_IDLE_TTL_SECONDS}s "
+              f"({len(sessions)} sessions / {len(pre_session_events)} buffers still cached)")
+    cache_memory_snapshot.update({
+        "sessions_approx_bytes": sessions.approx_bytes(),
+        "pre_session_events_approx_bytes": pre_session_events.approx_bytes(),
+        "measured_at": datetime.utcnow().isoformat() + "Z",
+    })
+
+
+def process_rss_bytes():
+    """Current resident set size (Linux), else the peak from getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
 
 # H1 (Option A): how long after a server restart a participant can still resume.
 # On restart, in-progress sessions are marked 'interrupted'; if the participant comes
@@ -547,9 +987,204 @@ pre_session_events: Dict[str, List[Dict[str, Any]]] = {}
 SESSION_RESUME_WINDOW_MINUTES = 5
 
 # --- NEW: Session Recovery Function ---
+def _recover_conversation_fields(session_id, row):
+    conversation_log = row.conversation_log or []
+    # The logs we are about to resume from should be exactly what the last full save
+    # stamped. NULL checksum = a received turn was appended since; nothing to compare.
+    if row.content_checksum and row.content_checksum != db.log_content_checksum(
+        conversation_log, row.interrogator_turn_judgment_log
+    ):
+        print(f"⚠️ RECOVERY CHECKSUM MISMATCH | session {session_id[:8]}... | "
+              f"stored logs differ from the last verified save — INVESTIGATE")
+    return {
+        "conversation_log": conversation_log,
+        "intermediate_ddm_confidence_ratings": row.interrogator_turn_judgment_log or row.ddm_confidence_ratings or [],
+    }
+
+
+# 19Oct26: heavy session fields a recovered session fetches on first access instead of
+# at recovery time. Each entry: (keys it fills, study_sessions columns it reads, builder).
+# The conversation log and the per-turn judgments share a loader so the checksum check
+# still compares the pair it was stamped over.
+RECOVERY_LAZY_LOADERS = (
+    (("conversation_log", "intermediate_ddm_confidence_ratings"),
+     ("conversation_log", "interrogator_turn_judgment_log", "ddm_confidence_ratings", "content_checksum"),
+     _recover_conversation_fields),
+    (("initial_user_profile_survey",), ("user_profile_survey",),
+     lambda session_id, row: {"initial_user_profile_survey": row.user_profile_survey or {}}),
+    (("ai_researcher_notes_log",), ("ai_researcher_notes",),
+     lambda session_id, row: {"ai_researcher_notes_log": row.ai_researcher_notes or []}),
+    (("tactic_selection_log",), ("tactic_selection_log",),
+     lambda session_id, row: {"tactic_selection_log": row.tactic_selection_log or []}),
+    (("initial_tactic_analysis",), ("initial_tactic_analysis",),
+     lambda session_id, row: {"initial_tactic_analysis": {"full_analysis": row.initial_tactic_analysis or "N/A"}}),
+    (("feels_off_data",), ("feels_off_comments",),
+     lambda session_id, row: {"feels_off_data": row.feels_off_comments or []}),
+    (("ui_event_log",), ("ui_event_log",),
+     lambda session_id, row: {"ui_event_log": row.ui_event_log or []}),
+)
+
+
+class RecoveredSession(dict):
+    """In-memory session rebuilt from the database, with its JSON logs loaded lazily.
+
+    Behaves like the plain session dict every endpoint expects. The heavy keys listed in
+    RECOVERY_LAZY_LOADERS are fetched (just their own columns, by primary key) by
+    materialize(). Async handlers call it explicitly, in a worker thread, through
+    load_recovered_logs() before they touch the logs. Reading an unloaded key via [],
+    get(), in, setdefault() or pop() still loads it on demand, which is fine in the
+    threadpool (sync endpoints); on the event loop it is reported as a missed
+    load_recovered_logs() call. Assigning a key first skips its load.
+    Whole-dict views (iteration, items(), copy(), len()) materialize everything. A failed
+    load raises and leaves the key unloaded, so a later access retries rather than ever
+    handing out an empty log that a save would then write back over the stored one.
+    """
+
+    def __init__(self, session_id, fields):
+        super().__init__(fields)
+        self._session_id = session_id
+        self._unloaded = {
+            key: loader for loader in RECOVERY_LAZY_LOADERS for key in loader[0] if key not in fields
+        }
+        self._load_lock = threading.Lock()
+
+    def _materialize(self, key):
+        loader = self._unloaded.get(key)
+        if loader is None:
+            return
+        self._warn_if_on_event_loop(key)
+        self._load([loader])
+
+    def _warn_if_on_event_loop(self, what):
+        if _on_event_loop():
+            print(f"⚠️ RECOVERED SESSION {self._session_id[:8]}... | {what} loaded on the event loop "
+                  f"— missing load_recovered_logs() in the calling handler")
+
+    def materialize(self):
+        """Load every still-unloaded key in one read (blocking: journal wait + DB read)."""
+        self._load(list({id(loader): loader for loader in self._unloaded.values()}.values()))
+
+    def _load(self, loaders):
+        with self._load_lock:
+            # Another request thread may have loaded some of these meanwhile.
+            loaders = [loader for loader in loaders if any(key in self._unloaded for key in loader[0])]
+            if not loaders:
+                return
+            columns = list(dict.fromkeys(name for loader in loaders for name in loader[1]))
+            session_journal.wait_for_session(self._session_id)
+            table = db.StudySession.__table__
+            with db.engine.connect() as conn:
+                row = conn.execute(
+                    select(*[table.c[name] for name in columns]).where(table.c.id == self._session_id)
+                ).first()
+            if row is None:
+                raise LookupError(f"session {self._session_id} disappeared before {loaders[0][0][0]} was loaded")
+            for _keys, _columns, build in loaders:
+                for loaded_key, value in build(self._session_id, row).items():
+                    if loaded_key in self._unloaded:
+                        dict.__setitem__(self, loaded_key, value)
+                        del self._unloaded[loaded_key]
+
+    def _materialize_all(self):
+        if self._unloaded:
+            self._warn_if_on_event_loop("all logs")
+            self.materialize()
+
+    def unloaded_keys(self):
+        return sorted(self._unloaded)
+
+    def loaded_items(self):
+        """(key, value) pairs already in memory, without loading anything."""
+        return list(dict.items(self))
+
+    def __missing__(self, key):
+        self._materialize(key)
+        if dict.__contains__(self, key):
+            return dict.__getitem__(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        self._materialize(key)
+        return dict.get(self, key, default)
+
+    def __contains__(self, key):
+        self._materialize(key)
+        return dict.__contains__(self, key)
+
+    def setdefault(self, key, default=None):
+        self._materialize(key)
+        return dict.setdefault(self, key, default)
+
+    def pop(self, key, *default):
+        self._materialize(key)
+        return dict.pop(self, key, *default)
+
+    def __setitem__(self, key, value):
+        self._unloaded.pop(key, None)
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self._materialize(key)
+        dict.__delitem__(self, key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __iter__(self):
+        self._materialize_all()
+        return dict.__iter__(self)
+
+    def __len__(self):
+        self._materialize_all()
+        return dict.__len__(self)
+
+    def __bool__(self):
+        return True  # always carries the scalar fields; `if recovered:` must not load the logs
+
+    def keys(self):
+        self._materialize_all()
+        return dict.keys(self)
+
+    def values(self):
+        self._materialize_all()
+        return dict.values(self)
+
+    def items(self):
+        self._materialize_all()
+        return dict.items(self)
+
+    def copy(self):
+        self._materialize_all()
+        return dict(dict.items(self))
+
+    def __repr__(self):
+        return f"RecoveredSession({self._session_id[:8]}..., unloaded={self.unloaded_keys()})"
+
+
+def _on_event_loop():
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+async def load_recovered_logs(*session_dicts):
+    """Load any still-unloaded logs of recovered sessions in a worker thread, so the async
+    handler reading them next never queries the database on the event loop."""
+    for session_data in session_dicts:
+        if isinstance(session_data, RecoveredSession) and session_data.unloaded_keys():
+            await asyncio.to_thread(session_data.materialize)
+
+
 def recover_session_from_database(session_id: str, db_session: Session):
-    """Recover an active (or recently-interrupted) session from the database after a restart."""
+    """Recover an active (or recently-interrupted) session from the database after a restart.
+
+    Only the scalar columns are read here; the JSON logs load on first access (see
+    RecoveredSession), so a poll that needs just turn_count never parses them."""
     try:
+        session_journal.wait_for_session(session_id)  # rebuild from the latest journaled state
         session_record = db_session.query(db.StudySession).filter(
             db.StudySession.id == session_id
         ).first()
@@ -578,33 +1213,25 @@ def recover_session_from_database(session_id: str, db_session: Session):
         else:
             return None
 
-        # Reconstruct the in-memory session from database
-        recovered_session = {
+        # Reconstruct the in-memory session from database (JSON logs are filled in lazily)
+        recovered_session = RecoveredSession(session_record.id, {
             "session_id": session_record.id,
             "user_id": session_record.user_id,
             "participant_id": None,  # Will be set if available
             "prolific_pid": None,    # Will be set if available
             "start_time": session_record.start_time,
             "session_start_time": session_record.start_time.timestamp(),
-            "initial_user_profile_survey": json.loads(session_record.user_profile_survey) if session_record.user_profile_survey else {},
             "assigned_domain": session_record.domain,
             "experimental_condition": session_record.condition,
             "chosen_persona_key": session_record.chosen_persona,
             "social_style": session_record.social_style or "DIRECT",
-            "conversation_log": json.loads(session_record.conversation_log) if session_record.conversation_log else [],
-            "turn_count": len(json.loads(session_record.conversation_log)) if session_record.conversation_log else 0,
-            "ai_researcher_notes_log": json.loads(session_record.ai_researcher_notes) if session_record.ai_researcher_notes else [],
-            "tactic_selection_log": json.loads(session_record.tactic_selection_log) if session_record.tactic_selection_log else [],
-            "initial_tactic_analysis": {"full_analysis": session_record.initial_tactic_analysis or "N/A"},
+            "turn_count": _stored_log_count(session_record, "turn_count", "conversation_log"),
             "ai_detected_final": session_record.ai_detected_final,
-            "intermediate_ddm_confidence_ratings": json.loads(session_record.interrogator_turn_judgment_log or session_record.ddm_confidence_ratings) if (session_record.interrogator_turn_judgment_log or session_record.ddm_confidence_ratings) else [],
-            "feels_off_data": json.loads(session_record.feels_off_comments) if session_record.feels_off_comments else [],
             "final_decision_time_seconds_ddm": session_record.final_decision_time,
             "last_ai_response_timestamp_for_ddm": None,
             "last_user_message_char_count": 0,
             "force_ended": False,
-            "ui_event_log": json.loads(session_record.ui_event_log) if session_record.ui_event_log else []
-        }
+        })
         
         # Add pure DDM data if present
         if session_record.pure_ddm_decision is not None:
@@ -1013,16 +1640,25 @@ def initialize_gemini_models_and_module():
 
     return client, primary_model_name, fallback_model_name, minimal_thinking_config, standard_config, genai, types
 
-try:
-    GEMINI_CLIENT, GEMINI_PRO_MODEL_NAME, GEMINI_FLASH_MODEL_NAME, GEMINI_THINKING_CONFIG, GEMINI_STANDARD_CONFIG, GENAI_MODULE, GENAI_TYPES = initialize_gemini_models_and_module()
-    # Legacy compatibility - store client as GEMINI_MODEL for checks
-    GEMINI_MODEL = GEMINI_CLIENT
-    GEMINI_PRO_MODEL = GEMINI_CLIENT  # Legacy compatibility
-    GEMINI_FLASH_MODEL = GEMINI_CLIENT  # Legacy compatibility
-    print("Harvard API: Gemini 3 Flash (minimal thinking) and Gemini 2.5 Flash (fallback) initialized.")
-except Exception as e:
-    print(f"FATAL: Could not initialize Gemini Models: {e}")
-    GEMINI_CLIENT, GEMINI_PRO_MODEL_NAME, GEMINI_FLASH_MODEL_NAME, GEMINI_THINKING_CONFIG, GEMINI_STANDARD_CONFIG, GENAI_MODULE, GENAI_TYPES, GEMINI_MODEL, GEMINI_PRO_MODEL, GEMINI_FLASH_MODEL = None, None, None, None, None, None, None, None, None, None
+# Set by init_gemini() during startup (importing google.genai alone is ~0.4s)
+GEMINI_CLIENT, GEMINI_PRO_MODEL_NAME, GEMINI_FLASH_MODEL_NAME, GEMINI_THINKING_CONFIG, GEMINI_STANDARD_CONFIG, GENAI_MODULE, GENAI_TYPES, GEMINI_MODEL, GEMINI_PRO_MODEL, GEMINI_FLASH_MODEL = None, None, None, None, None, None, None, None, None, None
+
+
+def init_gemini():
+    """Build the Gemini client unless one is already set (e.g. swapped in by a test)."""
+    global GEMINI_CLIENT, GEMINI_PRO_MODEL_NAME, GEMINI_FLASH_MODEL_NAME, GEMINI_THINKING_CONFIG, GEMINI_STANDARD_CONFIG, GENAI_MODULE, GENAI_TYPES, GEMINI_MODEL, GEMINI_PRO_MODEL, GEMINI_FLASH_MODEL
+    if GEMINI_CLIENT is not None:
+        return
+    try:
+        GEMINI_CLIENT, GEMINI_PRO_MODEL_NAME, GEMINI_FLASH_MODEL_NAME, GEMINI_THINKING_CONFIG, GEMINI_STANDARD_CONFIG, GENAI_MODULE, GENAI_TYPES = initialize_gemini_models_and_module()
+        # Legacy compatibility - store client as GEMINI_MODEL for checks
+        GEMINI_MODEL = GEMINI_CLIENT
+        GEMINI_PRO_MODEL = GEMINI_CLIENT  # Legacy compatibility
+        GEMINI_FLASH_MODEL = GEMINI_CLIENT  # Legacy compatibility
+        print("Harvard API: Gemini 3 Flash (minimal thinking) and Gemini 2.5 Flash (fallback) initialized.")
+    except Exception as e:
+        print(f"FATAL: Could not initialize Gemini Models: {e}")
+        GEMINI_CLIENT, GEMINI_PRO_MODEL_NAME, GEMINI_FLASH_MODEL_NAME, GEMINI_THINKING_CONFIG, GEMINI_STANDARD_CONFIG, GENAI_MODULE, GENAI_TYPES, GEMINI_MODEL, GEMINI_PRO_MODEL, GEMINI_FLASH_MODEL = None, None, None, None, None, None, None, None, None, None
 
 # End of Harvard Specific Configuration
 
@@ -1078,6 +1714,17 @@ def calculate_and_save_study_time(session_record):
         session_record.total_study_time_minutes = round(elapsed.total_seconds() / 60, 2)
 
 
+def study_time_minutes_value(now=None):
+    """calculate_and_save_study_time() as a column value for a set-based UPDATE."""
+    elapsed_seconds = (extract("epoch", literal(now or datetime.utcnow(), DateTime))
+                       - extract("epoch", db.StudySession.start_time))
+    return case(
+        (and_(db.StudySession.total_study_time_minutes.is_(None), db.StudySession.start_time.isnot(None)),
+         func.round(cast(elapsed_seconds / 60.0, Numeric), 2)),
+        else_=db.StudySession.total_study_time_minutes,
+    )
+
+
 def mark_conversation_phase_reached(session_record):
     """Mark sessions that reached the phase where a final judgment is expected."""
     if not session_record:
@@ -1087,22 +1734,39 @@ def mark_conversation_phase_reached(session_record):
         session_record.conversation_started_at = datetime.utcnow()
 
 
+def conversation_phase_values():
+    """mark_conversation_phase_reached() as column values for a Core UPDATE."""
+    return {
+        "conversation_phase_reached": True,
+        "conversation_started_at": func.coalesce(db.StudySession.conversation_started_at, datetime.utcnow()),
+    }
+
+
+def interrogator_final_response_values(binary_choice, confidence_percent, decision_time_seconds, reason):
+    """Column values for the interrogator's final human/AI judgment."""
+    return {
+        "interrogator_final_binary_choice": binary_choice,
+        "interrogator_final_confidence_percent": confidence_percent,
+        "interrogator_final_decision_time_seconds": decision_time_seconds,
+        "interrogator_final_response_collected": True,
+        "interrogator_final_response_reason": reason,
+        "interrogator_final_response_not_collected_reason": None,
+        # Compatibility fields retained for old exports/dashboards.
+        "final_binary_choice": binary_choice,
+        "final_confidence_percent": confidence_percent,
+        "ai_detected_final": (binary_choice == "ai") if binary_choice else None,
+        "final_decision_time": decision_time_seconds,
+    }
+
+
 def set_interrogator_final_response(session_record, binary_choice, confidence_percent, decision_time_seconds, reason):
     """Persist the interrogator's final human/AI judgment using explicit confirmatory fields."""
     if not session_record:
         return
-    session_record.interrogator_final_binary_choice = binary_choice
-    session_record.interrogator_final_confidence_percent = confidence_percent
-    session_record.interrogator_final_decision_time_seconds = decision_time_seconds
-    session_record.interrogator_final_response_collected = True
-    session_record.interrogator_final_response_reason = reason
-    session_record.interrogator_final_response_not_collected_reason = None
-
-    # Compatibility fields retained for old exports/dashboards.
-    session_record.final_binary_choice = binary_choice
-    session_record.final_confidence_percent = confidence_percent
-    session_record.ai_detected_final = (binary_choice == "ai") if binary_choice else None
-    session_record.final_decision_time = decision_time_seconds
+    for name, value in interrogator_final_response_values(
+        binary_choice, confidence_percent, decision_time_seconds, reason
+    ).items():
+        setattr(session_record, name, value)
 
 
 def set_witness_final_response(session_record, partner_belief, choice_time_ms=None, reason="witness_final_response"):
@@ -1165,46 +1829,84 @@ def update_suspicious_behavior_summary(session_record, events):
     """Summarize suspicious browser behavior from raw ui_event_log events."""
     if not session_record:
         return
+    for name, value in suspicious_behavior_summary_values(events).items():
+        setattr(session_record, name, value)
+
+
+def suspicious_behavior_summary_values(events):
+    """Suspicious-behavior summary columns computed from raw ui_event_log events."""
+    summary = new_ui_event_summary()
+    fold_ui_event_summary(summary, events or [])
+    return ui_event_summary_values(summary)
+
+
+def live_ui_event_summary_values(session_data):
+    """Summary of a live session's in-memory ui_event_log, kept up to date incrementally.
 
-    suspicious_count = 0
-    tab_hidden_count = 0
-    total_tab_hidden_ms = 0.0
-    window_blur_count = 0
-    paste_count = 0
-    copy_count = 0
-    context_menu_count = 0
-    selection_count = 0
-    page_exit_count = 0
-    pasted_text_entries = []
-    beforeinput_count = 0
-    beforeinput_paste_count = 0
-    beforeinput_drop_count = 0
-    beforeinput_replacement_count = 0
-    text_growth_anomaly_count = 0
-    large_message_after_inactivity_count = 0
-    drop_count = 0
-    textarea_focus_count = 0
-    textarea_blur_count = 0
-    untrusted_input_count = 0
-    automation_fingerprint_count = 0
-    automation_webdriver_detected = False
-    lifecycle_freeze_count = 0
-    lifecycle_resume_count = 0
-    lifecycle_pageshow_count = 0
-    lifecycle_beforeunload_count = 0
-    provenance_counts = {
-        "typed_only": 0,
-        "pasted": 0,
-        "dropped": 0,
-        "large_jump": 0,
-        "mixed": 0,
-        "unknown": 0,
+    19Oct26: the running totals live in session_data["ui_event_summary"] (plain JSON, so
+    they survive a checkpoint), and each call folds in only the events appended since the
+    last one, instead of re-reading the whole log for every UI event."""
+    events = session_data.get("ui_event_log") or []
+    summary = session_data.get("ui_event_summary")
+    if summary is None or summary["folded"] > len(events):
+        summary = session_data["ui_event_summary"] = new_ui_event_summary()
+    fold_ui_event_summary(summary, events)
+    return ui_event_summary_values(summary)
+
+
+def new_ui_event_summary():
+    """Running totals for fold_ui_event_summary, keyed by summary column."""
+    return {
+        "folded": 0,
+        "suspicious_behavior_event_count": 0,
+        "tab_hidden_count": 0,
+        "total_tab_hidden_ms": 0.0,
+        "window_blur_count": 0,
+        "paste_event_count": 0,
+        "copy_event_count": 0,
+        "context_menu_event_count": 0,
+        "text_selection_event_count": 0,
+        "page_exit_event_count": 0,
+        "pasted_text_log": [],
+        "beforeinput_event_count": 0,
+        "beforeinput_paste_event_count": 0,
+        "beforeinput_drop_event_count": 0,
+        "beforeinput_replacement_event_count": 0,
+        "text_growth_anomaly_count": 0,
+        "large_message_after_inactivity_count": 0,
+        "drop_event_count": 0,
+        "textarea_focus_count": 0,
+        "textarea_blur_count": 0,
+        "untrusted_input_event_count": 0,
+        "automation_webdriver_detected": False,
+        "automation_fingerprint_event_count": 0,
+        "page_lifecycle_freeze_count": 0,
+        "page_lifecycle_resume_count": 0,
+        "page_lifecycle_pageshow_count": 0,
+        "page_lifecycle_beforeunload_count": 0,
+        "input_provenance_typed_only_message_count": 0,
+        "input_provenance_pasted_message_count": 0,
+        "input_provenance_dropped_message_count": 0,
+        "input_provenance_large_jump_message_count": 0,
+        "input_provenance_mixed_message_count": 0,
+        "input_provenance_unknown_message_count": 0,
+        "max_message_chars_per_second": None,
+        "max_message_length_chars": 0,
+        "total_message_keydown_count": 0,
+        "total_message_backspace_delete_count": 0,
+        "total_message_long_pause_count": 0,
     }
-    max_chars_per_second = None
-    max_message_length_chars = 0
-    total_keydown_count = 0
-    total_backspace_delete_count = 0
-    total_long_pause_count = 0
+
+
+def ui_event_summary_values(summary):
+    values = {name: value for name, value in summary.items() if name != "folded"}
+    values["pasted_text_log"] = list(summary["pasted_text_log"]) or None
+    return values
+
+
+def fold_ui_event_summary(summary, events):
+    """Add events[summary["folded"]:] to the running totals in summary."""
+    s = summary
 
     def safe_float(value, default=0.0):
         try:
@@ -1218,26 +1920,26 @@ def update_suspicious_behavior_summary(session_record, events):
         except (TypeError, ValueError):
             return default
 
-    for event in events or []:
+    for event in events[s["folded"]:]:
         event_name = event.get("event")
         metadata = event.get("metadata") or {}
 
         if event_name in SUSPICIOUS_UI_EVENTS:
-            suspicious_count += 1
+            s["suspicious_behavior_event_count"] += 1
         if event_name == "tab_hidden":
-            tab_hidden_count += 1
+            s["tab_hidden_count"] += 1
         elif event_name == "tab_visible":
             try:
-                total_tab_hidden_ms += float(metadata.get("hidden_duration_ms") or 0)
+                s["total_tab_hidden_ms"] += float(metadata.get("hidden_duration_ms") or 0)
             except (TypeError, ValueError):
                 pass
         elif event_name == "window_blur":
-            window_blur_count += 1
+            s["window_blur_count"] += 1
         elif event_name == "paste":
-            paste_count += 1
+            s["paste_event_count"] += 1
             pasted_text = metadata.get("pasted_text")
             if pasted_text:
-                pasted_text_entries.append({
+                s["pasted_text_log"].append({
                     "timestamp": event.get("timestamp") or event.get("ts_client"),
                     "turn": metadata.get("turn"),
                     "role": metadata.get("role"),
@@ -1248,95 +1950,61 @@ def update_suspicious_behavior_summary(session_record, events):
                     "pasted_text": pasted_text,
                 })
         elif event_name == "copy":
-            copy_count += 1
+            s["copy_event_count"] += 1
         elif event_name == "contextmenu":
-            context_menu_count += 1
+            s["context_menu_event_count"] += 1
         elif event_name == "text_selection":
-            selection_count += 1
+            s["text_selection_event_count"] += 1
         elif event_name in ("pagehide", "navigation_warning_shown", "navigation_abandonment"):
-            page_exit_count += 1
+            s["page_exit_event_count"] += 1
         elif event_name == "beforeinput":
-            beforeinput_count += 1
+            s["beforeinput_event_count"] += 1
             input_type = metadata.get("input_type")
             if input_type == "insertFromPaste":
-                beforeinput_paste_count += 1
+                s["beforeinput_paste_event_count"] += 1
             elif input_type == "insertFromDrop":
-                beforeinput_drop_count += 1
+                s["beforeinput_drop_event_count"] += 1
             elif input_type in ("insertReplacementText", "insertFromYank"):
-                beforeinput_replacement_count += 1
+                s["beforeinput_replacement_event_count"] += 1
         elif event_name == "text_growth_anomaly":
-            text_growth_anomaly_count += 1
+            s["text_growth_anomaly_count"] += 1
         elif event_name == "large_message_after_inactivity":
-            large_message_after_inactivity_count += 1
+            s["large_message_after_inactivity_count"] += 1
         elif event_name == "drop":
-            drop_count += 1
+            s["drop_event_count"] += 1
         elif event_name == "textarea_focus":
-            textarea_focus_count += 1
+            s["textarea_focus_count"] += 1
         elif event_name == "textarea_blur":
-            textarea_blur_count += 1
+            s["textarea_blur_count"] += 1
         elif event_name == "untrusted_input_event":
-            untrusted_input_count += 1
+            s["untrusted_input_event_count"] += 1
         elif event_name == "automation_fingerprint":
-            automation_fingerprint_count += 1
-            automation_webdriver_detected = automation_webdriver_detected or bool(metadata.get("navigator_webdriver"))
+            s["automation_fingerprint_event_count"] += 1
+            s["automation_webdriver_detected"] = (s["automation_webdriver_detected"]
+                                                  or bool(metadata.get("navigator_webdriver")))
         elif event_name == "page_lifecycle_freeze":
-            lifecycle_freeze_count += 1
+            s["page_lifecycle_freeze_count"] += 1
         elif event_name == "page_lifecycle_resume":
-            lifecycle_resume_count += 1
+            s["page_lifecycle_resume_count"] += 1
         elif event_name == "page_lifecycle_pageshow":
-            lifecycle_pageshow_count += 1
+            s["page_lifecycle_pageshow_count"] += 1
         elif event_name == "page_lifecycle_beforeunload":
-            lifecycle_beforeunload_count += 1
+            s["page_lifecycle_beforeunload_count"] += 1
         elif event_name == "message_input_provenance":
             category = metadata.get("provenance_category") or "unknown"
-            if category not in provenance_counts:
+            if category not in ("typed_only", "pasted", "dropped", "large_jump", "mixed"):
                 category = "unknown"
-            provenance_counts[category] += 1
-            max_message_length_chars = max(max_message_length_chars, safe_int(metadata.get("message_length_chars")))
+            s[f"input_provenance_{category}_message_count"] += 1
+            s["max_message_length_chars"] = max(s["max_message_length_chars"],
+                                                safe_int(metadata.get("message_length_chars")))
             cps = safe_float(metadata.get("chars_per_second"), None)
             if cps is not None:
-                max_chars_per_second = cps if max_chars_per_second is None else max(max_chars_per_second, cps)
-            total_keydown_count += safe_int(metadata.get("keydown_count"))
-            total_backspace_delete_count += safe_int(metadata.get("backspace_delete_count"))
-            total_long_pause_count += safe_int(metadata.get("long_pause_count"))
-
-    session_record.suspicious_behavior_event_count = suspicious_count
-    session_record.tab_hidden_count = tab_hidden_count
-    session_record.total_tab_hidden_ms = total_tab_hidden_ms
-    session_record.window_blur_count = window_blur_count
-    session_record.paste_event_count = paste_count
-    session_record.copy_event_count = copy_count
-    session_record.context_menu_event_count = context_menu_count
-    session_record.text_selection_event_count = selection_count
-    session_record.page_exit_event_count = page_exit_count
-    session_record.pasted_text_log = json.dumps(pasted_text_entries) if pasted_text_entries else None
-    session_record.beforeinput_event_count = beforeinput_count
-    session_record.beforeinput_paste_event_count = beforeinput_paste_count
-    session_record.beforeinput_drop_event_count = beforeinput_drop_count
-    session_record.beforeinput_replacement_event_count = beforeinput_replacement_count
-    session_record.text_growth_anomaly_count = text_growth_anomaly_count
-    session_record.large_message_after_inactivity_count = large_message_after_inactivity_count
-    session_record.drop_event_count = drop_count
-    session_record.textarea_focus_count = textarea_focus_count
-    session_record.textarea_blur_count = textarea_blur_count
-    session_record.untrusted_input_event_count = untrusted_input_count
-    session_record.automation_webdriver_detected = automation_webdriver_detected
-    session_record.automation_fingerprint_event_count = automation_fingerprint_count
-    session_record.page_lifecycle_freeze_count = lifecycle_freeze_count
-    session_record.page_lifecycle_resume_count = lifecycle_resume_count
-    session_record.page_lifecycle_pageshow_count = lifecycle_pageshow_count
-    session_record.page_lifecycle_beforeunload_count = lifecycle_beforeunload_count
-    session_record.input_provenance_typed_only_message_count = provenance_counts["typed_only"]
-    session_record.input_provenance_pasted_message_count = provenance_counts["pasted"]
-    session_record.input_provenance_dropped_message_count = provenance_counts["dropped"]
-    session_record.input_provenance_large_jump_message_count = provenance_counts["large_jump"]
-    session_record.input_provenance_mixed_message_count = provenance_counts["mixed"]
-    session_record.input_provenance_unknown_message_count = provenance_counts["unknown"]
-    session_record.max_message_chars_per_second = max_chars_per_second
-    session_record.max_message_length_chars = max_message_length_chars
-    session_record.total_message_keydown_count = total_keydown_count
-    session_record.total_message_backspace_delete_count = total_backspace_delete_count
-    session_record.total_message_long_pause_count = total_long_pause_count
+                current = s["max_message_chars_per_second"]
+                s["max_message_chars_per_second"] = cps if current is None else max(current, cps)
+            s["total_message_keydown_count"] += safe_int(metadata.get("keydown_count"))
+            s["total_message_backspace_delete_count"] += safe_int(metadata.get("backspace_delete_count"))
+            s["total_message_long_pause_count"] += safe_int(metadata.get("long_pause_count"))
+    s["folded"] = max(s["folded"], len(events))
 
 
 # --- Helper function for counter decrement (must be defined before startup cleanup) ---
@@ -1368,19 +2036,18 @@ def decrement_role_counter(session_record, db_session: Session):
         return  # Already decremented for this session
 
     try:
-        counter = db_session.query(db.RoleAssignmentCounter).filter(
-            db.RoleAssignmentCounter.id == 1
-        ).with_for_update().first()
-
-        if counter:
-            role = session_record.role
-            if role == "interrogator" and counter.interrogator_count > 0:
-                counter.interrogator_count -= 1
-                print(f"📉 Decremented interrogator count to {counter.interrogator_count} (session {session_record.id[:8]}...)")
-            elif role == "witness" and counter.witness_count > 0:
-                counter.witness_count -= 1
-                print(f"📉 Decremented witness count to {counter.witness_count} (session {session_record.id[:8]}...)")
+        # 19Oct26: one atomic UPDATE ... RETURNING (was SELECT ... FOR UPDATE, then a separate
+        # UPDATE at flush) — the counter row is locked for one statement, not two round trips.
+        role = session_record.role
+        if role not in ("interrogator", "witness"):
+            session_record.counter_decremented = True
+            return
+        counts = db_session.execute(role_counter_release_statement(role)).first()
 
+        if counts:
+            print(f"📉 Decremented {role} count to "
+                  f"{counts.interrogator_count if role == 'interrogator' else counts.witness_count} "
+                  f"(session {session_record.id[:8]}...)")
             session_record.counter_decremented = True
             # NOTE: caller is responsible for committing the transaction
     except Exception as e:
@@ -1388,11 +2055,119 @@ def decrement_role_counter(session_record, db_session: Session):
         db_session.rollback()
 
 
+def role_counter_release_statement(role):
+    """UPDATE ... RETURNING that gives back one interrogator/witness slot (never below zero)."""
+    column = (db.RoleAssignmentCounter.interrogator_count if role == "interrogator"
+              else db.RoleAssignmentCounter.witness_count)
+    return (
+        update(db.RoleAssignmentCounter)
+        .where(db.RoleAssignmentCounter.id == 1)
+        .values({column: case((column > 0, column - 1), else_=column)})
+        .returning(db.RoleAssignmentCounter.interrogator_count, db.RoleAssignmentCounter.witness_count)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def claim_role_assignment(db_session: Session):
+    """Pick the next role for a new participant and count it, as ONE atomic
+    UPDATE ... RETURNING committed immediately (the row lock lasts one statement).
+    Commits db_session: call it before any writes that must not be committed yet.
+
+    Same 50/50 rule as before: the role with fewer assignments; on a tie, alternate on
+    the total. Every SET expression sees the pre-update counts, and last_assigned_role
+    records which branch was taken. Returns (role, interrogator_count, witness_count).
+    """
+    interrogators = db.RoleAssignmentCounter.interrogator_count
+    witnesses = db.RoleAssignmentCounter.witness_count
+    assign_interrogator = or_(
+        interrogators < witnesses,
+        and_(interrogators == witnesses, (interrogators + witnesses) % 2 == 0),
+    )
+    claim = (
+        update(db.RoleAssignmentCounter)
+        .where(db.RoleAssignmentCounter.id == 1)
+        .values(
+            interrogator_count=interrogators + case((assign_interrogator, 1), else_=0),
+            witness_count=witnesses + case((assign_interrogator, 0), else_=1),
+            last_assigned_role=case((assign_interrogator, "interrogator"), else_="witness"),
+        )
+        .returning(interrogators, witnesses, db.RoleAssignmentCounter.last_assigned_role)
+    )
+    for _ in range(2):
+        row = db_session.execute(claim).first()
+        db_session.commit()
+        if row:
+            return row.last_assigned_role, row.interrogator_count, row.witness_count
+        # First time - initialize counter (a concurrent first load may win the insert)
+        try:
+            db_session.execute(db.RoleAssignmentCounter.__table__.insert().values(
+                id=1, interrogator_count=0, witness_count=0))
+            db_session.commit()
+            print("📊 Initialized RoleAssignmentCounter")
+        except IntegrityError:
+            db_session.rollback()
+    raise RuntimeError("RoleAssignmentCounter row unavailable")
+
+
+def release_role_assignment(db_session: Session, role):
+    """Undo claim_role_assignment() for a page load that failed before it was recorded."""
+    db_session.execute(role_counter_release_statement(role))
+    db_session.commit()
+
+
+def decrement_role_counters_bulk(db_session: Session, session_ids, batch_size=500):
+    """decrement_role_counter() for many sessions at once: flag the not-yet-decremented
+    HUMAN_WITNESS rows in set-based UPDATEs, then apply ONE counter UPDATE with the
+    per-role totals (instead of a FOR UPDATE round trip per session).
+    NOTE: caller is responsible for committing the transaction."""
+    if STUDY_MODE != "HUMAN_WITNESS" or not session_ids:
+        return {}
+    session_ids = list(session_ids)
+    tallies = {}
+    for i in range(0, len(session_ids), batch_size):
+        flagged = db_session.execute(
+            update(db.StudySession)
+            .where(
+                db.StudySession.id.in_(session_ids[i:i + batch_size]),
+                db.StudySession.study_mode == "HUMAN_WITNESS",   # only these ever incremented it (T1.3)
+                db.StudySession.role.isnot(None),
+                or_(db.StudySession.counter_decremented.is_(None),
+                    db.StudySession.counter_decremented == False),  # idempotent, as in decrement_role_counter
+            )
+            .values(counter_decremented=True)
+            .returning(db.StudySession.role)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        for role in flagged:
+            tallies[role] = tallies.get(role, 0) + 1
+
+    values = {}
+    for role, column in (("interrogator", db.RoleAssignmentCounter.interrogator_count),
+                         ("witness", db.RoleAssignmentCounter.witness_count)):
+        if tallies.get(role):
+            # Same floor as the per-session path: never go below zero
+            values[column.key] = case((column > tallies[role], column - tallies[role]), else_=0)
+    if values:
+        counts = db_session.execute(
+            update(db.RoleAssignmentCounter)
+            .where(db.RoleAssignmentCounter.id == 1)
+            .values(**values)
+            .returning(db.RoleAssignmentCounter.interrogator_count, db.RoleAssignmentCounter.witness_count)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if counts:
+            print(f"📉 Decremented role counter by interrogator={tallies.get('interrogator', 0)}, "
+                  f"witness={tallies.get('witness', 0)} → now interrogator={counts.interrogator_count}, "
+                  f"witness={counts.witness_count} ({sum(tallies.values())} sessions)")
+    return tallies
+
+
 # --- NEW: Startup cleanup for interrupted sessions ---
-def mark_interrupted_sessions_on_startup():
+def mark_interrupted_sessions_on_startup(skip_session_ids=()):
     """Mark any active sessions as interrupted when the server restarts.
     Also decrements role counter for interrupted sessions since they
-    will not complete (participants are gone after restart)."""
+    will not complete (participants are gone after restart).
+    skip_session_ids: sessions restored from the shutdown checkpoint, which continue."""
     try:
         db_session = db.SessionLocal()
         try:
@@ -1401,10 +2176,13 @@ def mark_interrupted_sessions_on_startup():
             # sweeps the OTHER condition's live sessions. Without this, a HUMAN_WITNESS restart
             # decremented the shared counter for AI sessions (re-opening the T1.3 drain), and an
             # AI_WITNESS restart flipped live human sessions to 'interrupted'. Mirrors the T1.2 fix.
-            active_sessions = db_session.query(db.StudySession).filter(
+            active_query = db_session.query(db.StudySession).filter(
                 db.StudySession.session_status == "active",
                 db.StudySession.study_mode == STUDY_MODE
-            ).all()
+            )
+            if skip_session_ids:
+                active_query = active_query.filter(db.StudySession.id.notin_(list(skip_session_ids)))
+            active_sessions = active_query.all()
 
             for session in active_sessions:
                 session.session_status = "interrupted"
@@ -1437,8 +2215,116 @@ def mark_interrupted_sessions_on_startup():
     except Exception as e:
         print(f"Error marking interrupted sessions: {e}")
 
-# Mark interrupted sessions on startup
-mark_interrupted_sessions_on_startup()
+# --- Graceful shutdown checkpoint / warm restart ---
+# 19Oct26: a redeploy used to strand every in-memory session: the new process swept them all
+# to 'interrupted' (decrementing the role counters) and participants who came back were rebuilt
+# from study_sessions one request at a time. On SIGTERM uvicorn stops accepting connections and
+# waits for in-flight requests (Gemini turns included); the shutdown hook then snapshots
+# `sessions` + `pre_session_events` into server_checkpoints, and the next boot restores them
+# before the interrupted sweep, which skips whatever was restored.
+CHECKPOINT_MAX_AGE_SECONDS = int(os.getenv("CHECKPOINT_MAX_AGE_SECONDS", str(SESSION_RESUME_WINDOW_MINUTES * 60)))
+# Set as soon as a shutdown signal arrives; new participants get a 503 and retry against the
+# next process instead of being assigned a role on one that is about to exit.
+server_draining = threading.Event()
+
+
+def reject_new_session_while_draining():
+    if server_draining.is_set():
+        raise HTTPException(status_code=503, detail="Server is restarting, please retry in a moment")
+
+
+def _active_session_ids(db_session: Session, session_ids, batch_size=500):
+    """Subset of session_ids whose study_sessions row is still active in this study mode."""
+    session_ids = list(session_ids)
+    active = set()
+    for i in range(0, len(session_ids), batch_size):
+        active.update(row.id for row in db_session.query(db.StudySession.id).filter(
+            db.StudySession.id.in_(session_ids[i:i + batch_size]),
+            db.StudySession.session_status == "active",
+            db.StudySession.study_mode == STUDY_MODE
+        ))
+    return active
+
+
+def checkpoint_sessions_for_restart():
+    """Snapshot this process's active in-memory sessions for the next boot.
+    Recovered sessions keep their not-yet-loaded logs lazy in the checkpoint too."""
+    started = time.time()
+    db_session = db.SessionLocal()
+    try:
+        flush_evicted_pre_session_events(db_session)
+    except Exception as e:
+        db_session.rollback()
+        print(f"⚠️ Could not flush evicted pre-session events before checkpoint: {e}")
+    session_journal.drain(timeout=10.0)  # the DB rows the next boot verifies against are current
+    try:
+        active_ids = _active_session_ids(db_session, list(sessions))
+        items = []
+        for session_id in active_ids:
+            session = sessions.get(session_id)
+            if session is None:
+                continue
+            if isinstance(session, RecoveredSession):
+                items.append((session_id, dict(session.loaded_items()), True))
+            else:
+                items.append((session_id, session, False))
+        payload, written, skipped = session_checkpoint.encode_checkpoint(items, pre_session_events)
+        session_checkpoint.save_checkpoint(db_session, STUDY_MODE, payload, written)
+        print(f"💾 SHUTDOWN CHECKPOINT: {written} active sessions + {len(pre_session_events)} pre-session "
+              f"event buffers saved ({len(payload) / 1024:.1f} KiB, {time.time() - started:.2f}s)")
+        for session_id, reason in skipped:
+            print(f"⚠️ CHECKPOINT SKIPPED {str(session_id)[:8]}... ({reason}) — will use the interrupted path")
+        return written
+    except Exception as e:
+        db_session.rollback()
+        print(f"❌ SHUTDOWN CHECKPOINT FAILED: {e} — sessions will be marked interrupted on next boot")
+        return 0
+    finally:
+        db_session.close()
+
+
+def restore_sessions_from_checkpoint():
+    """Bulk-load the previous process's shutdown checkpoint into `sessions`.
+    Returns the restored session ids (the interrupted sweep skips them)."""
+    db_session = db.SessionLocal()
+    try:
+        taken = session_checkpoint.take_checkpoint(db_session, STUDY_MODE)
+        if taken is None:
+            return set()
+        created_at, payload = taken
+        age = (datetime.utcnow() - created_at).total_seconds()
+        if age > CHECKPOINT_MAX_AGE_SECONDS:
+            print(f"⏭️ CHECKPOINT DISCARDED: {age:.0f}s old (max {CHECKPOINT_MAX_AGE_SECONDS}s) — using the interrupted path")
+            return set()
+        document = session_checkpoint.decode_checkpoint(payload)
+
+        # Only sessions nothing else has finished or swept since the snapshot
+        still_active = _active_session_ids(db_session, list(document["sessions"]))
+        for session_id in still_active:
+            entry = document["sessions"][session_id]
+            if entry["lazy"]:
+                sessions[session_id] = RecoveredSession(session_id, entry["fields"])
+            else:
+                sessions[session_id] = entry["fields"]
+        for participant_id, events in document["pre_session_events"].items():
+            pre_session_events.setdefault(participant_id, []).extend(events)
+
+        if still_active:
+            db_session.query(db.StudySession).filter(db.StudySession.id.in_(list(still_active))).update(
+                {db.StudySession.recovered_from_restart: True}, synchronize_session=False
+            )
+            db_session.commit()
+        print(f"♻️ WARM RESTART: restored {len(still_active)}/{len(document['sessions'])} sessions and "
+              f"{len(document['pre_session_events'])} pre-session event buffers from a {age:.0f}s-old checkpoint")
+        return still_active
+    except Exception as e:
+        db_session.rollback()
+        print(f"❌ CHECKPOINT RESTORE FAILED: {e} — using the interrupted path")
+        return set()
+    finally:
+        db_session.close()
+
+
     
 
 # --- Core Logic Functions (analyze_profile, select_tactic, generate_ai_response, update_personality_vector, assign_domain, save_session_data_to_csv - UNCHANGED unless specified) ---
@@ -1465,6 +2351,51 @@ def is_retryable_error(error):
 
     return any(pattern in error_str for pattern in retryable_patterns)
 
+
+@study_log.renderer("gemini_failure")
+@study_log.renderer("gemini_fallback")
+def render_boxed_banner(message, fields):
+    """The Railway banner layout: title between rules, then one "Label: value" line per field."""
+    lines = ["=" * 60, message, "=" * 60]
+    for key, value in fields.items():
+        if key not in ("detail", "suppressed"):
+            lines.append(f"{key.replace('_', ' ').capitalize()}: {value}")
+    if fields.get("detail"):
+        lines.append(fields["detail"])
+    lines.append("=" * 60)
+    return "\n".join(lines)
+
+
+async def call_gemini_timed(call, model_role, fn, **kwargs):
+    """19Oct26: one Gemini attempt in a worker thread, counted and timed for /metrics and
+    recorded in the current turn trace (queue wait for a worker vs model latency).
+    call is "tactic" or "response"; model_role is "primary" or "fallback"."""
+    submitted = time.perf_counter()
+    worker_started = None
+    outcome = "cancelled"
+
+    def run():
+        nonlocal worker_started
+        worker_started = time.perf_counter()
+        return fn(**kwargs)
+
+    try:
+        result = await asyncio.to_thread(run)
+        outcome = "ok"
+        return result
+    except Exception as e:
+        outcome = "retryable_error" if is_retryable_error(e) else "error"
+        raise
+    finally:
+        finished = time.perf_counter()
+        gemini_calls_total.labels(call, model_role, outcome).inc()
+        gemini_call_seconds.labels(call, model_role).observe(finished - submitted)
+        if worker_started is not None:
+            gemini_queue_wait_seconds.observe(worker_started - submitted)
+        trace = turn_trace.current()
+        if trace is not None:
+            trace.record_call(call, kwargs.get("model"), model_role, outcome, submitted, worker_started, finished)
+
 def convert_profile_to_readable(user_profile):
     """Convert raw survey data to human-readable labels"""
     readable_profile = user_profile.copy()
@@ -1553,7 +2484,8 @@ JUSTIFICATION: [Why this fits the person's mental state and the current moment i
     for attempt in range(1, max_retries + 1):
         try:
             # Use new Client API with minimal thinking config (safety_settings included in config)
-            response = await asyncio.to_thread(
+            response = await call_gemini_timed(
+                "tactic", "primary",
                 model.models.generate_content,
                 model=GEMINI_PRO_MODEL_NAME,
                 contents=system_prompt_for_tactic_selection,
@@ -1568,10 +2500,12 @@ JUSTIFICATION: [Why this fits the person's mental state and the current moment i
             if is_retryable_error(e):
                 if attempt < max_retries:
                     # Immediate retry, no backoff (kept intentionally fast for the timed study).
-                    print(f"Retryable error in tactic selection (attempt {attempt}/{max_retries}), retrying immediately: {str(e)[:200]}")
+                    study_log.log_event("gemini_retry", f"Retryable error in tactic selection (attempt {attempt}/{max_retries}), retrying immediately: {str(e)[:200]}",
+                                        level=study_log.WARNING, call="tactic", attempt=attempt)
                     continue
                 else:
-                    print(f"Retryable error in tactic selection after {max_retries} attempts, using fallback")
+                    study_log.log_event("gemini_retry", f"Retryable error in tactic selection after {max_retries} attempts, using fallback",
+                                        level=study_log.WARNING, call="tactic", attempt=attempt)
                     raise
             else:
                 # Non-retryable error, raise immediately
@@ -1731,7 +2665,8 @@ In your RESEARCHER_NOTES, include:
         for attempt in range(1, max_retries + 1):
             try:
                 # --- ATTEMPT: PRIMARY MODEL (NON-BLOCKING) --- (safety_settings included in config)
-                response = await asyncio.to_thread(
+                response = await call_gemini_timed(
+                    "response", "primary",
                     GEMINI_CLIENT.models.generate_content,
                     model=GEMINI_PRO_MODEL_NAME,
                     contents=system_prompt,
@@ -1744,12 +2679,14 @@ In your RESEARCHER_NOTES, include:
                 if is_retryable_error(e):
                     if attempt < max_retries:
                         # Immediate retry, no backoff (kept fast for the timed study).
-                        print(f"Retryable error in primary model AI response (attempt {attempt}/{max_retries}), retrying immediately: {str(e)[:200]}")
+                        study_log.log_event("gemini_retry", f"Retryable error in primary model AI response (attempt {attempt}/{max_retries}), retrying immediately: {str(e)[:200]}",
+                                            level=study_log.WARNING, call="response", model="primary", attempt=attempt)
                         primary_retry_attempts += 1
                         continue
                     else:
                         # All retries exhausted on primary, will try fallback
-                        print(f"Retryable error in primary model after {max_retries} attempts, switching to fallback")
+                        study_log.log_event("gemini_retry", f"Retryable error in primary model after {max_retries} attempts, switching to fallback",
+                                            level=study_log.WARNING, call="response", model="primary", attempt=attempt)
                         raise
                 else:
                     # Non-retryable error, raise immediately to try fallback
@@ -1789,17 +2726,12 @@ In your RESEARCHER_NOTES, include:
 
     except Exception as e:
         # Enhanced Railway logging for primary model failure
-        print("=" * 60)
-        print("PRIMARY MODEL FAILURE - SWITCHING TO FALLBACK")
-        print("=" * 60)
-        print(f"Timestamp: {datetime.utcnow().isoformat()}Z")
-        print(f"Primary Model Error: {str(e)}")
-        print(f"Error Type: {type(e).__name__}")
-        print(f"Chosen Persona: {chosen_persona_key}")
-        print(f"Technique: {technique}")
-        print(f"Prompt Length: {len(prompt)} chars")
-        print("Attempting fallback model...")
-        print("=" * 60)
+        gemini_fallbacks_total.labels("switched").inc()
+        study_log.log_event(
+            "gemini_fallback", "PRIMARY MODEL FAILURE - SWITCHING TO FALLBACK", level=study_log.ERROR,
+            primary_model_error=str(e), error_type=type(e).__name__, chosen_persona=chosen_persona_key,
+            technique=technique, prompt_length=f"{len(prompt)} chars", detail="Attempting fallback model...",
+        )
         
         # Retry logic for fallback model with exponential backoff
         response_fallback = None
@@ -1809,7 +2741,8 @@ In your RESEARCHER_NOTES, include:
         for attempt_fallback in range(1, max_retries + 1):
             try:
                 # --- ATTEMPT: FALLBACK MODEL (NON-BLOCKING) ---
-                response_fallback = await asyncio.to_thread(
+                response_fallback = await call_gemini_timed(
+                    "response", "fallback",
                     GEMINI_CLIENT.models.generate_content,
                     model=GEMINI_FLASH_MODEL_NAME,
                     contents=system_prompt,
@@ -1822,12 +2755,14 @@ In your RESEARCHER_NOTES, include:
                 if is_retryable_error(e_fb):
                     if attempt_fallback < max_retries:
                         # Immediate retry, no backoff (kept fast for the timed study).
-                        print(f"Retryable error in fallback model AI response (attempt {attempt_fallback}/{max_retries}), retrying immediately: {str(e_fb)[:200]}")
+                        study_log.log_event("gemini_retry", f"Retryable error in fallback model AI response (attempt {attempt_fallback}/{max_retries}), retrying immediately: {str(e_fb)[:200]}",
+                                            level=study_log.WARNING, call="response", model="fallback", attempt=attempt_fallback)
                         fallback_retry_attempts += 1
                         continue
                     else:
                         # All retries exhausted on fallback too
-                        print(f"Retryable error in fallback model after {max_retries} attempts")
+                        study_log.log_event("gemini_retry", f"Retryable error in fallback model after {max_retries} attempts",
+                                            level=study_log.WARNING, call="response", model="fallback", attempt=attempt_fallback)
                         raise
                 else:
                     # Non-retryable error, raise immediately
@@ -1837,13 +2772,12 @@ In your RESEARCHER_NOTES, include:
             full_text_fallback = response_fallback.text
             
             # Log successful fallback
-            print("=" * 60)
-            print("FALLBACK MODEL SUCCESS")
-            print("=" * 60)
-            print(f"Timestamp: {datetime.utcnow().isoformat()}Z")
-            print(f"Fallback response length: {len(full_text_fallback)} chars")
-            print("Primary model failure recovered successfully")
-            print("=" * 60)
+            study_log.log_event(
+                "gemini_fallback", "FALLBACK MODEL SUCCESS", level=study_log.WARNING,
+                fallback_response_length=f"{len(full_text_fallback)} chars",
+                detail="Primary model failure recovered successfully",
+            )
+            gemini_fallbacks_total.labels("recovered").inc()
             
             # Use same flexible regex matching for fallback
             pattern = r'(?i)\*?\*?RESEARCHER[\s_-]?NOTES\*?\*?\s*:'
@@ -1865,19 +2799,14 @@ In your RESEARCHER_NOTES, include:
 
         except Exception as e_fallback:
             # --- BOTH MODELS FAILED ---
-            print("=" * 60)
-            print("CRITICAL: ALL MODELS FAILED")
-            print("=" * 60)
-            print(f"Timestamp: {datetime.utcnow().isoformat()}Z")
-            print(f"Primary Model Error: {str(e)}")
-            print(f"Primary Error Type: {type(e).__name__}")
-            print(f"Fallback Model Error: {str(e_fallback)}")
-            print(f"Fallback Error Type: {type(e_fallback).__name__}")
-            print(f"Chosen Persona: {chosen_persona_key}")
-            print(f"Technique: {technique}")
-            print(f"Prompt Length: {len(prompt)} chars")
-            print("Returning generic response to prevent study interruption")
-            print("=" * 60)
+            study_log.log_event(
+                "gemini_fallback", "CRITICAL: ALL MODELS FAILED", level=study_log.ERROR,
+                primary_model_error=str(e), primary_error_type=type(e).__name__,
+                fallback_model_error=str(e_fallback), fallback_error_type=type(e_fallback).__name__,
+                chosen_persona=chosen_persona_key, technique=technique, prompt_length=f"{len(prompt)} chars",
+                detail="Returning generic response to prevent study interruption",
+            )
+            gemini_fallbacks_total.labels("all_failed").inc()
             
             generic_response = "I literally don't know how to respond to that"
             researcher_notes = f"CRITICAL FAILURE: Both models failed. Primary Error: {e}. Fallback Error: {e_fallback}."
@@ -1901,13 +2830,17 @@ def assign_domain():
     experimental_condition_type = "not_applicable_due_to_domain_logic_removal"
     return domain_for_conversation, experimental_condition_type
 
-def assign_social_style_counterbalanced(db_session: Session) -> str:
-    """Assign the least-used social style from ENABLED_SOCIAL_STYLES.
-    Queries completed/active sessions in DB, picks the style with fewest assignments.
-    Filters by current STUDY_MODE so each condition balances independently.
-    Ties are broken randomly for fairness."""
-    from sqlalchemy import func
+# 19Oct26: per-(study_mode, style) tallies of live sessions carrying each style, so
+# counterbalancing no longer runs a GROUP BY over the whole study on every assignment.
+# Loaded from the DB on first use, adjusted on assignment / style change / abandonment,
+# and reconciled against the DB by the periodic sweep (run_periodic_cleanup).
+style_tally = {}                 # (study_mode, style) -> count
+style_tally_modes_loaded = set()
+style_tally_lock = threading.Lock()
+
 
+def count_styles_in_db(db_session: Session, study_mode=STUDY_MODE) -> Dict[str, int]:
+    """The authoritative tally: sessions per enabled style, excluding abandoned ones."""
     # Count ALL assignments per style (only exclude abandoned — dead sessions)
     # pre_consent must be included because styles are assigned at role time
     # when session is still pre_consent
@@ -1918,18 +2851,72 @@ def assign_social_style_counterbalanced(db_session: Session) -> str:
     ).filter(
         db.StudySession.social_style.in_(ENABLED_SOCIAL_STYLES),
         db.StudySession.session_status != "abandoned",
-        db.StudySession.study_mode == STUDY_MODE
+        db.StudySession.study_mode == study_mode
     ).group_by(db.StudySession.social_style).all()
 
     count_map = {style: 0 for style in ENABLED_SOCIAL_STYLES}
     for style, count in style_counts:
         if style in count_map:
             count_map[style] = count
+    return count_map
+
+
+def reconcile_style_tally(db_session: Session, study_mode=STUDY_MODE):
+    """Replace the in-memory tally with the DB counts (reports any drift it corrects)."""
+    count_map = count_styles_in_db(db_session, study_mode)
+    with style_tally_lock:
+        drift = {style: count_map[style] - style_tally.get((study_mode, style), 0)
+                 for style in count_map} if study_mode in style_tally_modes_loaded else {}
+        for style, count in count_map.items():
+            style_tally[(study_mode, style)] = count
+        style_tally_modes_loaded.add(study_mode)
+    if any(drift.values()):
+        print(f"📊 Style tally reconciled [{study_mode}]: {count_map} (corrected drift {drift})")
+
+
+def adjust_style_tally(style, delta, study_mode=STUDY_MODE):
+    """Move one style's tally; a no-op until that mode's tally has been loaded."""
+    if style not in ENABLED_SOCIAL_STYLES:
+        return
+    with style_tally_lock:
+        if study_mode in style_tally_modes_loaded:
+            key = (study_mode, style)
+            style_tally[key] = max(style_tally.get(key, 0) + delta, 0)
+
+
+def note_style_released(session_record):
+    """Call BEFORE a session is marked abandoned (or its row reused): it stops counting."""
+    if session_record is None or session_record.session_status == "abandoned":
+        return
+    if session_record.social_style:
+        adjust_style_tally(session_record.social_style, -1, session_record.study_mode or STUDY_MODE)
+
+
+def note_style_changed(session_record, new_style):
+    """Call BEFORE overwriting a live session's social_style outside the assignment path."""
+    if session_record is None or session_record.social_style == new_style:
+        return
+    note_style_released(session_record)
+    if new_style and session_record.session_status != "abandoned":
+        adjust_style_tally(new_style, +1, session_record.study_mode or STUDY_MODE)
+
 
-    min_count = min(count_map.values())
-    least_used = [s for s, c in count_map.items() if c == min_count]
+def assign_social_style_counterbalanced(db_session: Session) -> str:
+    """Assign the least-used social style from ENABLED_SOCIAL_STYLES.
+    Picks the style with fewest live assignments from the in-memory tally (counted
+    per STUDY_MODE so each condition balances independently) and counts the choice
+    immediately, so concurrent assignments see each other.
+    Ties are broken randomly for fairness."""
+    if STUDY_MODE not in style_tally_modes_loaded:
+        reconcile_style_tally(db_session)
+
+    with style_tally_lock:
+        count_map = {style: style_tally.get((STUDY_MODE, style), 0) for style in ENABLED_SOCIAL_STYLES}
+        min_count = min(count_map.values())
+        least_used = [s for s, c in count_map.items() if c == min_count]
+        chosen = random.choice(least_used)
+        style_tally[(STUDY_MODE, chosen)] = count_map[chosen] + 1
 
-    chosen = random.choice(least_used)
     print(f"📊 Counterbalanced style assignment [{STUDY_MODE}]: {count_map} → chose {chosen} (min={min_count}, ties={len(least_used)})")
     return chosen
 
@@ -2070,6 +3057,9 @@ def requeue_or_timeout_session(session_record, db_session: Session, reason: str
     - If total wait time < MAX_TOTAL_WAITING_SECONDS (4 min): re-queue for new match
     - If total wait time >= MAX_TOTAL_WAITING_SECONDS: timeout and redirect to Prolific
 
+    A re-queued session gets its "waiting" deadline here, so every caller that sends a
+    session back to the waiting room also arms its timeout.
+
     Returns: "requeued" or "timed_out"
     """
     if not session_record:
@@ -2105,6 +3095,9 @@ def requeue_or_timeout_session(session_record, db_session: Session, reason: str
             sessions[session_record.id]['proceed_to_chat_at'] = None
             sessions[session_record.id]['first_message_sender'] = None
 
+        schedule_session_deadline(session_record.id, "waiting",
+                                  datetime.utcnow() + timedelta(seconds=REQUEUE_GRACE_SECONDS))
+
         print(f"🔄 RE-QUEUED: {session_record.id[:8]}... after {reason} "
               f"(waited {total_wait_seconds:.0f}s, requeue #{session_record.requeue_count}, "
               f"old partner: {old_partner[:8] if old_partner else 'None'}...)")
@@ -2117,6 +3110,7 @@ def requeue_or_timeout_session(session_record, db_session: Session, reason: str
         return "requeued"
     else:
         # TIMEOUT: They've waited too long (>=4 min total), redirect to Prolific
+        note_style_released(session_record)
         session_record.match_status = "timed_out"
         session_record.session_status = "abandoned"
         session_record.timeout_screen = f"requeue_timeout_{reason}"
@@ -2164,6 +3158,18 @@ def assign_role_balanced(db_session: Session) -> str:
         return random.choice(["interrogator", "witness"])
 
 def attempt_match(db_session: Session) -> Optional[Dict[str, str]]:
+    """Timed wrapper around _attempt_match (match_attempt_seconds)."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        result = _attempt_match(db_session)
+        outcome = "matched" if result else "no_match"
+        return result
+    finally:
+        match_attempt_seconds.labels(outcome).observe(time.perf_counter() - started)
+
+
+def _attempt_match(db_session: Session) -> Optional[Dict[str, str]]:
     """
     Try to match oldest waiting interrogator with oldest waiting witness.
     Returns match info dict if successful, None if no match possible.
@@ -2227,6 +3233,7 @@ def attempt_match(db_session: Session) -> Optional[Dict[str, str]]:
         interrogator.first_message_sender = first_sender
         interrogator.matched_at = datetime.utcnow()
         interrogator.proceed_to_chat_at = proceed_to_chat_at
+        note_style_changed(interrogator, witness.social_style)
         interrogator.social_style = witness.social_style  # Copy witness style for analysis
         interrogator.witness_instructions_version = witness.witness_instructions_version  # Copy for analysis
 
@@ -2243,35 +3250,211 @@ def attempt_match(db_session: Session) -> Optional[Dict[str, str]]:
             sessions[interrogator.id]['first_message_sender'] = first_sender
             sessions[interrogator.id]['proceed_to_chat_at'] = proceed_to_chat_at
 
-        if witness.id in sessions:
-            sessions[witness.id]['matched_session_id'] = interrogator.id
-            sessions[witness.id]['match_status'] = "matched"
-            sessions[witness.id]['first_message_sender'] = first_sender
-            sessions[witness.id]['proceed_to_chat_at'] = proceed_to_chat_at
+        if witness.id in sessions:
+            sessions[witness.id]['matched_session_id'] = interrogator.id
+            sessions[witness.id]['match_status'] = "matched"
+            sessions[witness.id]['first_message_sender'] = first_sender
+            sessions[witness.id]['proceed_to_chat_at'] = proceed_to_chat_at
+
+        db_session.commit()
+        schedule_session_deadline(interrogator.id, "matched", interrogator.matched_at + STALE_SESSION_TIMEOUTS["matched"])
+        schedule_session_deadline(witness.id, "matched", witness.matched_at + STALE_SESSION_TIMEOUTS["matched"])
+
+        # Log match with witness social style
+        study_log.log_event(
+            "match", "human mode match created",
+            interrogator_session=interrogator.id[:8], witness_session=witness.id[:8],
+            witness_style=witness.social_style or "N/A", first_sender=first_sender,
+            proceed_at=proceed_to_chat_at.strftime('%H:%M:%S'),
+        )
+
+        return {
+            'interrogator_sid': interrogator.id,
+            'witness_sid': witness.id,
+            'first_sender': first_sender
+        }
+
+@study_log.renderer("match")
+def render_match_banner(message, fields):
+    return "\n".join([
+        "=" * 60,
+        "👥 HUMAN MODE MATCH CREATED",
+        f"   Interrogator: {fields['interrogator_session']}...",
+        f"   Witness: {fields['witness_session']}...",
+        f"   Witness Social Style: {fields['witness_style']}",
+        f"   First sender: {fields['first_sender']}",
+        f"   Proceed at: {fields['proceed_at']} UTC",
+        "=" * 60,
+    ])
+
+# 19Oct26: per-state timeouts for sessions that stop progressing. Each is enforced by a
+# deadline timer scheduled when the session enters the state (session_deadlines below),
+# with cleanup_orphaned_sessions kept as a low-frequency reconciliation sweep.
+STALE_SESSION_TIMEOUTS = {
+    "matched": timedelta(minutes=2),      # matched but neither partner sent a message
+    "waiting": timedelta(minutes=2),      # stuck in the waiting room
+    "assigned": timedelta(minutes=2),     # never clicked "Enter Waiting Room" (legacy state)
+    "pre_consent": timedelta(minutes=3),  # never progressed past consent (matches consent screen)
+}
+# A re-queued participant keeps their original waiting_room_entered_at (FIFO priority), so
+# they are already past the waiting timeout; give them this long to be re-matched (the old
+# 60s sweep gave them whatever was left of its period).
+REQUEUE_GRACE_SECONDS = int(os.getenv("REQUEUE_GRACE_SECONDS", "60"))
+CLEANUP_RECONCILE_SECONDS = int(os.getenv("CLEANUP_RECONCILE_SECONDS", "300"))
+
+
+def stale_session_state_filters(kind):
+    """WHERE clauses for 'this session is (still) in the state a timeout of this kind applies to'."""
+    filters = [db.StudySession.study_mode == STUDY_MODE]   # FIX 04Aug26 (T1.2): never touch the other condition's sessions
+    if kind == "pre_consent":
+        return filters + [db.StudySession.session_status == "pre_consent"]
+    filters.append(db.StudySession.session_status != "abandoned")  # report_abandonment already handled them
+    if kind == "matched":
+        return filters + [
+            db.StudySession.match_status == "matched",
+            db.StudySession.conversation_phase_reached != True,    # FIX 04Aug26 (T1.1): never re-queue a pair that has started talking
+            func.coalesce(db.StudySession.turn_count, 0) == 0,     # no messages (stored counter, no conversation_log parse)
+        ]
+    return filters + [db.StudySession.match_status == kind]
+
+
+def stale_session_deadline(kind, record):
+    """When a session in `kind` state becomes stale, from the same timestamps the sweep compares.
+    None when the timestamp is missing (the sweep's `<` comparison never matches NULL either)."""
+    if kind == "matched":
+        base = record.matched_at
+    elif kind == "waiting":
+        # #2: waiters with a NULL waiting_room_entered_at fall back to last_updated
+        base = record.waiting_room_entered_at or record.last_updated
+    else:
+        # assigned/pre_consent have no state timestamp of their own; any activity pushes them out
+        base = record.last_updated
+    return base + STALE_SESSION_TIMEOUTS[kind] if base else None
+
+
+def expire_stale_match(session, db_session: Session, processed_session_ids) -> str:
+    """Re-queue (don't orphan) a stale matched session and its partner, if the partner is
+    also still matched without messages. Caller commits."""
+    result = requeue_or_timeout_session(session, db_session, "stale_match_no_messages")
+    processed_session_ids.add(session.id)
+
+    if session.matched_session_id and session.matched_session_id not in processed_session_ids:
+        partner = db_session.query(db.StudySession).filter(
+            db.StudySession.id == session.matched_session_id
+        ).first()
+        if partner and partner.match_status == "matched" and (partner.turn_count or 0) == 0:
+            requeue_or_timeout_session(partner, db_session, "stale_match_no_messages")
+            processed_session_ids.add(partner.id)
+
+    print(f"🔄 Stale match processed: {session.id[:8]}... -> {result}")
+    return result
+
+
+# Column values for timing out a stale waiting / assigned / pre_consent session
+STALE_SESSION_TIMEOUT_VALUES = {
+    "waiting": {"match_status": "timed_out", "timeout_screen": "backend_cleanup_waiting_room"},
+    "assigned": {"match_status": "timed_out", "timeout_screen": "backend_cleanup_post_demo_instructions"},
+    # Created by /get_or_assign_role but never completed demographics; the browser was
+    # closed before beforeunload was attached, so no beacon fired
+    "pre_consent": {"session_status": "abandoned", "match_status": "timed_out",
+                    "timeout_screen": "backend_cleanup_consent"},
+}
+STALE_SESSION_TIMEOUT_LABELS = {
+    "waiting": "Stale waiting session(s) cleaned up (waiting >2 min)",
+    "assigned": "Stale assigned session(s) cleaned up (assigned >2 min, never entered waiting room)",
+    "pre_consent": "Ghost pre_consent session(s) cleaned up (pre_consent >3 min)",
+}
 
+
+def expire_stale_sessions(kind, db_session: Session, *criteria, decrement_counter=True):
+    """Time out every `kind` session matching criteria in ONE UPDATE ... RETURNING (study
+    time computed in SQL), then decrement the role counter once for all of them (unless the
+    caller batches that itself via decrement_counter=False). Caller commits."""
+    expired = db_session.execute(
+        update(db.StudySession)
+        .where(*stale_session_state_filters(kind), *criteria)
+        .values(**STALE_SESSION_TIMEOUT_VALUES[kind], total_study_time_minutes=study_time_minutes_value())
+        .returning(db.StudySession.id, db.StudySession.social_style)
+        .execution_options(synchronize_session=False)
+    ).all()
+    expired_ids = [row.id for row in expired]
+    if STALE_SESSION_TIMEOUT_VALUES[kind].get("session_status") == "abandoned":
+        # pre_consent rows were live before this UPDATE: their styles stop counting
+        for row in expired:
+            if row.social_style:
+                adjust_style_tally(row.social_style, -1)
+    if expired_ids:
+        shown = ", ".join(f"{sid[:8]}..." for sid in expired_ids[:5])
+        more = f" +{len(expired_ids) - 5} more" if len(expired_ids) > 5 else ""
+        print(f"🧹 {len(expired_ids)} {STALE_SESSION_TIMEOUT_LABELS[kind]}: {shown}{more}")
+        if decrement_counter:
+            decrement_role_counters_bulk(db_session, expired_ids)
+    return expired_ids
+
+
+def handle_session_deadline(session_id, kind):
+    """Deadline timer callback: re-check the session and time it out if it is still stale.
+    A session that moved on is dropped; one whose timestamp moved (activity) is rescheduled."""
+    if kind == "matched":
+        # A first message may still be in the journal on its way to turn_count
+        session_journal.wait_for_session(session_id)
+    db_session = db.SessionLocal()
+    try:
+        row = db_session.query(
+            db.StudySession.id,
+            db.StudySession.matched_at,
+            db.StudySession.waiting_room_entered_at,
+            db.StudySession.last_updated,
+        ).filter(db.StudySession.id == session_id, *stale_session_state_filters(kind)).first()
+        if row is None:
+            return  # no longer in that state
+        deadline = stale_session_deadline(kind, row)
+        if deadline is None:
+            return
+        if deadline > datetime.utcnow():
+            session_deadlines.schedule(session_id, kind, deadline)
+            return
+        if kind == "matched":
+            session = db_session.query(db.StudySession).filter(db.StudySession.id == session_id).first()
+            expire_stale_match(session, db_session, set())
+        else:
+            expire_stale_sessions(kind, db_session, db.StudySession.id == session_id)
         db_session.commit()
+    except Exception as e:
+        print(f"Error handling {kind} deadline for {session_id[:8]}...: {str(e)}")
+        db_session.rollback()
+    finally:
+        db_session.close()
 
-        # Log match with witness social style
-        witness_style = witness.social_style or "N/A"
-        print("=" * 60)
-        print(f"👥 HUMAN MODE MATCH CREATED")
-        print(f"   Interrogator: {interrogator.id[:8]}...")
-        print(f"   Witness: {witness.id[:8]}...")
-        print(f"   Witness Social Style: {witness_style}")
-        print(f"   First sender: {first_sender}")
-        print(f"   Proceed at: {proceed_to_chat_at.strftime('%H:%M:%S')} UTC")
-        print("=" * 60)
 
-        return {
-            'interrogator_sid': interrogator.id,
-            'witness_sid': witness.id,
-            'first_sender': first_sender
-        }
+def schedule_session_deadline(session_id, kind, deadline=None):
+    """Arm the timeout for a session that just entered `kind` state (default: now + timeout)."""
+    session_deadlines.schedule(session_id, kind, deadline or datetime.utcnow() + STALE_SESSION_TIMEOUTS[kind])
+
+
+def schedule_session_deadlines(db_session: Session):
+    """(Re)arm timers for every session of this study mode currently in a timed state — on
+    startup, and on each reconciliation sweep for anything a missed hook never scheduled."""
+    scheduled = 0
+    for kind in STALE_SESSION_TIMEOUTS:
+        rows = db_session.query(
+            db.StudySession.id,
+            db.StudySession.matched_at,
+            db.StudySession.waiting_room_entered_at,
+            db.StudySession.last_updated,
+        ).filter(*stale_session_state_filters(kind)).all()
+        for row in rows:
+            deadline = stale_session_deadline(kind, row)
+            if deadline is not None:
+                session_deadlines.schedule(row.id, kind, deadline)
+                scheduled += 1
+    return scheduled
+
 
 def cleanup_orphaned_sessions(db_session: Session):
     """
-    Background cleanup job to detect and mark orphaned/stale sessions.
-    Called periodically to prevent users from waiting forever.
+    Reconciliation sweep: detect and mark orphaned/stale sessions whose deadline timer was
+    lost (server restart) or never armed.
 
     Handles:
     1. Matched sessions where neither partner sent messages (one probably dropped)
@@ -2281,109 +3464,46 @@ def cleanup_orphaned_sessions(db_session: Session):
 
     All cleanup paths decrement the role counter to keep assignment balanced.
     """
-    from datetime import timedelta
-
     try:
-        # 1. Re-queue matched sessions with no activity (partner probably dropped)
-        # If matched >2 minutes ago but no messages sent, RE-QUEUE them for a new partner
-        # This saves participants whose partner dropped during waiting room
-        # Skip sessions already marked as abandoned (report_abandonment already handled them)
-        stale_matches = db_session.query(db.StudySession).filter(
-            db.StudySession.study_mode == STUDY_MODE,              # FIX 04Aug26 (T1.2): never touch the other condition's sessions
-            db.StudySession.match_status == "matched",
-            db.StudySession.session_status != "abandoned",
-            db.StudySession.conversation_phase_reached != True,    # FIX 04Aug26 (T1.1): never re-queue a pair that has started talking
-            db.StudySession.matched_at < datetime.utcnow() - timedelta(minutes=2)
-        ).all()
-
-        # Track which sessions we've processed to avoid double-processing pairs
+        now = datetime.utcnow()
         processed_session_ids = set()
 
+        # 1. Re-queue matched sessions with no activity (partner probably dropped).
+        # Stays per-row: re-queueing pairs partners and may immediately re-match.
+        stale_matches = db_session.query(db.StudySession).filter(
+            *stale_session_state_filters("matched"),
+            db.StudySession.matched_at < now - STALE_SESSION_TIMEOUTS["matched"]
+        ).all()
         for session in stale_matches:
             if session.id in processed_session_ids:
                 continue  # Already handled as part of a pair
-
-            # Check if any messages were sent
-            conv_log = json.loads(session.conversation_log) if session.conversation_log else []
-            if len(conv_log) == 0:
-                # No messages sent - RE-QUEUE this session (don't orphan)
-                # This gives them a chance to match with a new partner
-                result = requeue_or_timeout_session(session, db_session, "stale_match_no_messages")
-                processed_session_ids.add(session.id)
-
-                # Also re-queue the partner if they exist and are still matched
-                if session.matched_session_id:
-                    partner = db_session.query(db.StudySession).filter(
-                        db.StudySession.id == session.matched_session_id
-                    ).first()
-                    if partner and partner.match_status == "matched" and partner.id not in processed_session_ids:
-                        partner_conv = json.loads(partner.conversation_log) if partner.conversation_log else []
-                        if len(partner_conv) == 0:
-                            requeue_or_timeout_session(partner, db_session, "stale_match_no_messages")
-                            processed_session_ids.add(partner.id)
-
-                print(f"🔄 Stale match processed: {session.id[:8]}... -> {result}")
-
-        # 2. Clean up waiting sessions stuck for too long (>2 minutes)
-        # These are likely from abandoned browsers or people who closed the tab
-        # Skip sessions already marked as abandoned (report_abandonment already handled them)
+            expire_stale_match(session, db_session, processed_session_ids)
+        # Sessions just re-queued get their REQUEUE_GRACE_SECONDS before the waiting timeout
+        not_just_requeued = ([db.StudySession.id.notin_(processed_session_ids)]
+                             if processed_session_ids else [])
+
+        # 2-4. Set-based: one UPDATE ... RETURNING per state plus ONE counter update for the
+        # whole sweep, instead of loading every stale row and locking the counter per session.
+        expired_ids = []
         # #2: also catch waiters with a NULL waiting_room_entered_at (an inconsistent ghost state that
         # the plain "< now()-2min" comparison silently skips, so they linger for hours). Fall back to
         # last_updated for the staleness check on those.
-        _stale_cutoff = datetime.utcnow() - timedelta(minutes=2)
-        stale_waiting = db_session.query(db.StudySession).filter(
-            db.StudySession.study_mode == STUDY_MODE,              # FIX 04Aug26 (T1.2)
-            db.StudySession.match_status == "waiting",
-            db.StudySession.session_status != "abandoned",
-            or_(
-                db.StudySession.waiting_room_entered_at < _stale_cutoff,
-                and_(
-                    db.StudySession.waiting_room_entered_at.is_(None),
-                    db.StudySession.last_updated < _stale_cutoff,
-                ),
+        _stale_cutoff = now - STALE_SESSION_TIMEOUTS["waiting"]
+        expired_ids += expire_stale_sessions("waiting", db_session, *not_just_requeued, or_(
+            db.StudySession.waiting_room_entered_at < _stale_cutoff,
+            and_(
+                db.StudySession.waiting_room_entered_at.is_(None),
+                db.StudySession.last_updated < _stale_cutoff,
             ),
-        ).all()
-
-        for session in stale_waiting:
-            session.match_status = "timed_out"
-            session.timeout_screen = "backend_cleanup_waiting_room"
-            calculate_and_save_study_time(session)
-            decrement_role_counter(session, db_session)
-            print(f"🧹 Stale waiting session cleaned up: {session.id[:8]}... (waiting >2 min)")
-
-        # 3. Clean up assigned sessions that never clicked "Enter Waiting Room" (>2 minutes)
+        ), decrement_counter=False)
         # Use last_updated since waiting_room_entered_at isn't set yet for assigned sessions
-        stale_assigned = db_session.query(db.StudySession).filter(
-            db.StudySession.study_mode == STUDY_MODE,              # FIX 04Aug26 (T1.2)
-            db.StudySession.match_status == "assigned",
-            db.StudySession.session_status != "abandoned",
-            db.StudySession.last_updated < datetime.utcnow() - timedelta(minutes=2)
-        ).all()
-
-        for session in stale_assigned:
-            session.match_status = "timed_out"
-            session.timeout_screen = "backend_cleanup_post_demo_instructions"
-            calculate_and_save_study_time(session)
-            decrement_role_counter(session, db_session)
-            print(f"🧹 Stale assigned session cleaned up: {session.id[:8]}... (assigned >2 min, never entered waiting room)")
-
-        # 4. Clean up pre_consent sessions that never progressed (ghost sessions)
-        # These are created by /get_or_assign_role but never completed demographics
-        # Browser was closed before beforeunload was attached, so no beacon fired
-        # Timeout matches consent screen (3 minutes)
-        stale_pre_consent = db_session.query(db.StudySession).filter(
-            db.StudySession.study_mode == STUDY_MODE,              # FIX 04Aug26 (T1.2)
-            db.StudySession.session_status == "pre_consent",
-            db.StudySession.last_updated < datetime.utcnow() - timedelta(minutes=3)
-        ).all()
-
-        for session in stale_pre_consent:
-            session.session_status = "abandoned"
-            session.match_status = "timed_out"
-            session.timeout_screen = "backend_cleanup_consent"
-            calculate_and_save_study_time(session)
-            decrement_role_counter(session, db_session)
-            print(f"🧹 Ghost pre_consent session cleaned up: {session.id[:8]}... (pre_consent >3 min)")
+        expired_ids += expire_stale_sessions("assigned", db_session,
+                                             db.StudySession.last_updated < now - STALE_SESSION_TIMEOUTS["assigned"],
+                                             decrement_counter=False)
+        expired_ids += expire_stale_sessions("pre_consent", db_session,
+                                             db.StudySession.last_updated < now - STALE_SESSION_TIMEOUTS["pre_consent"],
+                                             decrement_counter=False)
+        decrement_role_counters_bulk(db_session, expired_ids)
 
         db_session.commit()
 
@@ -2391,44 +3511,137 @@ def cleanup_orphaned_sessions(db_session: Session):
         print(f"Error in cleanup_orphaned_sessions: {str(e)}")
         db_session.rollback()
 
-# Schedule cleanup job to run every 1 minute (frequent cleanup for responsive user experience)
+# Deadline timers fire each timeout when it is due; the reconciliation sweep below runs
+# every CLEANUP_RECONCILE_SECONDS (was a 60s full sweep, so timeouts landed up to 1 min late)
 import threading
 import time as time_module
+from deadline_scheduler import DeadlineScheduler
+
+session_deadlines = DeadlineScheduler(handle_session_deadline, name="session-deadlines")
 
 def run_periodic_cleanup():
-    """Background thread that runs cleanup every 1 minute (was 5, reduced for faster response)"""
+    """Background thread: arm timers for sessions already in the DB, then reconcile periodically"""
     while True:
-        time_module.sleep(60)  # 1 minute (faster cleanup to match 5-min user timeout rule)
         db_session = None
         try:
             db_session = db.SessionLocal()
             cleanup_orphaned_sessions(db_session)
+            evict_idle_sessions()
+            flush_evicted_pre_session_events(db_session)
+            if SOCIAL_STYLE_ASSIGNMENT == "counterbalanced" and STUDY_MODE in style_tally_modes_loaded:
+                reconcile_style_tally(db_session)
+            armed = schedule_session_deadlines(db_session)
+            if armed:
+                print(f"⏰ Reconciliation: {armed} session deadline timers armed "
+                      f"({session_deadlines.stats()['pending']} pending)")
         except Exception as e:
             print(f"Periodic cleanup error: {str(e)}")
         finally:
             if db_session:
                 db_session.close()
+        time_module.sleep(CLEANUP_RECONCILE_SECONDS)
 
-# Start cleanup thread when server starts
-cleanup_thread = threading.Thread(target=run_periodic_cleanup, daemon=True)
-cleanup_thread.start()
-print("🔧 Background cleanup thread started (runs every 1 minute)")
+cleanup_thread = None
 
-# --- API Endpoints ---
 
-@app.get("/health")
-async def health_check(db_session: Session = Depends(get_db)):
-    """
-    Health check endpoint with detailed system status.
-    Use this to monitor if the server is healthy.
-    """
+def start_background_workers():
+    """Start the deadline timers and the reconciliation/cleanup thread"""
+    global cleanup_thread
+    session_deadlines.start()
+    frontend_debug_store.start()
+    cleanup_thread = threading.Thread(target=run_periodic_cleanup, daemon=True)
+    cleanup_thread.start()
+    print(f"🔧 Session deadline timers started (reconciliation sweep every {CLEANUP_RECONCILE_SECONDS}s)")
+
+
+# --- Startup (run from the lifespan once uvicorn is serving) ---
+def _timed_step(name, fn, *args, **kwargs):
+    step_started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    startup_state["steps"][name] = round(time.perf_counter() - step_started, 3)
+    return result
+
+
+def init_database_and_sessions():
+    """The startup steps that must run in order: schema, then journal replay (so session
+    state is current), then the warm restore, then the interrupted sweep, then the timers."""
+    startup_state["schema"] = _timed_step("schema", db.init_database)
+    _timed_step("journal_replay", session_journal.start,
+                drain_timeout=float(os.getenv("SESSION_JOURNAL_REPLAY_WAIT_SECONDS", "15")))
+    restored = _timed_step("restore_checkpoint", restore_sessions_from_checkpoint)
+    _timed_step("interrupted_sweep", mark_interrupted_sessions_on_startup, skip_session_ids=restored)
+    _timed_step("background_workers", start_background_workers)
+
+
+async def run_startup():
+    """Gemini client and the database chain are independent; build them in parallel."""
+    started = time.perf_counter()
     try:
+        await asyncio.gather(
+            asyncio.to_thread(_timed_step, "gemini", init_gemini),
+            asyncio.to_thread(init_database_and_sessions),
+        )
+    except Exception as e:
+        # Requests stay gated (503) and /health reports the error; the lifespan shuts the
+        # process down (see _shut_down_after_failed_startup).
+        startup_state["error"] = f"{type(e).__name__}: {e}"
+        startup_failed.set()
+        print(f"❌ STARTUP FAILED: {startup_state['error']}")
+        traceback.print_exc()
+        raise
+    else:
+        startup_state["ready"] = True
+        startup_complete.set()
+    finally:
+        startup_state["seconds"] = round(time.perf_counter() - started, 3)
+        steps = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in startup_state["steps"].items())
+        print(f"🚀 STARTUP {'READY' if startup_state['ready'] else 'FAILED'} in "
+              f"{startup_state['seconds']:.2f}s ({steps}) | import took {IMPORT_SECONDS:.2f}s")
+
+
+STARTUP_FAILURE_EXIT_CODE = 3   # uvicorn's own exit status for a failed startup
+
+
+def _shut_down_after_failed_startup(task):
+    """Done-callback of the startup task: a failed startup asks uvicorn for a graceful
+    shutdown (SIGTERM to ourselves), after which the lifespan exits non-zero."""
+    if task.cancelled() or task.exception() is None:
+        return
+    if threading.current_thread() is threading.main_thread():
+        print("🛑 STARTUP FAILED — shutting down so the process is restarted")
+        signal.raise_signal(signal.SIGTERM)
+
+
+def install_drain_signal_handlers():
+    """Flag draining the moment SIGTERM/SIGINT arrives, then hand the signal on to uvicorn's
+    own handler (installed before the lifespan starts), which starts its graceful shutdown."""
+    if threading.current_thread() is not threading.main_thread():
+        return
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        previous = signal.getsignal(sig)
+
+        def handle_shutdown_signal(signum, frame, previous=previous):
+            if not server_draining.is_set():
+                server_draining.set()
+                print(f"🛑 {signal.Signals(signum).name} received — draining: no new sessions, "
+                      f"finishing in-flight requests before the checkpoint")
+            if callable(previous):
+                previous(signum, frame)
+
+        signal.signal(sig, handle_shutdown_signal)
+
+# --- API Endpoints ---
+
+# 19Oct26: /health and /study_status_ping are served from snapshots recomputed at most
+# once per STATUS_SNAPSHOT_MAX_AGE_SECONDS (status_snapshot.py), not per hit.
+STATUS_SNAPSHOT_MAX_AGE_SECONDS = float(os.getenv("STATUS_SNAPSHOT_MAX_AGE_SECONDS", "5"))
+
+
+def _compute_health_counts():
+    with db.SessionLocal() as db_session:
         # Check database connection
         db_session.execute(text("SELECT 1"))
 
-        # Count active sessions
-        active_count = len([s for s in sessions.values() if s.get('session_status') == 'active'])
-
         # Count waiting/matched
         waiting_count = db_session.query(db.StudySession).filter(
             db.StudySession.match_status == "waiting"
@@ -2438,14 +3651,47 @@ async def health_check(db_session: Session = Depends(get_db)):
             db.StudySession.match_status == "matched"
         ).count()
 
+    # Count active sessions
+    active_count = sum(1 for s in list(dict.values(sessions)) if dict.get(s, 'session_status') == 'active')
+    return {
+        "active_sessions": active_count,
+        "waiting_for_match": waiting_count,
+        "currently_matched": matched_count,
+    }
+
+
+health_snapshot = SnapshotCache("health", _compute_health_counts, STATUS_SNAPSHOT_MAX_AGE_SECONDS)
+
+
+@app.get("/health")
+async def health_check():
+    """
+    Health check endpoint with detailed system status.
+    Use this to monitor if the server is healthy.
+    """
+    if startup_failed.is_set():
+        return FastJSONResponse(status_code=503, content={"status": "startup_failed", **startup_state})
+    try:
+        counts = await health_snapshot.get_async()
+
         return {
             "status": "healthy",
             "database": "connected",
             "study_mode": STUDY_MODE,
-            "active_sessions": active_count,
-            "waiting_for_match": waiting_count,
-            "currently_matched": matched_count,
-            "cleanup_thread": "running" if cleanup_thread.is_alive() else "dead"
+            **counts,
+            "counts_age_seconds": health_snapshot.age_seconds(),
+            "cleanup_thread": ("not started" if cleanup_thread is None
+                               else "running" if cleanup_thread.is_alive() else "dead"),
+            "deadline_timers": session_deadlines.stats() if session_deadlines.is_alive() else "dead",
+            "journal": session_journal.stats(),
+            "memory": {
+                "process_rss_bytes": process_rss_bytes(),
+                "sessions": sessions.stats(),
+                "pre_session_events": pre_session_events.stats(),
+                **cache_memory_snapshot,
+            },
+            "draining": server_draining.is_set(),
+            "ready": startup_state["ready"]
         }
     except Exception as e:
         print(f"❌ HEALTH CHECK FAILED: {str(e)}")
@@ -2454,6 +3700,165 @@ async def health_check(db_session: Session = Depends(get_db)):
             "error": str(e)
         }
 
+
+@app.get("/health/live")
+async def health_live():
+    """Liveness: the process is up and serving. Never touches the database, so a slow DB
+    does not get an otherwise healthy process restarted."""
+    return {"status": "alive", "import_seconds": IMPORT_SECONDS, "startup_complete": startup_complete.is_set(),
+            "startup_error": startup_state["error"]}
+
+
+@app.get("/health/ready")
+def health_ready(db_session: Session = Depends(get_db)):
+    """Readiness: startup finished and the database answers. 503 until then (and while
+    draining for a shutdown), so traffic is only routed to a process that can serve it."""
+    body = {"study_mode": STUDY_MODE, "import_seconds": IMPORT_SECONDS, **startup_state,
+            "gemini": GEMINI_CLIENT is not None, "draining": server_draining.is_set()}
+    if startup_failed.is_set():
+        return FastJSONResponse(status_code=503, content={"status": "startup_failed", **body})
+    if not startup_complete.is_set() or server_draining.is_set():
+        return FastJSONResponse(status_code=503, content={"status": "not_ready", **body})
+    try:
+        db_session.execute(text("SELECT 1"))
+    except Exception as e:
+        return FastJSONResponse(status_code=503, content={"status": "database_unavailable", "error": str(e), **body})
+    return {"status": "ready", **body}
+
+
+def _in_memory_session_counts():
+    counts = {}
+    for session in list(dict.values(sessions)):   # dict storage: no LRU touch, no lazy loads
+        key = (dict.get(session, "role") or "none", dict.get(session, "match_status") or "none")
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def _waiting_room_counts():
+    return {
+        (role,): count for (role, match_status), count in _in_memory_session_counts().items()
+        if match_status == "waiting"
+    }
+
+
+metrics.gauge("sessions_in_memory", "In-memory sessions by role and match_status.",
+              ("role", "match_status"), fn=_in_memory_session_counts)
+metrics.gauge("waiting_room_sessions", "In-memory sessions waiting for a partner, by role.",
+              ("role",), fn=_waiting_room_counts)
+metrics.gauge("pre_session_event_buffers", "Participants with buffered pre-session UI events.",
+              fn=lambda: dict.__len__(pre_session_events))
+metrics.gauge("journal_pending_entries", "Journal entries not yet applied to the database.",
+              fn=lambda: session_journal.stats()["pending"])
+metrics.gauge("deadline_timers_pending", "Scheduled session deadline timers.",
+              fn=lambda: session_deadlines.stats()["pending"])
+metrics.gauge("status_snapshot_calls", "Status snapshot hits/refreshes/errors since start.", ("snapshot", "kind"),
+              fn=lambda: {(snapshot.name, kind): count
+                          for snapshot in (health_snapshot, study_status_snapshot)
+                          for kind, count in snapshot.counters.items()})
+metrics.gauge("log_records", "Structured log records: queued, dropped (queue_full/rate_limited), write errors.",
+              ("outcome",), fn=lambda: {(key,): study_log.counters[key] for key in study_log.counters})
+metrics.gauge("log_queue_depth", "Log records waiting for the writer thread.",
+              fn=lambda: study_log.stats()["queue_depth"])
+metrics.gauge("frontend_debug_reports", "/debug_log reports by outcome since start.", ("outcome",),
+              fn=lambda: {(key,): count for key, count in frontend_debug_store.stats().items()
+                          if key not in ("ring_entries", "pending", "tracked_sessions")})
+metrics.gauge("frontend_debug_pending", "/debug_log reports (and repeat-count updates) not yet written.",
+              fn=lambda: frontend_debug_store.stats()["pending"])
+metrics.gauge("request_profiles", "Request profiles taken / skipped (concurrency cap) since start.", ("outcome",),
+              fn=lambda: {(key,): count for key, count in request_profiler.counters.items()})
+metrics.gauge("session_cache_evictions", "Session cache evictions since start.", ("cache", "reason"),
+              fn=lambda: {(cache.name, reason.replace("evicted_", "")): count
+                          for cache in (sessions, pre_session_events)
+                          for reason, count in cache.counters.items()})
+
+
+@app.get("/metrics")
+def get_metrics(request: Request, token: Optional[str] = None):
+    """Prometheus text exposition. Admin token required (query ?token= or a Bearer header),
+    same fail-closed rule as the other researcher/admin endpoints."""
+    admin_token = os.getenv("ADMIN_CHECK_TOKEN")
+    bearer = request.headers.get("authorization", "")
+    if bearer.lower().startswith("bearer "):
+        token = token or bearer[7:].strip()
+    if not admin_token or token != admin_token:
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/admin/sql_stats")
+def get_sql_stats(token: Optional[str] = None, sort: str = "total", limit: int = 50):
+    """SQL statements aggregated by normalized fingerprint (count, total, p50/p99, max and
+    the endpoints/threads issuing them), heaviest first. Admin token required."""
+    admin_token = os.getenv("ADMIN_CHECK_TOKEN")
+    if not admin_token or token != admin_token:
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    if sort not in ("total", "count", "p99", "max"):
+        raise HTTPException(status_code=400, detail="sort must be total, count, p99 or max.")
+    return sql_timing.stats(sort=sort, limit=max(1, min(limit, 500)))
+
+def _turn_latency_csv(study_mode):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(turn_trace.EXPORT_COLUMNS)
+    db_session = db.SessionLocal()
+    try:
+        query = select(
+            db.StudySession.id, db.StudySession.conversation_log,
+            db.StudySession.interrogator_turn_judgment_log, db.StudySession.ai_detected_final,
+        ).where(db.StudySession.conversation_log.isnot(None)).order_by(db.StudySession.start_time)
+        if study_mode:
+            query = query.where(db.StudySession.study_mode == study_mode)
+        for row in db_session.execute(query.execution_options(yield_per=200)):
+            writer.writerows(turn_trace.export_rows(row.id, row.conversation_log,
+                                                    row.interrogator_turn_judgment_log, row.ai_detected_final))
+    finally:
+        db_session.close()
+    return buffer.getvalue()
+
+
+@app.get("/admin/turn_latency_export")
+async def export_turn_latency(token: Optional[str] = None, study_mode: Optional[str] = None):
+    """CSV, one row per AI turn: backend time vs the paper model's target delay, the
+    per-turn trace spans (tactic / generation / queue wait / first token / DB save), the
+    answering model and the interrogator's judgment after that turn. Admin token required."""
+    admin_token = os.getenv("ADMIN_CHECK_TOKEN")
+    if not admin_token or token != admin_token:
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    content = await asyncio.to_thread(_turn_latency_csv, study_mode)
+    return Response(content=content, media_type="text/csv; charset=utf-8", headers={
+        "Content-Disposition": 'attachment; filename="turn_latency.csv"'})
+
+
+@app.get("/admin/profiles")
+def list_request_profiles(token: Optional[str] = None):
+    """The last PROFILE_KEEP request profiles, newest first. Admin token required."""
+    admin_token = os.getenv("ADMIN_CHECK_TOKEN")
+    if not admin_token or token != admin_token:
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    return {"profiler": request_profiler.stats(), "profiles": request_profiler.list_profiles()}
+
+
+@app.get("/admin/profiles/{profile_id}")
+def get_request_profile(profile_id: str, token: Optional[str] = None, format: str = "speedscope"):
+    """One request profile: format=speedscope (open in speedscope.app), collapsed
+    (flamegraph.pl input) or json (summary plus the SQL statement timings)."""
+    admin_token = os.getenv("ADMIN_CHECK_TOKEN")
+    if not admin_token or token != admin_token:
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    profile = request_profiler.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found (only the most recent are kept).")
+    if format == "speedscope":
+        return FastJSONResponse(content=profile.to_speedscope(), headers={
+            "Content-Disposition": f'attachment; filename="profile-{profile.id}.speedscope.json"'})
+    if format == "collapsed":
+        return Response(content=profile.to_collapsed(), media_type="text/plain; charset=utf-8", headers={
+            "Content-Disposition": f'attachment; filename="profile-{profile.id}.folded"'})
+    if format == "json":
+        return {**profile.summary(), "sql": profile.sql_report()}
+    raise HTTPException(status_code=400, detail="format must be speedscope, collapsed or json.")
+
+
 # --- API Endpoints ---
 @app.get("/", response_class=HTMLResponse)
 async def get_home(request: Request):
@@ -2491,8 +3896,10 @@ def get_or_assign_role(data: GetOrAssignRoleRequest, db_session: Session = Depen
     # (via STEP 2 below) reuse+wipe their row. Route them to Prolific instead. Their partner is
     # separately routed to finish the study by the /report_abandonment beacon. Applies to both
     # conditions (initialize_study keys the session row by participant_id in both).
-    _prior = db_session.query(db.StudySession).filter(db.StudySession.id == participant_id).first()
-    if _prior is not None and getattr(_prior, "conversation_phase_reached", False):
+    _prior = db_session.query(db.StudySession.conversation_phase_reached).filter(
+        db.StudySession.id == participant_id
+    ).first()
+    if _prior is not None and _prior.conversation_phase_reached:
         print(f"🔁 RELOAD BLOCKED: {participant_id[:8]}... already in conversation phase; routing to Prolific (no re-queue, data preserved)")
         return {
             "already_in_study": True,
@@ -2501,6 +3908,7 @@ def get_or_assign_role(data: GetOrAssignRoleRequest, db_session: Session = Depen
 
     # AI_WITNESS MODE: Everyone is interrogator (talking to AI)
     if STUDY_MODE == "AI_WITNESS":
+        reject_new_session_while_draining()
         print(f"✅ AI_WITNESS mode: Assigning interrogator role (no counter)")
         return {
             "role": "interrogator",
@@ -2512,6 +3920,7 @@ def get_or_assign_role(data: GetOrAssignRoleRequest, db_session: Session = Depen
     # Only return cached role if session is still in-progress (active or pre_consent).
     # If session is completed/abandoned/interrupted, treat as new participant so the
     # counter logic runs fresh (fixes participantId persistence bug across sessions).
+    session_journal.wait_for_session(participant_id)  # the reuse path below rewrites the logs directly
     existing_session = db_session.query(db.StudySession).filter(
         db.StudySession.id == participant_id
     ).first()
@@ -2536,39 +3945,13 @@ def get_or_assign_role(data: GetOrAssignRoleRequest, db_session: Session = Depen
         return response_data
 
     # STEP 2: New participant - assign role using atomic counter
+    reject_new_session_while_draining()
+    assigned_role = None
     try:
-        # Get or create the counter row (single row table with id=1)
-        counter = db_session.query(db.RoleAssignmentCounter).filter(
-            db.RoleAssignmentCounter.id == 1
-        ).with_for_update().first()
-
-        if not counter:
-            # First time - initialize counter
-            counter = db.RoleAssignmentCounter(
-                id=1,
-                interrogator_count=0,
-                witness_count=0
-            )
-            db_session.add(counter)
-            db_session.flush()  # Get the counter row created
-            print("📊 Initialized RoleAssignmentCounter")
-
-        # Decide which role to assign based on current counts
-        if counter.interrogator_count < counter.witness_count:
-            assigned_role = "interrogator"
-            counter.interrogator_count += 1
-        elif counter.witness_count < counter.interrogator_count:
-            assigned_role = "witness"
-            counter.witness_count += 1
-        else:
-            # Equal counts - alternate deterministically based on total
-            total = counter.interrogator_count + counter.witness_count
-            if total % 2 == 0:
-                assigned_role = "interrogator"
-                counter.interrogator_count += 1
-            else:
-                assigned_role = "witness"
-                counter.witness_count += 1
+        # 19Oct26: one atomic UPDATE ... RETURNING, committed at once. Was SELECT ...
+        # FOR UPDATE on the single counter row, held through the social-style query until the
+        # commit below, so launch bursts serialized every page load on that lock.
+        assigned_role, interrogator_count, witness_count = claim_role_assignment(db_session)
 
         # Assign social style if witness
         assigned_social_style = None
@@ -2586,11 +3969,8 @@ def get_or_assign_role(data: GetOrAssignRoleRequest, db_session: Session = Depen
             style_info = SOCIAL_STYLES.get(assigned_social_style, {})
             social_style_description = get_witness_instruction(assigned_social_style)  # 04Aug26: human-facing, not the AI prompt
 
-        # Commit the counter update
-        db_session.commit()
-
         print(f"🎭 ROLE ASSIGNED: {assigned_role} "
-              f"(Counter now: interrogator={counter.interrogator_count}, witness={counter.witness_count})"
+              f"(Counter now: interrogator={interrogator_count}, witness={witness_count})"
               f"{f', social_style={assigned_social_style}' if assigned_social_style else ''}")
 
         # CRITICAL: Create or update DB record so /finalize_no_session can find it
@@ -2598,6 +3978,7 @@ def get_or_assign_role(data: GetOrAssignRoleRequest, db_session: Session = Depen
         try:
             if existing_session:
                 # Reuse existing record (e.g., same browser, previous session completed/abandoned)
+                note_style_released(existing_session)  # its old style stops counting; the new one was counted at assignment
                 existing_session.user_id = prolific_pid or participant_id
                 existing_session.start_time = datetime.utcnow()
                 existing_session.role = assigned_role
@@ -2606,7 +3987,7 @@ def get_or_assign_role(data: GetOrAssignRoleRequest, db_session: Session = Depen
                 existing_session.chosen_persona = "pending"
                 existing_session.domain = "pending"
                 existing_session.condition = "pending"
-                existing_session.user_profile_survey = json.dumps({})
+                existing_session.user_profile_survey = {}
                 existing_session.initial_tactic_analysis = "pending"
                 existing_session.session_status = "pre_consent"
                 existing_session.match_status = "unmatched"
@@ -2614,7 +3995,16 @@ def get_or_assign_role(data: GetOrAssignRoleRequest, db_session: Session = Depen
                 existing_session.study_mode = STUDY_MODE
                 existing_session.conversation_phase_reached = False
                 existing_session.conversation_started_at = None
+                # 19Oct26: the logs and the counters/checksum describing them are reset together,
+                # and journal_seq moves past anything the previous session still has journaled.
+                existing_session.conversation_log = None
                 existing_session.interrogator_turn_judgment_log = None
+                existing_session.turn_count = 0
+                existing_session.rating_count = 0
+                existing_session.messages_sent = 0
+                existing_session.messages_received = 0
+                existing_session.content_checksum = None
+                existing_session.journal_seq = session_journal.next_seq()
                 existing_session.first_confidence_slider_endpoint_value_percent = None
                 existing_session.first_confidence_slider_endpoint_choice = None
                 existing_session.first_confidence_slider_endpoint_timestamp = None
@@ -2683,7 +4073,7 @@ def get_or_assign_role(data: GetOrAssignRoleRequest, db_session: Session = Depen
                     chosen_persona="pending",
                     domain="pending",
                     condition="pending",
-                    user_profile_survey=json.dumps({}),
+                    user_profile_survey={},
                     initial_tactic_analysis="pending",
                     session_status="pre_consent",
                     study_mode=STUDY_MODE,
@@ -2695,6 +4085,8 @@ def get_or_assign_role(data: GetOrAssignRoleRequest, db_session: Session = Depen
         except Exception as e:
             print(f"⚠️ Could not create/update minimal record: {e}")
             db_session.rollback()
+        else:
+            schedule_session_deadline(participant_id, "pre_consent")
 
         # Return role assignment
         response_data = {
@@ -2712,6 +4104,12 @@ def get_or_assign_role(data: GetOrAssignRoleRequest, db_session: Session = Depen
     except Exception as e:
         db_session.rollback()
         print(f"❌ Error in role assignment: {e}")
+        if assigned_role:
+            # Claimed a slot but never handed it out - give it back
+            try:
+                release_role_assignment(db_session, assigned_role)
+            except Exception as release_error:
+                print(f"⚠️ Could not release role slot ({assigned_role}): {release_error}")
         raise HTTPException(status_code=500, detail=f"Role assignment failed: {str(e)}")
 
 @app.post("/initialize_study")
@@ -2730,6 +4128,8 @@ async def initialize_study(data: InitializeRequest, db_session: Session = Depend
 
     # Check if session already exists
     # Could be: (1) minimal record from /get_or_assign_role, or (2) full record from previous /initialize_study
+    # Pending journaled pre-session events must land first: ui_event_log is rewritten below.
+    await session_journal.wait_for_session_async(session_id)
     existing_session = db_session.query(db.StudySession).filter(
         db.StudySession.id == session_id
     ).first()
@@ -2822,9 +4222,9 @@ async def initialize_study(data: InitializeRequest, db_session: Session = Depend
             existing_session.chosen_persona = sessions[session_id]["chosen_persona_key"]
             existing_session.domain = sessions[session_id]["assigned_domain"]
             existing_session.condition = sessions[session_id]["experimental_condition"]
-            existing_session.user_profile_survey = json.dumps(sessions[session_id]["initial_user_profile_survey"])
+            existing_session.user_profile_survey = sessions[session_id]["initial_user_profile_survey"]
             existing_session.initial_tactic_analysis = sessions[session_id]["initial_tactic_analysis"]["full_analysis"]
-            existing_session.ui_event_log = json.dumps(ui_events)
+            existing_session.ui_event_log = ui_events
             existing_session.consent_accepted = consent_accepted
             existing_session.session_status = "active"  # Change from pre_consent to active
             existing_session.study_mode = STUDY_MODE  # Ensure study_mode is set
@@ -2844,52 +4244,110 @@ async def initialize_study(data: InitializeRequest, db_session: Session = Depend
     return {"session_id": session_id, "message": "Study initialized. You can start the conversation."}
 
 
-@app.post("/debug_log")
-async def debug_log(request: Request):
-    """Internal debug logging endpoint - logs frontend debug info to Railway only"""
-    try:
-        data = await request.json()
+@study_log.renderer("frontend_debug")
+def render_frontend_debug_banner(message, fields):
+    lines = ["=" * 60, "🔴 FRONTEND ERROR CAPTURED" if fields["is_error"] else "🔵 FRONTEND DEBUG INFO", "=" * 60,
+             f"Timestamp: {fields['client_timestamp']}",
+             f"Session ID: {fields['session_id']}",
+             f"Current Turn: {fields['current_turn']}",
+             f"Log Type: {fields['log_type']}",
+             f"Message: {message}"]
+    if fields["stack_trace"] != "No stack trace":
+        lines.append(f"Stack Trace: {fields['stack_trace']}")
+    if fields["additional_context"]:
+        # The store's capped JSON text; a truncated one no longer parses and is shown as is.
+        try:
+            context = json_codec.dumps_pretty(json_codec.loads(fields["additional_context"]))
+        except ValueError:
+            context = fields["additional_context"]
+        lines.append(f"Additional Context: {context}")
+    lines.append("=" * 60)
+    return "\n".join(lines)
 
-        # Extract debug info
-        log_type = data.get("error_type", "Unknown")
-        log_message = data.get("error_message", "No message")
-        session_id = data.get("session_id", "Unknown")
-        current_turn = data.get("current_turn", "Unknown")
-        timestamp = data.get("timestamp", "Unknown")
-        stack_trace = data.get("stack_trace", "No stack trace")
-        additional_context = data.get("additional_context", {})
 
-        # Determine if this is an actual error or just debug info
-        is_error = log_type.endswith('_ERROR') or 'ERROR' in log_type or 'FRONTEND_ERROR' in log_type
+# 19Oct26: /debug_log is unauthenticated and a frontend error loop could post hundreds of
+# reports a second, each printed in full. Reports now go through frontend_debug_store:
+# size caps, per-session + global token buckets and dedup of repeated error signatures;
+# accepted reports land in a ring buffer and (batched) in frontend_debug_logs.
+frontend_debug_store = frontend_debug.FrontendDebugStore(db.SessionLocal, db.FrontendDebugLog)
 
-        # Log to Railway (server logs only)
-        print("=" * 60)
-        if is_error:
-            print("🔴 FRONTEND ERROR CAPTURED")
-        else:
-            print("🔵 FRONTEND DEBUG INFO")
-        print("=" * 60)
-        print(f"Timestamp: {timestamp}")
-        print(f"Session ID: {session_id}")
-        print(f"Current Turn: {current_turn}")
-        print(f"Log Type: {log_type}")
-        print(f"Message: {log_message}")
-        if stack_trace != "No stack trace":
-            print(f"Stack Trace: {stack_trace}")
-        if additional_context:
-            print(f"Additional Context: {json.dumps(additional_context, indent=2)}")
-        print("=" * 60)
+
+@app.post("/debug_log")
+async def debug_log(request: Request):
+    """Internal debug logging endpoint - stores frontend debug info and logs it to Railway"""
+    try:
+        declared_length = int(request.headers.get("content-length") or 0)
+        body = b"" if declared_length > frontend_debug.MAX_BODY_BYTES else await request.body()
+        if declared_length > frontend_debug.MAX_BODY_BYTES or len(body) > frontend_debug.MAX_BODY_BYTES:
+            frontend_debug_store.reject_oversize()
+            return FastJSONResponse(status_code=413, content={"status": "rejected", "message": "Debug log too large"})
+        data = json_codec.loads(body)
+        if not isinstance(data, dict):
+            raise ValueError("debug log body must be a JSON object")
+
+        status, entry = frontend_debug_store.ingest(data)
+        if status.startswith("rate_limited"):
+            return FastJSONResponse(status_code=429, content={"status": status}, headers={"Retry-After": "5"})
+        if status == "duplicate":
+            return {"status": "duplicate", "repeat_count": entry["repeat_count"]}
+
+        # Log to Railway (server logs only): first occurrence of each report only; the banner
+        # (and the indented context JSON) is rendered on the log writer thread.
+        is_error = entry["is_error"]
+        study_log.log_event(
+            "frontend_debug", entry["message"], level=study_log.WARNING if is_error else study_log.INFO,
+            is_error=is_error, client_timestamp=entry["client_timestamp"] or "Unknown",
+            session_id=entry["session_id"], current_turn=entry["current_turn"] or "Unknown",
+            log_type=entry["log_type"], stack_trace=entry["stack_trace"] or "No stack trace",
+            additional_context=entry["additional_context"],
+        )
 
         return {"status": "logged"}
-        
+
     except Exception as e:
         # Fallback logging if JSON parsing fails
         print("=" * 60)
         print("DEBUG LOG ENDPOINT ERROR")
         print("=" * 60)
-        print(f"Failed to parse debug log request: {str(e)}")
+        print(f"Failed to parse debug log request: {str(e)[:500]}")
         print("=" * 60)
-        return {"status": "error", "message": str(e)}
+        return {"status": "error", "message": str(e)[:500]}
+
+
+@app.get("/admin/frontend_debug_log")
+async def get_frontend_debug_log(
+    token: Optional[str] = None,
+    session_id: Optional[str] = None,
+    errors_only: bool = False,
+    limit: int = 200,
+    source: str = "db",
+):
+    """Frontend reports captured by /debug_log, newest first. Admin token required (fails
+    closed). source=db reads frontend_debug_logs (every process, all time); source=memory
+    reads this process's ring buffer and works even while the database is down."""
+    admin_token = os.getenv("ADMIN_CHECK_TOKEN")
+    if not admin_token or token != admin_token:
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    if source not in ("db", "memory"):
+        raise HTTPException(status_code=400, detail="source must be 'db' or 'memory'.")
+    limit = max(1, min(limit, 1000))
+
+    if source == "db":
+        try:
+            entries = await asyncio.to_thread(
+                frontend_debug_store.query, session_id=session_id, errors_only=errors_only, limit=limit)
+        except Exception as e:
+            print(f"⚠️ frontend_debug_logs query failed, answering from the ring buffer: {e}")
+            source = "memory"
+    if source == "memory":
+        entries = frontend_debug_store.recent(session_id=session_id, errors_only=errors_only, limit=limit)
+
+    return {
+        "source": source,
+        "count": len(entries),
+        "entries": entries,
+        "ingestion": frontend_debug_store.stats(),
+    }
 
 
 @app.post("/enter_waiting_room")
@@ -2926,6 +4384,7 @@ async def enter_waiting_room(request: Request, db_session: Session = Depends(get
             session_record.role = 'interrogator'
             session_record.match_status = 'waiting'  # Will be updated when chat starts
             db_session.commit()
+            schedule_session_deadline(session_id, "waiting")
 
         # AI MODE: Assign a social style for the AI witness to use
         # Respect DEBUG_FORCE_SOCIAL_STYLE if set, otherwise use assignment strategy
@@ -2950,7 +4409,7 @@ async def enter_waiting_room(request: Request, db_session: Session = Depends(get
         print(f"   AI Witness Social Style: {ai_social_style}")
         print("=" * 60)
 
-        return JSONResponse(content={
+        return FastJSONResponse(content={
             "ai_partner": True,
             "role": "interrogator",
             "match_status": "waiting",  # Frontend will simulate finding match
@@ -2958,7 +4417,7 @@ async def enter_waiting_room(request: Request, db_session: Session = Depends(get
         })
 
     # HUMAN_WITNESS mode - just return that they're ready (no role assignment yet)
-    return JSONResponse(content={
+    return FastJSONResponse(content={
         "ai_partner": False,
         "ready_to_join": True
     })
@@ -3008,6 +4467,7 @@ def join_waiting_room(data: JoinWaitingRoomRequest, db_session: Session = Depend
             session_record.match_status = 'waiting'
             session_record.waiting_room_entered_at = waiting_timestamp
             db_session.commit()
+            schedule_session_deadline(session_id, "waiting", waiting_timestamp + STALE_SESSION_TIMEOUTS["waiting"])
             print(f"✅ Session {session_id[:8]}... marked as waiting (role: {assigned_role}), DB updated")
         else:
             print(f"⚠️ WARNING: Session {session_id[:8]}... not found in database")
@@ -3046,11 +4506,27 @@ def join_waiting_room(data: JoinWaitingRoomRequest, db_session: Session = Depend
         response_data["social_style"] = assigned_social_style
         response_data["social_style_description"] = get_witness_instruction(assigned_social_style)  # 04Aug26: human-facing, not the AI prompt
 
-    return JSONResponse(content=response_data)
+    return FastJSONResponse(content=response_data)
+
+
+# 19Oct26: the polling endpoints answer through poll_hints.respond(): a weak ETag over the
+# response state (If-None-Match -> 304 when nothing changed) and a next_poll_after_ms hint
+# from the known deadlines below. Intervals are the clients' usual cadence.
+MATCH_POLL_INTERVAL_MS = int(os.getenv("MATCH_POLL_INTERVAL_MS", "3000"))
+PARTNER_POLL_INTERVAL_MS = int(os.getenv("PARTNER_POLL_INTERVAL_MS", "2000"))
+TYPING_POLL_INTERVAL_MS = int(os.getenv("TYPING_POLL_INTERVAL_MS", "1000"))
+TYPING_SIGNAL_SECONDS = 3.0
+
+
+def _seconds_until(deadline):
+    """Seconds from now to a naive-UTC datetime (0 if past), None without a deadline."""
+    if not isinstance(deadline, datetime):
+        return None
+    return max(0.0, (deadline - datetime.utcnow()).total_seconds())
 
 
 @app.get("/check_match_status")
-def check_match_status(session_id: str, db_session: Session = Depends(get_db)):
+def check_match_status(session_id: str, request: Request, db_session: Session = Depends(get_db)):
     """
     Poll endpoint to check if participant has been matched with a partner.
     Called every 3 seconds from frontend while in waiting room.
@@ -3060,7 +4536,7 @@ def check_match_status(session_id: str, db_session: Session = Depends(get_db)):
         session = sessions[session_id]
     else:
         # Check database
-        session_record = db_session.query(db.StudySession).filter(
+        session_record = db_session.query(db.StudySession.id).filter(
             db.StudySession.id == session_id
         ).first()
         if not session_record:
@@ -3078,16 +4554,19 @@ def check_match_status(session_id: str, db_session: Session = Depends(get_db)):
 
     # FIX BUG 1: Also check database for cleanup-marked status (in-memory may be stale)
     # The cleanup job marks sessions as timed_out/orphaned in the database
-    db_record = db_session.query(db.StudySession).filter(
+    db_record = db_session.query(
+        db.StudySession.match_status,
+        db.StudySession.requeue_count,
+    ).filter(
         db.StudySession.id == session_id
     ).first()
     if db_record and db_record.match_status in ('timed_out', 'orphaned'):
         print(f"⚠️ SESSION CLEANED UP: {session_id[:8]}... was marked {db_record.match_status} by cleanup job")
-        return JSONResponse(content={
+        return poll_hints.respond(request, {
             "matched": False,
             "timed_out": True,
             "cleanup_reason": db_record.match_status
-        })
+        }, None)
 
     # Calculate time waiting
     time_waiting_seconds = 0
@@ -3104,41 +4583,55 @@ def check_match_status(session_id: str, db_session: Session = Depends(get_db)):
         print(f"🔍 MATCH STATUS CHECK: Session {session_id[:8]}... matched, proceed_at={proceed_at}, "
               f"timestamp={proceed_at_timestamp}, type={type(proceed_at).__name__}")
 
-        return JSONResponse(content={
+        return poll_hints.respond(request, {
             "matched": True,
             "partner_session_id": session.get('matched_session_id'),
             "first_message_sender": session.get('first_message_sender'),
             "time_waiting_seconds": time_waiting_seconds,
             "proceed_to_chat_at": proceed_at_timestamp  # Unix timestamp for frontend
-        })
+        }, None, volatile=("time_waiting_seconds",))
     else:
         # Check if this session was re-queued (for frontend UX messaging)
         requeue_count = db_record.requeue_count if db_record else 0
 
-        return JSONResponse(content={
+        # A match is made when a partner enters the room; the only scheduled change is the
+        # waiting-room timeout.
+        next_poll = poll_hints.next_poll_ms(
+            MATCH_POLL_INTERVAL_MS, _seconds_until(session_deadlines.deadline(session_id, "waiting")))
+        return poll_hints.respond(request, {
             "matched": False,
             "timed_out": False,
             "time_waiting_seconds": time_waiting_seconds,
             "requeue_count": requeue_count or 0,  # 0 = first match attempt, >0 = re-queued after partner dropped
             "was_requeued": (requeue_count or 0) > 0  # Convenience flag for frontend
-        })
+        }, next_poll, volatile=("time_waiting_seconds",))
 
 
-@app.get("/study_status_ping")
-async def study_status_ping(db_session: Session = Depends(get_db)):
-    """
-    Status monitoring endpoint - returns current state of all active participants.
-    Called periodically by frontend to log status to Railway for visual monitoring.
-    Helps researcher see if interrogator/witness counts are balanced and catch issues early.
-    """
-    try:
+# Banner cadence: the ping is polled by every participant's browser, so the Railway banner
+# is printed when the numbers change, and otherwise at most once a minute.
+STUDY_STATUS_BANNER_INTERVAL_SECONDS = 60
+_study_status_banner = {"stats": None, "printed_at": 0.0}
+
+
+def _compute_study_status():
+    with db.SessionLocal() as db_session:
         # Count active sessions by role and status
         # Only count sessions that are actually active (not completed/abandoned)
-        active_sessions = db_session.query(db.StudySession).filter(
+        active_sessions = db_session.query(
+            db.StudySession.role,
+            db.StudySession.match_status,
+            # "in conversation" = has messages: stored counter, no conversation_log parse
+            (func.coalesce(db.StudySession.turn_count, 0) > 0).label("has_messages"),
+            func.count().label("sessions"),
+        ).filter(
             db.StudySession.session_status.in_(["active", "pre_consent"]),
             db.StudySession.role.isnot(None),
             db.StudySession.study_mode == STUDY_MODE  # FIX (05Aug26): report THIS condition only, so the
             # balance dashboard is not polluted by the other simultaneously-running study's traffic.
+        ).group_by(
+            db.StudySession.role,
+            db.StudySession.match_status,
+            func.coalesce(db.StudySession.turn_count, 0) > 0,
         ).all()
 
         # Categorize by role and match_status
@@ -3148,33 +4641,23 @@ async def study_status_ping(db_session: Session = Depends(get_db)):
             "unassigned": 0
         }
 
-        for session in active_sessions:
-            role = session.role
-            match_status = session.match_status or "unassigned"
-
-            if role == "interrogator":
-                stats["interrogators"]["total"] += 1
-                if match_status == "waiting":
-                    stats["interrogators"]["waiting"] += 1
-                elif match_status == "matched":
-                    # Check if they have messages (in conversation vs just matched)
-                    conv_log = json.loads(session.conversation_log) if session.conversation_log else []
-                    if len(conv_log) > 0:
-                        stats["interrogators"]["in_conversation"] += 1
-                    else:
-                        stats["interrogators"]["matched"] += 1
-            elif role == "witness":
-                stats["witnesses"]["total"] += 1
-                if match_status == "waiting":
-                    stats["witnesses"]["waiting"] += 1
-                elif match_status == "matched":
-                    conv_log = json.loads(session.conversation_log) if session.conversation_log else []
-                    if len(conv_log) > 0:
-                        stats["witnesses"]["in_conversation"] += 1
-                    else:
-                        stats["witnesses"]["matched"] += 1
-            else:
-                stats["unassigned"] += 1
+        for group in active_sessions:
+            role = group.role
+            match_status = group.match_status or "unassigned"
+            bucket = {"interrogator": "interrogators", "witness": "witnesses"}.get(role)
+
+            if bucket is None:
+                stats["unassigned"] += group.sessions
+                continue
+            stats[bucket]["total"] += group.sessions
+            if match_status == "waiting":
+                stats[bucket]["waiting"] += group.sessions
+            elif match_status == "matched":
+                # Check if they have messages (in conversation vs just matched)
+                if group.has_messages:
+                    stats[bucket]["in_conversation"] += group.sessions
+                else:
+                    stats[bucket]["matched"] += group.sessions
 
         # Get role counter for comparison
         counter = db_session.query(db.RoleAssignmentCounter).filter(
@@ -3190,7 +4673,11 @@ async def study_status_ping(db_session: Session = Depends(get_db)):
         waiting_mismatch = stats["interrogators"]["waiting"] - stats["witnesses"]["waiting"]
         total_mismatch = stats["interrogators"]["total"] - stats["witnesses"]["total"]
 
-        # Log to Railway with clear visual formatting
+    # Log to Railway with clear visual formatting
+    banner_key = (stats, counter_stats)
+    if (banner_key != _study_status_banner["stats"]
+            or time.monotonic() - _study_status_banner["printed_at"] >= STUDY_STATUS_BANNER_INTERVAL_SECONDS):
+        _study_status_banner.update(stats=banner_key, printed_at=time.monotonic())
         print(f"""
 ╔══════════════════════════════════════════════════════════════╗
 ║                    📊 STUDY STATUS PING                       ║
@@ -3206,27 +4693,44 @@ async def study_status_ping(db_session: Session = Depends(get_db)):
 ╚══════════════════════════════════════════════════════════════╝
 """)
 
-        return JSONResponse(content={
-            "status": "ok",
-            "study_mode": STUDY_MODE,
-            "interrogators": stats["interrogators"],
-            "witnesses": stats["witnesses"],
-            "waiting_mismatch": waiting_mismatch,
-            "total_mismatch": total_mismatch,
-            "role_counter": counter_stats,
-            "timestamp": datetime.utcnow().isoformat()
-        })
+    return {
+        "status": "ok",
+        "study_mode": STUDY_MODE,
+        "interrogators": stats["interrogators"],
+        "witnesses": stats["witnesses"],
+        "waiting_mismatch": waiting_mismatch,
+        "total_mismatch": total_mismatch,
+        "role_counter": counter_stats,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
 
+study_status_snapshot = SnapshotCache("study_status", _compute_study_status, STATUS_SNAPSHOT_MAX_AGE_SECONDS)
+
+
+@app.get("/study_status_ping")
+async def study_status_ping(request: Request):
+    """
+    Status monitoring endpoint - returns current state of all active participants.
+    Called periodically by frontend to log status to Railway for visual monitoring.
+    Helps researcher see if interrogator/witness counts are balanced and catch issues early.
+    19Oct26: served from a snapshot (see STATUS_SNAPSHOT_MAX_AGE_SECONDS); "timestamp" is
+    when it was computed; asking again before the snapshot's max age returns the same one.
+    """
+    try:
+        snapshot = await study_status_snapshot.get_async()
+        return poll_hints.respond(request, {**snapshot}, poll_hints.next_poll_ms(STATUS_SNAPSHOT_MAX_AGE_SECONDS * 1000),
+                                  volatile=("timestamp",))
     except Exception as e:
         print(f"❌ STUDY STATUS PING ERROR: {str(e)}")
-        return JSONResponse(content={
+        return FastJSONResponse(content={
             "status": "error",
             "error": str(e)
         })
 
 
 @app.get("/check_partner_message")
-def check_partner_message(session_id: str, db_session: Session = Depends(get_db)):
+def check_partner_message(session_id: str, request: Request, db_session: Session = Depends(get_db)):
     """
     Poll endpoint for human-human conversations.
     Checks if partner has sent a new message.
@@ -3251,11 +4755,11 @@ def check_partner_message(session_id: str, db_session: Session = Depends(get_db)
     # NEW: Check if THIS session has been marked as partner_dropped (partner abandoned)
     if session.get('match_status') == 'partner_dropped':
         print(f"🚨 THIS SESSION MARKED AS PARTNER_DROPPED: {session_id[:8]}...")
-        return JSONResponse(content={
+        return poll_hints.respond(request, {
             "new_message": False,
             "partner_dropped": True,
             "study_completed": False
-        })
+        }, None)
 
     # Check if partner session exists
     partner = sessions.get(partner_id)
@@ -3268,29 +4772,29 @@ def check_partner_message(session_id: str, db_session: Session = Depends(get_db)
         # Check if partner completed the study normally (interrogator finished)
         if partner_record and partner_record.session_status == "completed":
             print(f"✅ PARTNER COMPLETED: {partner_id[:8]}... completed study normally")
-            return JSONResponse(content={
+            return poll_hints.respond(request, {
                 "new_message": False,
                 "partner_dropped": False,
                 "study_completed": True  # Partner finished the study
-            })
+            }, None)
 
         if not partner_record or partner_record.match_status == "partner_dropped":
-            return JSONResponse(content={
+            return poll_hints.respond(request, {
                 "new_message": False,
                 "partner_dropped": True,
                 "study_completed": False
-            })
+            }, None)
 
         # Try to recover partner session
         partner = recover_session_from_database(partner_id, db_session)
         if partner:
             sessions[partner_id] = partner
         else:
-            return JSONResponse(content={
+            return poll_hints.respond(request, {
                 "new_message": False,
                 "partner_dropped": True,
                 "study_completed": False
-            })
+            }, None)
 
     # Check if partner has sent a new message
     # SAFETY: Only return messages that are actually newer (prevents duplicates)
@@ -3311,12 +4815,12 @@ def check_partner_message(session_id: str, db_session: Session = Depends(get_db)
                 remaining_delay = delivery_time - current_time
                 print(f"⏳ MESSAGE DELAYED: {partner_id[:8]}... -> {session_id[:8]}... | {remaining_delay:.2f}s remaining")
 
-                return JSONResponse(content={
+                return poll_hints.respond(request, {
                     "new_message": False,
                     "partner_typing": True,  # NEW: Signal that partner is "typing" (artificial delay)
                     "partner_dropped": False,
                     "study_completed": False
-                })
+                }, poll_hints.next_poll_ms(PARTNER_POLL_INTERVAL_MS, remaining_delay))
 
             # SAFETY: Verify turn numbers match (detect gaps)
             if partner_turn - my_turn > 1:
@@ -3328,7 +4832,8 @@ def check_partner_message(session_id: str, db_session: Session = Depends(get_db)
             # messages and a duplicate turn_count advance). Claim the turn BEFORE appending so
             # the double-append window is as small as possible on a single worker.
             if session.get('turn_count', 0) >= partner_turn:
-                return JSONResponse(content={"new_message": False, "partner_dropped": False, "study_completed": False})
+                return poll_hints.respond(request, {"new_message": False, "partner_dropped": False, "study_completed": False},
+                                          poll_hints.next_poll_ms(PARTNER_POLL_INTERVAL_MS))
             session['turn_count'] = partner_turn
             session['conversation_log'].append(copy.deepcopy(latest_message))
 
@@ -3338,33 +4843,38 @@ def check_partner_message(session_id: str, db_session: Session = Depends(get_db)
             # saved transcript — which made the stale-match cleanup sweep re-queue a LIVE pair
             # (proven), and lost the message on a server restart. Marking the conversation phase
             # also lets the cleanup sweep tell a talking pair from one that never started.
+            # 19Oct26: journaled server-side append of just this turn instead of rewriting the whole log.
             try:
-                _rec = db_session.query(db.StudySession).filter(db.StudySession.id == session_id).first()
-                if _rec:
-                    _rec.conversation_log = json.dumps(session['conversation_log'])
-                    mark_conversation_phase_reached(_rec)
-                    _rec.last_updated = datetime.utcnow()
-                    db_session.commit()
+                session_journal.record("json_append", session_id, {
+                    "column": "conversation_log",
+                    "items": [latest_message],
+                    "values": {
+                        "turn_count": len(session['conversation_log']),
+                        **message_count_values(session['conversation_log'], session.get('role')),
+                        "content_checksum": None,  # partial write; the next full save re-stamps it
+                        "last_updated": datetime.utcnow(),
+                    },
+                    "mark_conversation_phase": True,
+                })
             except Exception as _e:
-                db_session.rollback()
                 print(f"⚠️ received-message persist failed for {session_id[:8]}...: {_e}")
 
             print(f"✉️ MESSAGE DELIVERED: {partner_id[:8]}... -> {session_id[:8]}... (Turn {partner_turn})")
 
-            return JSONResponse(content={
+            return poll_hints.respond(request, {
                 "new_message": True,
                 "message_text": latest_message.get('user', latest_message.get('assistant', '')),
                 "turn": partner_turn,
                 "timestamp": time.time(),
                 "partner_dropped": False,
                 "study_completed": False
-            })
+            }, poll_hints.next_poll_ms(PARTNER_POLL_INTERVAL_MS), volatile=("timestamp",))
 
-    return JSONResponse(content={
+    return poll_hints.respond(request, {
         "new_message": False,
         "partner_dropped": False,
         "study_completed": False
-    })
+    }, poll_hints.next_poll_ms(PARTNER_POLL_INTERVAL_MS))
 
 
 @app.post("/signal_typing")
@@ -3384,11 +4894,11 @@ async def signal_typing(request: Request):
     # Store typing timestamp
     session['typing_at'] = datetime.utcnow()
 
-    return JSONResponse(content={"success": True})
+    return FastJSONResponse(content={"success": True})
 
 
 @app.get("/check_partner_typing")
-async def check_partner_typing(session_id: str):
+async def check_partner_typing(session_id: str, request: Request):
     """
     Check if partner is currently typing.
     Returns true if partner's typing timestamp is within last 3 seconds.
@@ -3400,7 +4910,7 @@ async def check_partner_typing(session_id: str):
     partner_id = session.get('matched_session_id')
 
     if not partner_id or partner_id not in sessions:
-        return JSONResponse(content={"is_typing": False})
+        return poll_hints.respond(request, {"is_typing": False}, poll_hints.next_poll_ms(TYPING_POLL_INTERVAL_MS))
 
     partner = sessions[partner_id]
     typing_at = partner.get('typing_at')
@@ -3408,11 +4918,14 @@ async def check_partner_typing(session_id: str):
     if typing_at and isinstance(typing_at, datetime):
         # Check if typing signal is recent (within last 3 seconds)
         seconds_since_typing = (datetime.utcnow() - typing_at).total_seconds()
-        is_typing = seconds_since_typing < 3.0
+        is_typing = seconds_since_typing < TYPING_SIGNAL_SECONDS
 
-        return JSONResponse(content={"is_typing": is_typing})
+        # While typing, the signal lapses at a known time unless it is renewed
+        next_poll = poll_hints.next_poll_ms(
+            TYPING_POLL_INTERVAL_MS, TYPING_SIGNAL_SECONDS - seconds_since_typing if is_typing else None)
+        return poll_hints.respond(request, {"is_typing": is_typing}, next_poll)
 
-    return JSONResponse(content={"is_typing": False})
+    return poll_hints.respond(request, {"is_typing": False}, poll_hints.next_poll_ms(TYPING_POLL_INTERVAL_MS))
 
 
 @app.get("/check_session_status")
@@ -3421,23 +4934,23 @@ async def check_session_status(session_id: str, db_session: Session = Depends(ge
     Check session status for refresh recovery.
     Returns current state of session for frontend to restore.
     """
-    session_record = db_session.query(db.StudySession).filter(
+    session_record = db_session.query(
+        db.StudySession.role,
+        db.StudySession.match_status,
+        db.StudySession.matched_session_id,
+        db.StudySession.first_message_sender,
+        db.StudySession.turn_count,
+    ).filter(
         db.StudySession.id == session_id
     ).first()
 
     if not session_record:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    # Get turn count from conversation log
-    turn_count = 0
-    if session_record.conversation_log:
-        try:
-            conv_log = json.loads(session_record.conversation_log)
-            turn_count = len(conv_log)
-        except:
-            turn_count = 0
+    # Stored alongside conversation_log on every save, so the log itself is never loaded
+    turn_count = session_record.turn_count or 0
 
-    return JSONResponse(content={
+    return FastJSONResponse(content={
         "session_id": session_id,
         "role": session_record.role,
         "match_status": session_record.match_status,
@@ -3476,6 +4989,7 @@ async def report_abandonment(request: Request, db_session: Session = Depends(get
 
         if session_record:
             # Mark as abandoned
+            note_style_released(session_record)
             session_record.session_status = 'abandoned'
             session_record.match_status = 'abandoned'
             session_record.last_updated = datetime.utcnow()
@@ -3517,12 +5031,12 @@ async def report_abandonment(request: Request, db_session: Session = Depends(get
             print(f"⚠️ Could not save to DroppedParticipant (may already exist): {e}")
             db_session.rollback()
 
-        return JSONResponse(content={"message": "Abandonment logged"}, status_code=200)
+        return FastJSONResponse(content={"message": "Abandonment logged"}, status_code=200)
 
     except Exception as e:
         print(f"❌ Error in report_abandonment: {e}")
         # Always return 200 for beacon (even on error - beacon can't retry)
-        return JSONResponse(content={"message": "Error logged"}, status_code=200)
+        return FastJSONResponse(content={"message": "Error logged"}, status_code=200)
 
 
 @app.post("/report_partner_dropped")
@@ -3546,7 +5060,7 @@ async def report_partner_dropped(request: Request, db_session: Session = Depends
             db.StudySession.id == session_id
         ).first()
         if session_record:
-            recovered = recover_session_from_database(session_id, db_session)
+            recovered = await asyncio.to_thread(recover_session_from_database, session_id, db_session)
             if recovered:
                 sessions[session_id] = recovered
         else:
@@ -3555,7 +5069,8 @@ async def report_partner_dropped(request: Request, db_session: Session = Depends
     session = sessions.get(session_id, {})
     partner_id = session.get('matched_session_id')
 
-    # Get the database record for this session
+    # Get the database record for this session (a just-sent/received turn may still be journaled)
+    await session_journal.wait_for_session_async(session_id)
     session_record = db_session.query(db.StudySession).filter(
         db.StudySession.id == session_id
     ).first()
@@ -3563,10 +5078,8 @@ async def report_partner_dropped(request: Request, db_session: Session = Depends
     if not session_record:
         raise HTTPException(status_code=404, detail="Session record not found")
 
-    # Check if any messages were exchanged
-    conv_log = json.loads(session_record.conversation_log) if session_record.conversation_log else []
-
-    if len(conv_log) > 0:
+    # Check if any messages were exchanged (stored counter, no conversation_log parse)
+    if _stored_log_count(session_record, "turn_count", "conversation_log") > 0:
         # Messages were exchanged - this is a mid-conversation dropout
         # Don't re-queue, let the frontend handle final choice flow
         session_record.match_status = 'partner_dropped'
@@ -3597,8 +5110,8 @@ async def report_partner_dropped(request: Request, db_session: Session = Depends
 
         db_session.commit()
 
-        print(f"❌ Partner dropped MID-CONVERSATION: {session_id[:8]}... ({len(conv_log)} messages exchanged)")
-        return JSONResponse(content={
+        print(f"❌ Partner dropped MID-CONVERSATION: {session_id[:8]}... ({session_record.turn_count} messages exchanged)")
+        return FastJSONResponse(content={
             "message": "Partner dropout logged (mid-conversation)",
             "requeued": False,
             "timed_out": False,
@@ -3618,6 +5131,7 @@ async def report_partner_dropped(request: Request, db_session: Session = Depends
             db.StudySession.id == partner_id
         ).first()
         if partner_record:
+            note_style_released(partner_record)
             partner_record.match_status = 'orphaned'
             partner_record.session_status = 'abandoned'
             partner_record.timeout_screen = 'partner_reported_dropout'
@@ -3627,7 +5141,7 @@ async def report_partner_dropped(request: Request, db_session: Session = Depends
 
     print(f"🔄 Partner dropout in waiting room: {session_id[:8]}... -> {result}")
 
-    return JSONResponse(content={
+    return FastJSONResponse(content={
         "message": f"Partner dropout handled: {result}",
         "requeued": result == "requeued",
         "timed_out": result == "timed_out",
@@ -3645,7 +5159,7 @@ async def send_message(data: ChatRequest, db_session: Session = Depends(get_db))
 
     # NEW: Try to recover session from database if not in memory
     if session_id not in sessions:
-        recovered_session = recover_session_from_database(session_id, db_session)
+        recovered_session = await asyncio.to_thread(recover_session_from_database, session_id, db_session)
         if recovered_session:
             sessions[session_id] = recovered_session
             # Flag this session as recovered from restart for analysis
@@ -3655,6 +5169,7 @@ async def send_message(data: ChatRequest, db_session: Session = Depends(get_db))
             raise HTTPException(status_code=404, detail="Session not found")
     
     session = sessions[session_id]
+    await load_recovered_logs(session)
 
     # NEW: Check if this is human-human conversation (HUMAN_WITNESS mode)
     partner_session_id = session.get('matched_session_id')
@@ -3665,7 +5180,7 @@ async def send_message(data: ChatRequest, db_session: Session = Depends(get_db))
     # be found, tell the frontend the partner is unavailable so it routes to the dropout flow.
     if STUDY_MODE == "HUMAN_WITNESS":
         if partner_session_id and partner_session_id not in sessions:
-            recovered_partner = recover_session_from_database(partner_session_id, db_session)
+            recovered_partner = await asyncio.to_thread(recover_session_from_database, partner_session_id, db_session)
             if recovered_partner:
                 sessions[partner_session_id] = recovered_partner
                 print(f"HH partner {partner_session_id[:8]}... recovered from DB for message routing")
@@ -3684,6 +5199,7 @@ async def send_message(data: ChatRequest, db_session: Session = Depends(get_db))
     if is_human_partner:
         # Human witness conversation - route message to partner (no AI generation)
         partner = sessions[partner_session_id]
+        await load_recovered_logs(partner)
         current_turn = session["turn_count"] + 1
 
         # Human witnesses are delivered on their ACTUAL typing time — NO artificial
@@ -3733,7 +5249,9 @@ async def send_message(data: ChatRequest, db_session: Session = Depends(get_db))
         session["turn_count"] = current_turn
 
         # Save to database
-        update_session_after_message(session, db_session)
+        stage_started = time.perf_counter()
+        await update_session_after_message(session)
+        SEND_MESSAGE_STAGES["journal_enqueue"].observe(time.perf_counter() - stage_started)
 
         print(f"Human-human message sent: {session.get('role')} ({session_id[:8]}...) -> {partner.get('role')} ({partner_session_id[:8]}...) | Chars: {len(user_message)}, Delay: {delay_seconds:.2f}s")
 
@@ -3760,8 +5278,10 @@ async def send_message(data: ChatRequest, db_session: Session = Depends(get_db))
 
 
     actual_ai_processing_start_time = time.time()
+    trace = turn_trace.start()  # 19Oct26: per-turn spans, stored as timing["trace"]
     retrieved_chosen_persona_key = session["chosen_persona_key"]
 
+    stage_started = time.perf_counter()
     try:
         # NEW: Pass previous tactic analyses if CONNECTIVE_CONTEXT_MEMORY is enabled
         prev_tactic_analyses = session["tactic_selection_log"] if CONNECTIVE_CONTEXT_MEMORY else None
@@ -3782,6 +5302,9 @@ async def send_message(data: ChatRequest, db_session: Session = Depends(get_db))
         print(f"Tactic selection failed after retries (turn {current_ai_response_turn}): {str(e)}")
         tactic_key_for_this_turn = "no_tactic_selected"
         tactic_sel_justification = f"Tactic selection failed after all retry attempts (turn {current_ai_response_turn}): {str(e)}. Response generation will choose its own approach."
+    stage_seconds = time.perf_counter() - stage_started
+    SEND_MESSAGE_STAGES["tactic_llm"].observe(stage_seconds)
+    trace.add_span("tactic_selection_seconds", stage_seconds)
 
     # Check if this turn already exists in tactic_selection_log (from frontend retry)
     existing_tactic_idx = None
@@ -3798,7 +5321,8 @@ async def send_message(data: ChatRequest, db_session: Session = Depends(get_db))
 
     if existing_tactic_idx is not None:
         # Update existing entry (frontend retry scenario)
-        print(f"--- DEBUG: Updating existing tactic log for turn {current_ai_response_turn} (frontend retry detected) ---")
+        study_log.log_event("turn_debug", f"--- DEBUG: Updating existing tactic log for turn {current_ai_response_turn} (frontend retry detected) ---",
+                            level=study_log.DEBUG, session_id=session_id[:8], turn=current_ai_response_turn)
         session["tactic_selection_log"][existing_tactic_idx] = tactic_log_data
     else:
         # Append new entry (first attempt)
@@ -3830,9 +5354,11 @@ async def send_message(data: ChatRequest, db_session: Session = Depends(get_db))
             for entry in session["ai_researcher_notes_log"]
         ]
 
+    stage_started = time.perf_counter()
     for attempt in range(1, max_retries + 1):
         try:
-            print(f"--- DEBUG: AI Response Generation Attempt {attempt}/{max_retries} ---")
+            study_log.log_event("turn_debug", f"--- DEBUG: AI Response Generation Attempt {attempt}/{max_retries} ---",
+                                level=study_log.DEBUG, session_id=session_id[:8], attempt=attempt)
             attempt_start = time.time()
 
             ai_response_text, researcher_notes, attempt_metadata = await generate_ai_response(
@@ -3853,42 +5379,41 @@ async def send_message(data: ChatRequest, db_session: Session = Depends(get_db))
             backend_retry_time += attempt_metadata.get("retry_time", 0.0)
 
             # If we get here, generation succeeded
-            print(f"--- DEBUG: AI Response Generation Succeeded on Attempt {attempt} ---")
+            study_log.log_event("turn_debug", f"--- DEBUG: AI Response Generation Succeeded on Attempt {attempt} ---",
+                                level=study_log.DEBUG, session_id=session_id[:8], attempt=attempt)
             break
             
         except Exception as e:
-            print("=" * 60)
-            print(f"AI RESPONSE GENERATION FAILED - ATTEMPT {attempt}/{max_retries}")
-            print("=" * 60)
-            print(f"Timestamp: {datetime.utcnow().isoformat()}Z")
-            print(f"Session ID: {session_id}")
-            print(f"Turn: {current_ai_response_turn}")
-            print(f"User Message: {user_message}")
-            print(f"Persona: {retrieved_chosen_persona_key}")
-            print(f"Tactic: {tactic_key_for_this_turn}")
-            print(f"Error: {str(e)}")
-            print(f"Error Type: {type(e).__name__}")
-            if hasattr(e, '__traceback__'):
-                import traceback
-                print(f"Traceback: {''.join(traceback.format_tb(e.__traceback__))}")
-            print("=" * 60)
-            
+            # 19Oct26: structured + rate-limited; banner and traceback are rendered off-loop.
+            study_log.log_event(
+                "gemini_failure", f"AI RESPONSE GENERATION FAILED - ATTEMPT {attempt}/{max_retries}",
+                level=study_log.WARNING, exc_info=e, session_id=session_id, turn=current_ai_response_turn,
+                user_message=user_message, persona=retrieved_chosen_persona_key,
+                tactic=tactic_key_for_this_turn, error=str(e), error_type=type(e).__name__,
+            )
+
             if attempt == max_retries:
                 # All attempts failed - this should not happen due to fallback models in generate_ai_response
-                print("=" * 60)
-                print("CRITICAL: ALL AI GENERATION ATTEMPTS FAILED")
-                print("=" * 60)
-                print("This should not happen due to fallback models. Returning emergency response.")
-                print("=" * 60)
+                study_log.log_event(
+                    "gemini_fallback", "CRITICAL: ALL AI GENERATION ATTEMPTS FAILED", level=study_log.ERROR,
+                    detail="This should not happen due to fallback models. Returning emergency response.",
+                )
                 
                 ai_response_text = "I literally don't know how to respond to that"
                 researcher_notes = f"CRITICAL: All {max_retries} AI generation attempts failed. Emergency response used. Final error: {str(e)}"
                 attempt_metadata = {"retry_attempts": 0, "retry_time": 0.0}
                 break
+    stage_seconds = time.perf_counter() - stage_started
+    SEND_MESSAGE_STAGES["response_llm"].observe(stage_seconds)
+    trace.add_span("response_generation_seconds", stage_seconds)
 
     ai_text_length = len(ai_response_text)
     current_social_style = session.get("social_style") or "DIRECT"  # Handle both missing key and None value
-    print(f"--- DEBUG (Turn {current_ai_response_turn}, Session {session_id[:8]}...): Style: {current_social_style} | Tactic: {tactic_key_for_this_turn or 'None'} | AI Resp Len: {ai_text_length}c ---")
+    study_log.log_event(
+        "turn_debug", f"--- DEBUG (Turn {current_ai_response_turn}, Session {session_id[:8]}...): Style: {current_social_style} | Tactic: {tactic_key_for_this_turn or 'None'} | AI Resp Len: {ai_text_length}c ---",
+        level=study_log.DEBUG, session_id=session_id[:8], turn=current_ai_response_turn,
+        social_style=current_social_style, tactic=tactic_key_for_this_turn, response_chars=ai_text_length,
+    )
 
     time_spent_on_actual_ai_calls = time.time() - actual_ai_processing_start_time
 
@@ -3898,19 +5423,31 @@ async def send_message(data: ChatRequest, db_session: Session = Depends(get_db))
         current_user_message_char_count
     )
     target_visible_response_time_paper_model = delay_components["total_delay_seconds"]
-    print(f"--- DEBUG: Target visible response time (Paper Model): {target_visible_response_time_paper_model:.3f}s ---")
+    study_log.log_event("turn_debug", f"--- DEBUG: Target visible response time (Paper Model): {target_visible_response_time_paper_model:.3f}s ---",
+                        level=study_log.DEBUG, session_id=session_id[:8], target_seconds=target_visible_response_time_paper_model)
 
 
     # Calculate how much *additional* sleep is needed
     # FIX (04Aug26, T2.1): cap the sleep so it can never hold the server for minutes.
     sleep_duration_needed = min(max(0, target_visible_response_time_paper_model - time_spent_on_actual_ai_calls), MAX_AI_SLEEP_SECONDS)
+    trace.set_backend(time_spent_on_actual_ai_calls, target_visible_response_time_paper_model)
+    ai_turn_target_delay_total.labels(
+        "exceeded" if time_spent_on_actual_ai_calls > target_visible_response_time_paper_model else "within").inc()
     
-    print(f"--- DEBUG: Time spent on actual AI calls: {time_spent_on_actual_ai_calls:.3f}s ---")
-    print(f"--- DEBUG: Sleep duration needed (Paper Model): {sleep_duration_needed:.3f}s ---")
+    study_log.log_event(
+        "turn_debug", f"--- DEBUG: Time spent on actual AI calls: {time_spent_on_actual_ai_calls:.3f}s ---\n"
+                      f"--- DEBUG: Sleep duration needed (Paper Model): {sleep_duration_needed:.3f}s ---",
+        level=study_log.DEBUG, session_id=session_id[:8], api_seconds=time_spent_on_actual_ai_calls,
+        sleep_seconds=sleep_duration_needed,
+    )
 
 
     if sleep_duration_needed > 0:
+        stage_started = time.perf_counter()
         await asyncio.sleep(sleep_duration_needed)
+        stage_seconds = time.perf_counter() - stage_started
+        SEND_MESSAGE_STAGES["pacing_sleep"].observe(stage_seconds)
+        trace.add_span("pacing_sleep_seconds", stage_seconds)
     # --- End NEW Delay Calculation ---
 
     # Check if this turn already exists in conversation_log (from frontend retry)
@@ -3941,13 +5478,15 @@ async def send_message(data: ChatRequest, db_session: Session = Depends(get_db))
             "typing_indicator_delay_seconds": data.typing_indicator_delay_seconds,
             "network_delay_seconds": None,  # Will be updated by separate network delay endpoint
             "message_composition_time_seconds": data.message_composition_time_seconds,  # Time from first keystroke to send
-            "input_provenance_summary": data.input_provenance_summary
+            "input_provenance_summary": data.input_provenance_summary,
+            "trace": trace.to_dict(),
         }
     }
 
     if existing_turn_idx is not None:
         # Update existing entry (frontend retry scenario)
-        print(f"--- DEBUG: Updating existing turn {current_ai_response_turn} (frontend retry detected) ---")
+        study_log.log_event("turn_debug", f"--- DEBUG: Updating existing turn {current_ai_response_turn} (frontend retry detected) ---",
+                            level=study_log.DEBUG, session_id=session_id[:8], turn=current_ai_response_turn)
         session["conversation_log"][existing_turn_idx] = turn_data
     else:
         # Append new entry (first attempt)
@@ -3980,8 +5519,11 @@ async def send_message(data: ChatRequest, db_session: Session = Depends(get_db))
     response_timestamp = datetime.now().timestamp()
     session["last_ai_response_timestamp_for_ddm"] = response_timestamp
 
-    # NEW: Save conversation data after each turn
-    update_session_after_message(session, db_session)
+    # NEW: Save conversation data after each turn. The trace's journal_enqueue_seconds is
+    # stamped while the snapshot is being journaled, so it is part of that snapshot.
+    stage_started = time.perf_counter()
+    await update_session_after_message(session, traced_turn=turn_data)
+    SEND_MESSAGE_STAGES["journal_enqueue"].observe(time.perf_counter() - stage_started)
 
     return {
         "ai_response": ai_response_text,
@@ -3999,7 +5541,7 @@ async def log_conversation_start(data: ConversationStartRequest, db_session: Ses
 
     # Try to recover session from database if not in memory
     if session_id not in sessions:
-        recovered_session = recover_session_from_database(session_id, db_session)
+        recovered_session = await asyncio.to_thread(recover_session_from_database, session_id, db_session)
         if recovered_session:
             sessions[session_id] = recovered_session
             flag_session_as_recovered(session_id, db_session)
@@ -4058,7 +5600,7 @@ async def update_network_delay(data: NetworkDelayUpdateRequest, db_session: Sess
 
     # Try to recover session from database if not in memory
     if session_id not in sessions:
-        recovered_session = recover_session_from_database(session_id, db_session)
+        recovered_session = await asyncio.to_thread(recover_session_from_database, session_id, db_session)
         if recovered_session:
             sessions[session_id] = recovered_session
             flag_session_as_recovered(session_id, db_session)
@@ -4066,6 +5608,7 @@ async def update_network_delay(data: NetworkDelayUpdateRequest, db_session: Sess
             raise HTTPException(status_code=404, detail="Session not found")
 
     session = sessions[session_id]
+    await load_recovered_logs(session)
 
     # NEW: Check for excessive network delay (>40 seconds)
     EXCESSIVE_DELAY_THRESHOLD = 40.0
@@ -4112,7 +5655,7 @@ async def update_network_delay(data: NetworkDelayUpdateRequest, db_session: Sess
     # Update the database in a non-blocking way with error handling
     # This is less critical data, so we don't want to fail the entire request if DB is slow
     try:
-        update_session_after_message(session, db_session)
+        await update_session_after_message(session)
 
         # NEW: If excessive delay detected, also update the has_excessive_delays flag in database
         if is_excessive_delay:
@@ -4134,7 +5677,7 @@ async def submit_rating(data: RatingRequest, db_session: Session = Depends(get_d
 
     # NEW: Try to recover session from database if not in memory
     if session_id not in sessions:
-        recovered_session = recover_session_from_database(session_id, db_session)
+        recovered_session = await asyncio.to_thread(recover_session_from_database, session_id, db_session)
         if recovered_session:
             sessions[session_id] = recovered_session
             # Flag this session as recovered from restart for analysis
@@ -4175,6 +5718,7 @@ async def submit_rating(data: RatingRequest, db_session: Session = Depends(get_d
             raise HTTPException(status_code=404, detail="Session not found")
 
     session = sessions[session_id]
+    await load_recovered_logs(session)
 
     # NEW: Block witnesses from submitting ratings (only interrogators can rate)
     if session.get('role') == 'witness':
@@ -4258,7 +5802,7 @@ async def submit_rating(data: RatingRequest, db_session: Session = Depends(get_d
     forced_completion = elapsed_minutes >= 7.5
     
     # NEW: Always save rating data incrementally after each submission
-    update_session_after_rating(session, db_session, is_final=False)
+    await update_session_after_rating(session, is_final=False)
     
     study_over = False
     should_finalize_interrogator = forced_completion or bool(data.is_final_response)
@@ -4281,7 +5825,7 @@ async def submit_rating(data: RatingRequest, db_session: Session = Depends(get_d
         # save silently lost the completion flag + final confidence with NO copy left to recover
         # from. Now: only evict after a CONFIRMED save; on failure keep the session and return an
         # error so the client's existing retry + sendBeacon path re-persists it.
-        final_saved = update_session_after_rating(session, db_session, is_final=True)
+        final_saved = await update_session_after_rating(session, is_final=True)
         if not final_saved:
             print(f"🛑 FINAL SAVE FAILED for {session_id[:8]}... — session retained for client retry")
             raise HTTPException(status_code=503, detail="Final rating save failed; please retry.")
@@ -4309,7 +5853,7 @@ async def submit_comment(data: CommentRequest, db_session: Session = Depends(get
     
     # NEW: Try to recover session from database if not in memory
     if session_id not in sessions:
-        recovered_session = recover_session_from_database(session_id, db_session)
+        recovered_session = await asyncio.to_thread(recover_session_from_database, session_id, db_session)
         if recovered_session:
             sessions[session_id] = recovered_session
             # Flag this session as recovered from restart for analysis
@@ -4319,6 +5863,7 @@ async def submit_comment(data: CommentRequest, db_session: Session = Depends(get
             raise HTTPException(status_code=404, detail="Session not found")
     
     session = sessions[session_id]
+    await load_recovered_logs(session)
 
     # Determine turn number, which is null for final, pre-debrief feedback
     turn_number = session["turn_count"] if data.phase == 'in_turn' else None
@@ -4346,7 +5891,7 @@ async def submit_comment(data: CommentRequest, db_session: Session = Depends(get
     return {"message": "Comment submitted."}
 
 @app.post("/log_ui_event")
-async def log_ui_event(evt: UIEventRequest, db_session: Session = Depends(get_db)):
+async def log_ui_event(evt: UIEventRequest):
     event_record = {
         "event": evt.event,
         "ts_client": evt.ts_client,
@@ -4357,40 +5902,37 @@ async def log_ui_event(evt: UIEventRequest, db_session: Session = Depends(get_db
         "session_id": evt.session_id
     }
     # If we have a live session, attach to it; otherwise store pre-session
+    # 19Oct26: both branches are journaled appends (jsonb || on Postgres), applied in the
+    # background by apply_journaled_json_append; a row that does not exist yet is skipped.
     if evt.session_id and evt.session_id in sessions:
+        await load_recovered_logs(sessions[evt.session_id])
         sessions[evt.session_id].setdefault("ui_event_log", []).append(event_record)
         try:
-            session_record = db_session.query(db.StudySession).filter(
-                db.StudySession.id == evt.session_id
-            ).first()
-            if session_record:
-                events = json.loads(session_record.ui_event_log) if session_record.ui_event_log else []
-                events.append(event_record)
-                session_record.ui_event_log = json.dumps(events)
-                update_suspicious_behavior_summary(session_record, events)
-                session_record.last_updated = datetime.utcnow()
-                db_session.commit()
+            # The in-memory log mirrors the stored one for live sessions, so the summary
+            # is kept from memory (only this event is folded in) instead of reading the
+            # log back.
+            await session_journal.record_async("json_append", evt.session_id, {
+                "column": "ui_event_log",
+                "items": [event_record],
+                "values": {"last_updated": datetime.utcnow(),
+                           **live_ui_event_summary_values(sessions[evt.session_id])},
+            })
         except Exception as e:
             print(f"Warning: Could not persist UI event immediately: {e}")
-            db_session.rollback()
         return {"message": "Event logged to session."}
     
     if evt.participant_id:
         pre_session_events.setdefault(evt.participant_id, []).append(event_record)
         try:
-            session_record = db_session.query(db.StudySession).filter(
-                db.StudySession.id == evt.participant_id
-            ).first()
-            if session_record:
-                events = json.loads(session_record.ui_event_log) if session_record.ui_event_log else []
-                events.append(event_record)
-                session_record.ui_event_log = json.dumps(events)
-                update_suspicious_behavior_summary(session_record, events)
-                session_record.last_updated = datetime.utcnow()
-                db_session.commit()
+            # Pre-session memory is lost on restart, so summarize the stored log.
+            await session_journal.record_async("json_append", evt.participant_id, {
+                "column": "ui_event_log",
+                "items": [event_record],
+                "values": {"last_updated": datetime.utcnow()},
+                "summarize_ui_events": True,
+            })
         except Exception as e:
             print(f"Warning: Could not persist pre-session UI event immediately: {e}")
-            db_session.rollback()
         return {"message": "Event logged pre-session."}
     
     # If neither, still return OK but note that it wasn't saved
@@ -4448,7 +5990,7 @@ async def record_completion_code(request: Request, db_session: Session = Depends
         data = await request.json()
     except Exception:
         body = await request.body()
-        data = json.loads(body) if body else {}
+        data = json_codec.loads(body) if body else {}
 
     session_id = data.get('session_id') or data.get('participant_id')
     code = data.get('completion_code')
@@ -4489,15 +6031,31 @@ async def submit_final_comment(data: FinalCommentRequest, db_session: Session =
     session_record.final_user_comment = sanitized_comment
 
     if data.input_provenance_summary:
+        # 19Oct26: journaled like /log_ui_event, so it is ordered after (and not overwritten
+        # by) any turn/rating snapshot of this session still waiting to be applied; a live
+        # session also gets it in memory, which those snapshots are taken from.
+        event_record = {
+            "event": "feedback_input_provenance",
+            "timestamp": datetime.utcnow().isoformat(),
+            "metadata": data.input_provenance_summary
+        }
         try:
-            ui_events = json.loads(session_record.ui_event_log or "[]")
-            ui_events.append({
-                "event": "feedback_input_provenance",
-                "timestamp": datetime.utcnow().isoformat(),
-                "metadata": data.input_provenance_summary
-            })
-            session_record.ui_event_log = json.dumps(ui_events)
-            update_suspicious_behavior_summary(session_record, ui_events)
+            live_session = sessions.get(data.session_id)
+            if live_session is not None:
+                await load_recovered_logs(live_session)
+                live_session.setdefault("ui_event_log", []).append(event_record)
+                await session_journal.record_async("json_append", data.session_id, {
+                    "column": "ui_event_log",
+                    "items": [event_record],
+                    "values": {"last_updated": datetime.utcnow(), **live_ui_event_summary_values(live_session)},
+                })
+            else:
+                await session_journal.record_async("json_append", data.session_id, {
+                    "column": "ui_event_log",
+                    "items": [event_record],
+                    "values": {"last_updated": datetime.utcnow()},
+                    "summarize_ui_events": True,
+                })
         except Exception as e:
             print(f"Could not append feedback input provenance: {e}")
 
@@ -4576,7 +6134,14 @@ async def final_response_integrity_check(token: Optional[str] = None, db_session
     Researcher preflight: every conversation-phase participant should have either
     a collected final response or an explicit not-collected reason.
     """
-    conversation_sessions = db_session.query(db.StudySession).filter(
+    conversation_sessions = db_session.query(
+        db.StudySession.id,
+        db.StudySession.role,
+        db.StudySession.witness_final_response_collected,
+        db.StudySession.witness_final_response_not_collected_reason,
+        db.StudySession.interrogator_final_response_collected,
+        db.StudySession.interrogator_final_response_not_collected_reason,
+    ).filter(
         db.StudySession.conversation_phase_reached == True,
         db.StudySession.study_mode == STUDY_MODE  # FIX (05Aug26): preflight THIS condition only
     ).all()
@@ -4649,7 +6214,7 @@ async def submit_demographics(data: SubmitDemographicsRequest, db_session: Sessi
         "internet_usage_per_week": data.internet_usage_per_week
     }
 
-    session_record.user_profile_survey = json.dumps(user_profile)
+    session_record.user_profile_survey = user_profile
     session_record.last_updated = datetime.utcnow()
 
     # Also update in-memory session if it exists
@@ -4692,6 +6257,7 @@ async def finalize_no_session(data: FinalizeNoSessionRequest, db_session: Sessio
 
         if existing_session and existing_session.role:
             print(f"⚠️ Participant {participant_id_val[:8]}... had role '{existing_session.role}' assigned but dropped out")
+            note_style_released(existing_session)
             existing_session.session_status = "abandoned"
             existing_session.match_status = "abandoned"  # CRITICAL: Also update match_status to prevent ghost matches
             decrement_role_counter(existing_session, db_session)
@@ -4735,6 +6301,7 @@ async def get_researcher_data(session_id: str, token: Optional[str] = None):
     session_data = sessions.get(session_id)
     if not session_data:
          raise HTTPException(status_code=404, detail="Session data unexpectedly missing.")
+    await load_recovered_logs(session_data)
 
     researcher_view_data = {
         "user_id": session_data.get("user_id", "N/A"),
@@ -4742,18 +6309,22 @@ async def get_researcher_data(session_id: str, token: Optional[str] = None):
         "chosen_persona": session_data.get("chosen_persona_key", "N/A"),
         "domain": session_data.get("assigned_domain", "N/A"),
         "condition": session_data.get("experimental_condition", "N/A"),
-        "user_profile_survey_json": json.dumps(session_data.get("initial_user_profile_survey", {})),
+        "user_profile_survey_json": json_codec.dumps(session_data.get("initial_user_profile_survey", {})),
         "ai_detected_final": session_data.get("ai_detected_final", "Study In Progress or Not Concluded"),
-        "ddm_confidence_ratings_json": json.dumps(session_data.get("intermediate_ddm_confidence_ratings", [])),
-        "feels_off_comments_json": json.dumps(session_data.get("feels_off_data", [])),
-        "conversation_log_json": json.dumps(session_data.get("conversation_log", [])),
+        "ddm_confidence_ratings_json": json_codec.dumps(session_data.get("intermediate_ddm_confidence_ratings", [])),
+        "feels_off_comments_json": json_codec.dumps(session_data.get("feels_off_data", [])),
+        "conversation_log_json": json_codec.dumps(session_data.get("conversation_log", [])),
         "initial_tactic_analysis_full_text": session_data.get("initial_tactic_analysis", {}).get("full_analysis", "N/A"),
-        "tactic_selection_log_json": json.dumps(session_data.get("tactic_selection_log", [])),
-        "ai_researcher_notes_json": json.dumps(session_data.get("ai_researcher_notes_log", []))
+        "tactic_selection_log_json": json_codec.dumps(session_data.get("tactic_selection_log", [])),
+        "ai_researcher_notes_json": json_codec.dumps(session_data.get("ai_researcher_notes_log", []))
     }
-    return JSONResponse(content=researcher_view_data)
+    return FastJSONResponse(content=researcher_view_data)
+
+IMPORT_SECONDS = round(time.perf_counter() - _IMPORT_STARTED, 3)
+print(f"📦 main imported in {IMPORT_SECONDS:.2f}s (startup work runs once the server is up)")
 
 if __name__ == "__main__":
+    init_gemini()
     if not GEMINI_MODEL:
         print("CRITICAL ERROR: Gemini model could not be initialized.")
     else:
@@ -0,0 +1,286 @@
+"""
+In-process metrics registry with Prometheus text exposition (GET /metrics).
+
+Counters, gauges and histograms with fixed label names. Label values are resolved once
+to a child object (metric.labels(...)) so the hot path is a lock + a couple of integer
+adds; histograms use fixed buckets and bisect, never per-observation storage. Gauges can
+also be callbacks, evaluated only when /metrics is scraped (queue lengths, cache sizes).
+
+No prometheus_client dependency: the exposition format is a few lines of text and the
+service runs as a single process, so there is nothing to aggregate across workers.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds. Covers sub-ms polls up to multi-second LLM calls and pacing sleeps.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}     # str label values -> child (what render() walks)
+        self._by_raw = {}       # label values as passed (e.g. int status) -> same child
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **kwargs):
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        child = self._by_raw.get(values)
+        if child is None:
+            key = tuple(str(value) for value in values)
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+                self._by_raw[values] = child
+        return child
+
+    def _default_child(self):
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        return self._value
+
+    def render(self, name, labelnames, key):
+        return [f"{name}{_label_text(labelnames, key)} {_format_value(self._value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default_child().inc(amount)
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value):
+        self._value = value
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+
+class Gauge(_Metric):
+    """Set/inc/dec gauge, or a callback gauge: fn() returns a number, or a dict of
+    label-value tuple -> number for a labelled gauge. Callbacks run at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), fn=None):
+        super().__init__(name, documentation, labelnames)
+        self._fn = fn
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default_child().set(value)
+
+    def render(self):
+        if self._fn is None:
+            return super().render()
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            result = self._fn()
+        except Exception as e:
+            return lines + [f"# {self.name} callback failed: {_escape(e)}"]
+        if not isinstance(result, dict):
+            result = {(): result}
+        for key, value in sorted(result.items()):
+            key = key if isinstance(key, tuple) else (key,)
+            lines.append(f"{self.name}{_label_text(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class _HistogramChild:
+    __slots__ = ("_upper_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, upper_bounds):
+        self._upper_bounds = upper_bounds
+        self._counts = [0] * (len(upper_bounds) + 1)   # last slot is +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._counts), self._sum
+
+    def render(self, name, labelnames, key):
+        counts, total = self.snapshot()
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self._upper_bounds + (float("inf"),), counts):
+            cumulative += count
+            le = f'le="{_format_value(float(bound))}"'
+            lines.append(f"{name}_bucket{_label_text(labelnames, key, le)} {cumulative}")
+        lines.append(f"{name}_sum{_label_text(labelnames, key)} {_format_value(total)}")
+        lines.append(f"{name}_count{_label_text(labelnames, key)} {cumulative}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default_child().observe(value)
+
+    def time(self):
+        return self._default_child().time()
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=(), fn=None):
+    return REGISTRY.register(Gauge(name, documentation, labelnames, fn))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# ---------------------------------------------------------------- HTTP requests
+http_request_seconds = histogram(
+    "http_request_duration_seconds", "Request latency by route template, method and status.",
+    ("method", "route", "status"),
+)
+http_requests_in_flight = gauge("http_requests_in_flight", "Requests currently being served.")
+_in_flight = http_requests_in_flight.labels()
+# ASGI scope of the request being served (route template readable once routing ran); used
+# to attribute work such as SQL statements to the endpoint that caused it.
+current_request_scope = contextvars.ContextVar("current_request_scope", default=None)
+
+
+class RequestMetricsMiddleware:
+    """Pure ASGI middleware timing every HTTP request into http_request_duration_seconds.
+
+    Labelled by the matched route template (e.g. /get_researcher_data/{session_id}), so
+    path parameters do not explode the label set; unmatched paths are "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        _in_flight.inc()
+        token = current_request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request_scope.reset(token)
+            _in_flight.dec()
+            route = scope.get("route")
+            http_request_seconds.labels(
+                scope["method"], getattr(route, "path", "unmatched"), status[0]
+            ).observe(time.perf_counter() - start)
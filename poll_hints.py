@@ -0,0 +1,78 @@
+"""
+ETag / 304 responses and next-poll hints for the participant polling endpoints
+(/check_match_status, /check_partner_message, /check_partner_typing, /study_status_ping).
+
+Every browser in the waiting room or a human-human chat polls at a fixed cadence, and
+almost every poll answers "nothing changed". respond() therefore:
+
+  - tags the body with a weak ETag over its state: the body minus the hint and
+    clock-derived fields (time_waiting_seconds, timestamp), which are not part of the
+    state. A poll that sends that tag back in If-None-Match and finds the same state gets
+    a bodiless 304.
+  - adds next_poll_after_ms: when polling again can next show something new. It is the
+    endpoint's usual interval, stretched while the server is busy, or sooner when a known
+    deadline falls before that (a message's delivery_time, the waiting-room timeout, the
+    end of a typing signal). None means no further polling is needed (terminal state).
+    The hint follows server load, so it is kept out of the ETag (load changes would
+    otherwise turn every 304 into a full body). It is sent on every response, 304s
+    included, as the X-Next-Poll-After-Ms header; clients should read it from there, as
+    the copy in a cached body can be stale.
+
+Cache-Control: no-cache makes a browser revalidate on every poll rather than reuse a
+cached body. The hint is advisory; the old fixed cadence keeps working.
+"""
+import hashlib
+import math
+import os
+
+from fastapi.responses import Response
+
+import json_codec
+import metrics
+from json_codec import FastJSONResponse
+
+HINT_STEP_MS = 250
+MIN_POLL_MS = 250
+# Busy = this many HTTP requests in flight; hints stretch in proportion, up to MAX_BACKOFF x.
+BUSY_IN_FLIGHT = int(os.getenv("POLL_BACKOFF_IN_FLIGHT", "150"))
+MAX_BACKOFF = 3.0
+
+_in_flight = metrics.http_requests_in_flight.labels()
+
+
+def next_poll_ms(interval_ms, deadline_seconds=None):
+    """Hint for the next poll: interval_ms scaled by current load, capped by a known
+    deadline deadline_seconds from now (polled just after it passes)."""
+    backoff = min(MAX_BACKOFF, max(1.0, _in_flight.value / BUSY_IN_FLIGHT))
+    ms = interval_ms * backoff
+    if deadline_seconds is not None:
+        ms = min(ms, deadline_seconds * 1000 + HINT_STEP_MS)
+    return max(MIN_POLL_MS, int(math.ceil(ms / HINT_STEP_MS)) * HINT_STEP_MS)
+
+
+def _etag(state):
+    return 'W/"' + hashlib.blake2b(json_codec.dumpb(state), digest_size=8).hexdigest() + '"'
+
+
+def _matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    opaque = etag[2:]
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+def respond(request, content, next_poll_after_ms, volatile=()):
+    """content (plus next_poll_after_ms) as a JSON response, or a 304 if the request's
+    If-None-Match already names its state. volatile: further keys left out of the ETag."""
+    etag = _etag({key: value for key, value in content.items() if key not in volatile})
+    content["next_poll_after_ms"] = next_poll_after_ms
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if next_poll_after_ms is not None:
+        headers["X-Next-Poll-After-Ms"] = str(next_poll_after_ms)
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return FastJSONResponse(content=content, headers=headers)
@@ -0,0 +1,396 @@
+"""
+Opt-in wall-clock profiles of individual requests (send_message, submit_rating, ...).
+
+A request is profiled when it is sampled (PROFILE_SAMPLE_PERCENT of requests, default 0)
+or when it carries the header `X-Profile-Token: <ADMIN_CHECK_TOKEN>`. Every other request
+pays for a header lookup in ProfilingMiddleware (plus a random() draw if sampling is on).
+
+While a profile is active, one sampler thread wakes every PROFILE_INTERVAL_MS and records
+where the request is *right now*, running or not: the await chain of the request's task
+(so time parked in asyncio.sleep or awaiting a worker thread is visible) extended by the
+live stack of any worker thread doing its work (asyncio.to_thread / sync endpoints).
+SQL statements issued in the request's context are timed through engine events.
+
+The last PROFILE_KEEP profiles are kept in memory and can be downloaded in speedscope
+format (https://www.speedscope.app) or as collapsed stacks for flamegraph.pl; the
+response of a profiled request carries X-Profile-Id.
+"""
+import asyncio
+import contextvars
+import functools
+import hmac
+import inspect
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import event
+
+PROFILE_SAMPLE_PERCENT = float(os.getenv("PROFILE_SAMPLE_PERCENT", "0"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_MAX_CONCURRENT = int(os.getenv("PROFILE_MAX_CONCURRENT", "4"))
+PROFILE_MAX_SAMPLES = 20000     # ~100s at 5ms; later samples are dropped
+PROFILE_HEADER = b"x-profile-token"
+# Never sampled: scrapes and the profile download itself
+UNSAMPLED_PATH_PREFIXES = ("/metrics", "/health", "/admin/profiles", "/study_status_ping")
+
+_active = contextvars.ContextVar("request_profile", default=None)
+
+
+def _frame_file(filename):
+    marker = "site-packages" + os.sep
+    index = filename.rfind(marker)
+    return filename[index + len(marker):] if index >= 0 else os.path.basename(filename)
+
+
+class RequestProfile:
+    def __init__(self, scope, trigger, task, loop_thread_id):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.route = None
+        self.status = None
+        self.trigger = trigger
+        self.started_at = datetime.utcnow()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.task = task
+        self.loop_thread_id = loop_thread_id
+        self.threads = {}           # thread ident -> code object of the attribution wrapper frame
+        self.frames = []            # (name, file, line)
+        self._frame_index = {}      # code object -> index into frames
+        self.samples = []           # tuples of frame indexes, outermost first
+        self.weights = []           # seconds each sample stands for
+        self.dropped_samples = 0
+        self.sql = []               # (offset_seconds, duration_seconds, statement, thread ident)
+
+    def _index(self, code):
+        index = self._frame_index.get(code)
+        if index is None:
+            index = self._frame_index[code] = len(self.frames)
+            self.frames.append((code.co_qualname, _frame_file(code.co_filename), code.co_firstlineno))
+        return index
+
+    def add_sample(self, frames, weight):
+        if len(self.samples) >= PROFILE_MAX_SAMPLES:
+            self.dropped_samples += 1
+            return
+        self.samples.append(tuple(self._index(frame.f_code) for frame in frames))
+        self.weights.append(weight)
+
+    # ---------------------------------------------------------------- exports
+    def summary(self):
+        sql_total = sum(duration for _, duration, _, _ in self.sql)
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "trigger": self.trigger,
+            "started_at": self.started_at.isoformat() + "Z",
+            "duration_ms": round(self.duration * 1000, 2) if self.duration is not None else None,
+            "samples": len(self.samples),
+            "dropped_samples": self.dropped_samples,
+            "sql_statements": len(self.sql),
+            "sql_total_ms": round(sql_total * 1000, 2),
+        }
+
+    def sql_report(self, top=20):
+        by_statement = {}
+        for _, duration, statement, _ in self.sql:
+            entry = by_statement.setdefault(statement, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += duration
+            entry[2] = max(entry[2], duration)
+        ranked = sorted(by_statement.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        return {
+            "statements": [
+                {"statement": statement, "count": count, "total_ms": round(total * 1000, 2), "max_ms": round(worst * 1000, 2)}
+                for statement, (count, total, worst) in ranked
+            ],
+            "timeline": [
+                {"offset_ms": round(offset * 1000, 2), "duration_ms": round(duration * 1000, 2),
+                 "statement": statement[:200], "thread": thread}
+                for offset, duration, statement, thread in self.sql
+            ],
+        }
+
+    def to_speedscope(self):
+        duration_ms = (self.duration or 0) * 1000
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{self.method} {self.route or self.path} ({self.id})",
+            "exporter": "request_profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": [{"name": name, "file": file, "line": line} for name, file, line in self.frames]},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"{self.method} {self.path} — wall clock, {PROFILE_INTERVAL_MS:g}ms samples",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(duration_ms, 3),
+                "samples": [list(sample) for sample in self.samples],
+                "weights": [round(weight * 1000, 3) for weight in self.weights],
+            }],
+        }
+
+    def to_collapsed(self):
+        """flamegraph.pl input: 'outer;inner <microseconds>' per distinct stack."""
+        totals = {}
+        for sample, weight in zip(self.samples, self.weights):
+            totals[sample] = totals.get(sample, 0.0) + weight
+        lines = []
+        for sample, weight in totals.items():
+            stack = ";".join(f"{self.frames[i][0]} ({self.frames[i][1]}:{self.frames[i][2]})" for i in sample)
+            lines.append(f"{stack} {max(1, round(weight * 1e6))}")
+        return "\n".join(lines) + "\n"
+
+
+# ------------------------------------------------------------------ stack walking
+def _await_chain(coro):
+    """Frames of a coroutine and everything it is awaiting, outermost first."""
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+    return frames
+
+
+def _stack_until(frame, stop_code=None, stop_frame=None):
+    """Frames from `frame` down to (excluding) the first frame that is stop_frame or runs
+    stop_code, outermost first; None if neither is found."""
+    frames = []
+    while frame is not None:
+        if frame is stop_frame or (stop_code is not None and frame.f_code is stop_code):
+            frames.reverse()
+            return frames
+        frames.append(frame)
+        frame = frame.f_back
+    return None
+
+
+def _run_attributed(profile, fn, args, kwargs):
+    """Runs fn on a worker thread with that thread attributed to profile."""
+    thread_id = threading.get_ident()
+    profile.threads[thread_id] = _run_attributed.__code__
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profile.threads.pop(thread_id, None)
+
+
+class _Sampler:
+    def __init__(self):
+        self.profiles = OrderedDict()   # id -> active RequestProfile
+        self._lock = threading.Lock()
+        self._has_work = threading.Event()
+        self._thread = None
+
+    def add(self, profile):
+        with self._lock:
+            if len(self.profiles) >= PROFILE_MAX_CONCURRENT:
+                return False
+            self.profiles[profile.id] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+            self._has_work.set()
+            return True
+
+    def remove(self, profile):
+        with self._lock:
+            self.profiles.pop(profile.id, None)
+            if not self.profiles:
+                self._has_work.clear()
+
+    def _run(self):
+        interval = PROFILE_INTERVAL_MS / 1000
+        last = time.perf_counter()
+        while True:
+            if not self._has_work.is_set():
+                self._has_work.wait()
+                last = time.perf_counter()
+            time.sleep(interval)
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            with self._lock:
+                profiles = list(self.profiles.values())
+            if not profiles:
+                continue
+            current = sys._current_frames()
+            for profile in profiles:
+                try:
+                    self._sample(profile, current, elapsed)
+                except Exception:
+                    profile.dropped_samples += 1   # a frame went away mid-walk; skip this tick
+
+    @staticmethod
+    def _sample(profile, current, elapsed):
+        task = profile.task
+        chain = _await_chain(task.get_coro()) if task is not None else []
+        if chain:
+            # The task is running right now: its innermost coroutine frame is on the loop
+            # thread's stack, and whatever it calls synchronously sits above it.
+            running = _stack_until(current.get(profile.loop_thread_id), stop_frame=chain[-1])
+            if running is not None:
+                chain = chain + running
+        worker_stacks = []
+        for thread_id, stop_code in list(profile.threads.items()):
+            stack = _stack_until(current.get(thread_id), stop_code=stop_code)
+            if stack:
+                worker_stacks.append(stack)
+        if not worker_stacks:
+            if chain:
+                profile.add_sample(chain, elapsed)
+            return
+        for stack in worker_stacks:   # concurrent workers share the tick's wall time
+            profile.add_sample(chain + stack, elapsed / len(worker_stacks))
+
+
+_sampler = _Sampler()
+_finished = deque(maxlen=PROFILE_KEEP)
+_finished_lock = threading.Lock()
+counters = {"profiled": 0, "skipped_concurrency": 0}
+
+
+def get_profile(profile_id):
+    with _finished_lock:
+        for profile in _finished:
+            if profile.id == profile_id:
+                return profile
+    return None
+
+
+def list_profiles():
+    with _finished_lock:
+        return [profile.summary() for profile in reversed(_finished)]
+
+
+# --------------------------------------------------------------------- middleware
+class ProfilingMiddleware:
+    """Pure ASGI. Decides per request whether to profile; everything else is passed
+    straight through."""
+
+    def __init__(self, app, admin_token_env="ADMIN_CHECK_TOKEN"):
+        self.app = app
+        self._admin_token_env = admin_token_env
+
+    def _trigger(self, scope):
+        path = scope["path"]
+        if PROFILE_SAMPLE_PERCENT and random.random() * 100 < PROFILE_SAMPLE_PERCENT:
+            if not path.startswith(UNSAMPLED_PATH_PREFIXES):
+                return "sampled"
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                admin_token = os.getenv(self._admin_token_env)
+                if admin_token and hmac.compare_digest(value, admin_token.encode()):
+                    return "header"
+                return None
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        trigger = self._trigger(scope)
+        if trigger is None:
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile(scope, trigger, asyncio.current_task(), threading.get_ident())
+        if not _sampler.add(profile):
+            counters["skipped_concurrency"] += 1
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile.id.encode())]}
+            await send(message)
+
+        token = _active.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _active.reset(token)
+            profile.duration = time.perf_counter() - profile.start
+            _sampler.remove(profile)
+            route = scope.get("route")
+            profile.route = getattr(route, "path", None)
+            profile.task = None
+            profile.threads.clear()
+            with _finished_lock:
+                _finished.append(profile)
+            counters["profiled"] += 1
+
+
+# ------------------------------------------------------------ thread attribution
+class _ProfilingExecutor(ThreadPoolExecutor):
+    """Default executor (asyncio.to_thread / run_in_executor) that attributes the worker
+    thread to the submitting request's profile, if there is one."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        profile = _active.get()
+        if profile is None:
+            return super().submit(fn, *args, **kwargs)
+        return super().submit(_run_attributed, profile, fn, args, kwargs)
+
+
+def _attributed_endpoint(fn):
+    @functools.wraps(fn)
+    def endpoint(*args, **kwargs):
+        profile = _active.get()
+        if profile is None:
+            return fn(*args, **kwargs)
+        return _run_attributed(profile, fn, args, kwargs)
+    return endpoint
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active.get() is not None:
+        context._profile_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _active.get()
+    started = getattr(context, "_profile_started", None)
+    if profile is not None and started is not None:
+        now = time.perf_counter()
+        profile.sql.append((started - profile.start, now - started, " ".join(statement.split())[:1000],
+                            threading.get_ident()))
+
+
+def install(app, loop, engine):
+    """Attribute worker threads and SQL to profiles: the loop's default executor, every
+    sync (threadpool) endpoint of app, and engine's cursor events. Call once at startup,
+    after all routes are registered."""
+    loop.set_default_executor(_ProfilingExecutor(thread_name_prefix="asyncio"))
+    wrapped = 0
+    for route in app.routes:
+        dependant = getattr(route, "dependant", None)
+        call = getattr(dependant, "call", None)
+        if not inspect.isfunction(call) or getattr(call, "_profiling_wrapped", False):
+            continue
+        if not inspect.iscoroutinefunction(call):   # FastAPI runs these in its threadpool
+            dependant.call = _attributed_endpoint(call)
+            dependant.call._profiling_wrapped = True
+            wrapped += 1
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    return wrapped
+
+
+def stats():
+    with _sampler._lock:
+        active = len(_sampler.profiles)
+    return {**counters, "active": active, "kept": len(_finished), "sample_percent": PROFILE_SAMPLE_PERCENT}
@@ -0,0 +1,179 @@
+"""
+Bounded in-memory cache for the per-session dicts in main.py.
+
+`sessions` and `pre_session_events` used to be plain dicts that were only pruned on one
+success path, so every witness, abandoned participant, timed-out waiter and recovered
+session stayed resident for the life of the process. SessionCache is a drop-in dict that
+tracks last access in LRU order and evicts entries that have been idle longer than
+idle_ttl_seconds (on the periodic sweep) or that push it past max_entries (on insert).
+
+Eviction only drops the in-memory copy. Every mutation is already journaled to
+study_sessions, so an evicted active session is rebuilt by recover_session_from_database()
+on its next request, exactly as after a restart. Entries that could not be rebuilt that way
+are marked with keep_idle and survive the idle sweep (capacity eviction still applies).
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+class SessionCache(dict):
+    """dict with LRU access tracking, an idle TTL and a size bound.
+
+    Reads through [], get(), in, setdefault() and pop() count as access. Iteration and
+    len() do not, so sweeps and health checks never keep an idle entry alive.
+    on_evict(key, value, reason) is called outside the lock for every evicted entry.
+    keep_idle(key, value) -> True exempts an idle entry from evict_idle(); it is checked
+    again one TTL later.
+    """
+
+    def __init__(self, name, max_entries, idle_ttl_seconds, on_evict=None, keep_idle=None):
+        super().__init__()
+        self.name = name
+        self.max_entries = max_entries
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._on_evict = on_evict
+        self._keep_idle = keep_idle
+        self._lru = OrderedDict()   # key -> monotonic time of last access, oldest first
+        self._lock = threading.RLock()
+        self.counters = {"evicted_idle": 0, "evicted_capacity": 0, "kept_idle": 0}
+
+    def _touch(self, key):
+        self._lru[key] = time.monotonic()
+        self._lru.move_to_end(key)
+
+    # ------------------------------------------------------------ dict protocol
+    def __getitem__(self, key):
+        with self._lock:
+            value = dict.__getitem__(self, key)
+            self._touch(key)
+            return value
+
+    def get(self, key, default=None):
+        with self._lock:
+            if dict.__contains__(self, key):
+                self._touch(key)
+                return dict.__getitem__(self, key)
+            return default
+
+    def __contains__(self, key):
+        with self._lock:
+            if dict.__contains__(self, key):
+                self._touch(key)
+                return True
+            return False
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            dict.__setitem__(self, key, value)
+            self._touch(key)
+            evicted = self._evict_over_capacity_locked()
+        self._notify(evicted, "capacity")
+
+    def setdefault(self, key, default=None):
+        with self._lock:
+            if dict.__contains__(self, key):
+                self._touch(key)
+                return dict.__getitem__(self, key)
+            dict.__setitem__(self, key, default)
+            self._touch(key)
+            evicted = self._evict_over_capacity_locked()
+        self._notify(evicted, "capacity")
+        return default
+
+    def __delitem__(self, key):
+        with self._lock:
+            dict.__delitem__(self, key)
+            self._lru.pop(key, None)
+
+    def pop(self, key, *default):
+        with self._lock:
+            self._lru.pop(key, None)
+            return dict.pop(self, key, *default)
+
+    def clear(self):
+        with self._lock:
+            dict.clear(self)
+            self._lru.clear()
+
+    # ----------------------------------------------------------------- eviction
+    def _evict_over_capacity_locked(self):
+        evicted = []
+        while len(self._lru) > self.max_entries:
+            key, _ = self._lru.popitem(last=False)
+            evicted.append((key, dict.pop(self, key, None)))
+        self.counters["evicted_capacity"] += len(evicted)
+        return evicted
+
+    def evict_idle(self, now=None):
+        """Drop entries not accessed for idle_ttl_seconds. Returns the number evicted."""
+        cutoff = (time.monotonic() if now is None else now) - self.idle_ttl_seconds
+        evicted = []
+        kept = []
+        with self._lock:
+            while self._lru:
+                key, last_access = next(iter(self._lru.items()))
+                if last_access > cutoff:
+                    break
+                self._lru.popitem(last=False)
+                value = dict.__getitem__(self, key)
+                if self._keep_idle is not None and self._keep_idle(key, value):
+                    kept.append(key)
+                    continue
+                dict.__delitem__(self, key)
+                evicted.append((key, value))
+            for key in kept:
+                self._touch(key)
+            self.counters["evicted_idle"] += len(evicted)
+            self.counters["kept_idle"] += len(kept)
+        self._notify(evicted, "idle")
+        return len(evicted)
+
+    def _notify(self, evicted, reason):
+        if self._on_evict is None:
+            return
+        for key, value in evicted:
+            try:
+                self._on_evict(key, value, reason)
+            except Exception as e:
+                print(f"⚠️ {self.name} eviction callback failed for {str(key)[:8]}...: {e}")
+
+    # ------------------------------------------------------------------- status
+    def approx_bytes(self):
+        """Deep sys.getsizeof of the cached values (shared objects counted once). Walks
+        dict storage directly, so lazily-recovered sessions are not forced to load."""
+        seen = set()
+        total = 0
+        stack = []
+        with self._lock:
+            for key, value in dict.items(self):
+                stack.append(key)
+                stack.append(value)
+        while stack:
+            obj = stack.pop()
+            if id(obj) in seen:
+                continue
+            seen.add(id(obj))
+            total += sys.getsizeof(obj)
+            if isinstance(obj, dict):
+                for key, value in dict.items(obj):
+                    stack.append(key)
+                    stack.append(value)
+            elif isinstance(obj, (list, tuple, set, frozenset)):
+                stack.extend(obj)
+        return total
+
+    def stats(self, include_bytes=False):
+        with self._lock:
+            oldest = next(iter(self._lru.values()), None)
+            result = {
+                **self.counters,
+                "entries": dict.__len__(self),
+                "max_entries": self.max_entries,
+                "idle_ttl_seconds": self.idle_ttl_seconds,
+                "oldest_idle_seconds": round(time.monotonic() - oldest, 1) if oldest is not None else None,
+            }
+        if include_bytes:
+            result["approx_bytes"] = self.approx_bytes()
+        return result
@@ -0,0 +1,71 @@
+"""
+Shutdown checkpoint of the in-memory session state.
+
+On a graceful shutdown the process serializes `sessions` and `pre_session_events` into one
+compressed server_checkpoints row per study mode. The next process takes (reads + deletes)
+that row on boot and bulk-loads it, so participants resume instantly instead of every
+session being swept to 'interrupted' and rebuilt from study_sessions one request at a time.
+
+Values are encoded with the journal's JSON encoding (datetimes survive the round trip).
+A session that cannot be encoded is skipped and left to the normal restart path.
+"""
+import json
+import zlib
+from datetime import datetime
+
+import database as db
+from session_journal import decode_entry, encode_entry
+
+CHECKPOINT_FORMAT = 1
+
+
+def encode_checkpoint(session_items, pre_session_events):
+    """session_items yields (session_id, fields, lazy). Returns (payload bytes,
+    number of sessions written, [(session_id, reason)] skipped)."""
+    parts = []
+    skipped = []
+    for session_id, fields, lazy in session_items:
+        try:
+            parts.append(f'{json.dumps(session_id)}:{{"lazy":{json.dumps(bool(lazy))},"fields":{encode_entry(fields)}}}')
+        except (TypeError, ValueError) as e:
+            skipped.append((session_id, str(e)))
+    try:
+        events = encode_entry(pre_session_events)
+    except (TypeError, ValueError) as e:
+        skipped.append(("pre_session_events", str(e)))
+        events = "{}"
+    document = f'{{"format":{CHECKPOINT_FORMAT},"sessions":{{{",".join(parts)}}},"pre_session_events":{events}}}'
+    return zlib.compress(document.encode("utf-8"), 6), len(parts), skipped
+
+
+def decode_checkpoint(payload):
+    document = decode_entry(zlib.decompress(payload).decode("utf-8"))
+    if document.get("format") != CHECKPOINT_FORMAT:
+        raise ValueError(f"unsupported checkpoint format {document.get('format')!r}")
+    return document
+
+
+def save_checkpoint(db_session, study_mode, payload, session_count):
+    """Replace this study mode's checkpoint row."""
+    db_session.query(db.ServerCheckpoint).filter(db.ServerCheckpoint.study_mode == study_mode).delete(
+        synchronize_session=False
+    )
+    db_session.add(db.ServerCheckpoint(
+        study_mode=study_mode, created_at=datetime.utcnow(), session_count=session_count, payload=payload
+    ))
+    db_session.commit()
+
+
+def take_checkpoint(db_session, study_mode):
+    """Read and delete this study mode's checkpoint. Returns (created_at, payload) or None.
+    A checkpoint is only ever loaded once, even if the boot that took it crashes."""
+    row = db_session.query(db.ServerCheckpoint.created_at, db.ServerCheckpoint.payload).filter(
+        db.ServerCheckpoint.study_mode == study_mode
+    ).first()
+    if row is None:
+        return None
+    db_session.query(db.ServerCheckpoint).filter(db.ServerCheckpoint.study_mode == study_mode).delete(
+        synchronize_session=False
+    )
+    db_session.commit()
+    return row.created_at, bytes(row.payload)
@@ -0,0 +1,520 @@
+"""
+Local write-ahead journal for study_sessions writes.
+
+Every journaled mutation is appended to a JSONL file and fsync'd (in small batches)
+BEFORE a background applier writes it to the database. A failed commit or a database
+outage therefore no longer leaves the in-memory `sessions` dict as the only copy of a
+participant's data: entries stay in the journal and are retried until the DB is back,
+and a restarted process replays whatever was not yet applied.
+
+Each session's entries are applied strictly in sequence order, one at a time; different
+sessions are applied in parallel by a small worker pool, so an entry that keeps failing
+(and backing off) holds up only its own session. Sequence numbers are time_ns-based so
+they keep increasing across restarts; appliers use them for idempotent, conditional
+writes (study_sessions.journal_seq), so replaying an already-applied entry is a no-op.
+
+Async endpoints use record_async() / wait_for_session_async(): the snapshot is taken on
+the event loop (a cheap copy of its lists), encoded by a single FIFO worker thread, and the
+wait is an asyncio future the applier resolves, so neither ties up the event loop. The
+journal lock only covers claiming the seq and writing the line, so a large snapshot no
+longer holds up every other session's writes while it is encoded.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import exc as sa_exc
+
+# Errors that mean "database unavailable right now" — keep the entry and retry.
+# Anything else is a permanent failure for that entry and goes to the dead-letter file.
+TRANSIENT_DB_ERRORS = (
+    sa_exc.OperationalError,
+    sa_exc.InterfaceError,
+    sa_exc.DisconnectionError,
+    sa_exc.TimeoutError,
+)
+
+
+def _encode_default(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode_hook(obj):
+    if len(obj) == 1 and "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+def encode_entry(entry):
+    return json.dumps(entry, default=_encode_default, separators=(",", ":"))
+
+
+def decode_entry(line):
+    return json.loads(line, object_hook=_decode_hook)
+
+
+def _detach(value):
+    """Snapshot of a payload's containers: dicts are copied all the way down, lists one
+    level (their items are append-only log records), so the live logs can keep growing
+    while the snapshot is encoded."""
+    if isinstance(value, dict):
+        return {key: _detach(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+
+def _resolve(future, value):
+    if not future.done():
+        future.set_result(value)
+
+
+def _resolve_threadsafe(waiter, value):
+    loop, future = waiter
+    try:
+        loop.call_soon_threadsafe(_resolve, future, value)
+    except RuntimeError:
+        pass  # the waiting loop has been closed
+
+
+class SessionJournal:
+    """Append-only journal + fsync batcher + per-session in-order DB appliers.
+
+    appliers maps an entry kind to fn(db_session, entry) -> result. The applier runs in
+    its own SessionLocal session and must commit; a raised TRANSIENT_DB_ERRORS exception
+    means retry that session's entry later, any other exception dead-letters the entry.
+    """
+
+    def __init__(self, path, session_factory, appliers, fsync_interval=0.05, retry_max_delay=10.0,
+                 apply_workers=4):
+        self.path = path
+        self.dead_letter_path = f"{path}.dead"
+        self._session_factory = session_factory
+        self._appliers = appliers
+        self._fsync_interval = fsync_interval
+        self._retry_max_delay = retry_max_delay
+        self._apply_workers = max(1, apply_workers)
+
+        self._cond = threading.Condition()
+        # One thread, so record_async() snapshots are journaled in the order they were taken.
+        self._encoder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal-encode")
+        self._file = None
+        self._last_seq = 0
+        self._unsynced = []       # written to the file, not yet fsync'd
+        # fsync'd entries by session, each queue in seq order. A session with a queue is
+        # in exactly one of: _runnable (next up), _applying (a worker has its head entry)
+        # or _retry_at (backing off after a transient error).
+        self._queues = {}
+        self._runnable = deque()
+        self._applying = set()
+        self._retry_at = {}       # session_id -> monotonic time its head entry is retried
+        self._retry_delay = {}    # session_id -> next backoff
+        self._pending_by_session = {}
+        self._results = {}        # seq -> applier result, for record(wait=True) callers
+        self._waiting_seqs = set()
+        self._futures = {}        # seq -> (loop, future), for record_async(wait=True)
+        self._session_waiters = {}  # session_id -> [(loop, future)], for wait_for_session_async
+        self._started = False
+        self._stopping = False
+        self._db_down_since = None
+        self.counters = {"recorded": 0, "applied": 0, "retries": 0, "dead_lettered": 0, "replayed": 0}
+
+    # --------------------------------------------------------------- lifecycle
+    def start(self, drain_timeout=15.0):
+        """Open the journal, queue any entries left by a previous process, start the
+        fsync and apply threads, and give the replay up to drain_timeout seconds."""
+        with self._cond:
+            if self._started:
+                return
+            replayed = self._load_existing_entries()
+            try:
+                self._file = open(self.path, "a", encoding="utf-8")
+            except OSError as e:
+                print(f"⚠️ JOURNAL: cannot open {self.path} ({e}) — writes will not survive a restart")
+                self._file = None
+            self._started = True
+
+        threading.Thread(target=self._fsync_loop, name="journal-fsync", daemon=True).start()
+        for worker in range(self._apply_workers):
+            threading.Thread(target=self._apply_loop, name=f"journal-apply-{worker}", daemon=True).start()
+
+        if replayed:
+            print(f"📒 JOURNAL REPLAY: {replayed} unapplied entries from a previous run queued for the database")
+            if not self.drain(timeout=drain_timeout):
+                print(f"⚠️ JOURNAL REPLAY still pending after {drain_timeout}s "
+                      f"({self.pending_count()} entries) — continuing startup, applier keeps retrying")
+
+    def close(self, timeout=10.0):
+        """Flush + fsync everything and give the applier up to timeout seconds to finish."""
+        self.drain(timeout=timeout)
+        with self._cond:
+            self._stopping = True
+            self._sync_locked()
+            self._cond.notify_all()
+
+    def _load_existing_entries(self):
+        if not os.path.exists(self.path):
+            return 0
+        entries = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(decode_entry(line))
+                except ValueError:
+                    # A torn final line from a crash mid-write was never fsync-acknowledged.
+                    print(f"⚠️ JOURNAL: skipping unreadable line {line_number} in {self.path}")
+        entries.sort(key=lambda entry: entry["seq"])
+        for entry in entries:
+            self._track_pending(entry["session_id"], +1)
+            self._last_seq = max(self._last_seq, entry["seq"])
+        self._enqueue_locked(entries)
+        self.counters["replayed"] += len(entries)
+        return len(entries)
+
+    # ----------------------------------------------------------------- writing
+    def record(self, kind, session_id, data, wait=False, timeout=8.0, prepare=None):
+        """Journal one mutation. Returns immediately with True once it is buffered for
+        fsync, or with wait=True blocks until the applier has written it (returning the
+        applier's result, or False on timeout / permanent failure).
+
+        prepare, if given, is called with the journal's detached copy of data and may add
+        to it (e.g. counters derived from the logs) before the entry is written."""
+        data_line, data = self._encode(_detach(data), prepare)
+        with self._cond:
+            seq = self._append_locked(kind, session_id, data_line, data)
+            if not self._started:
+                # Before start() (e.g. import-time code paths) apply inline.
+                return self._apply_inline_locked()
+            if not wait:
+                return True
+            self._waiting_seqs.add(seq)
+            self._cond.notify_all()
+            deadline = time.monotonic() + timeout
+            while seq not in self._results:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting_seqs.discard(seq)
+                    return False
+                self._cond.wait(remaining)
+            self._waiting_seqs.discard(seq)
+            return self._results.pop(seq)
+
+    async def record_async(self, kind, session_id, data, wait=False, timeout=8.0, prepare=None):
+        """record() for the event loop: data is snapshotted here, encoding and prepare run
+        in the journal's encoder thread, and wait=True awaits the applier instead of
+        blocking."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future() if wait else None
+        result = await loop.run_in_executor(self._encoder, self._record_for_loop, kind, session_id,
+                                            _detach(data), prepare, loop, future)
+        if future is None:
+            return result
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return False
+
+    def _record_for_loop(self, kind, session_id, data, prepare, loop, future):
+        data_line, data = self._encode(data, prepare)
+        with self._cond:
+            seq = self._append_locked(kind, session_id, data_line, data)
+            if not self._started:
+                result = self._apply_inline_locked()
+                if future is not None:
+                    loop.call_soon_threadsafe(_resolve, future, result)
+                return result
+            if future is not None:
+                self._futures[seq] = (loop, future)
+                self._cond.notify_all()
+            return True
+
+    def next_seq(self):
+        """Claim a seq without journaling anything: a direct row rewrite stamped with it
+        supersedes every entry already recorded for that row."""
+        with self._cond:
+            return self._next_seq_locked()
+
+    def _next_seq_locked(self):
+        seq = max(time.time_ns(), self._last_seq + 1)
+        self._last_seq = seq
+        return seq
+
+    @staticmethod
+    def _encode(data, prepare):
+        """Encode a payload outside the lock. Returns (line, the applier's copy): the copy is
+        decoded from the line, so it is exactly what was journaled."""
+        line = encode_entry(data)
+        data = decode_entry(line)
+        if prepare is not None:
+            prepare(data)
+            line = encode_entry(data)
+        return line, data
+
+    def _append_locked(self, kind, session_id, data_line, data):
+        seq = self._next_seq_locked()
+        entry = {"seq": seq, "kind": kind, "session_id": session_id, "ts": time.time()}
+        line = f'{encode_entry(entry)[:-1]},"data":{data_line}}}'
+        entry["data"] = data
+        if self._file is not None:
+            try:
+                self._file.write(line + "\n")
+            except OSError as e:
+                print(f"⚠️ JOURNAL WRITE FAILED for {session_id[:8]}... ({e}) — applying without durability")
+        self._unsynced.append(entry)
+        self._track_pending(session_id, +1)
+        self.counters["recorded"] += 1
+        self._cond.notify_all()
+        return seq
+
+    def _apply_inline_locked(self):
+        self._sync_locked()
+        entries = sorted((entry for queue in self._queues.values() for entry in queue),
+                         key=lambda entry: entry["seq"])
+        self._queues.clear()
+        self._runnable.clear()
+        result = True
+        for entry in entries:
+            result = self._apply_one(entry)
+            self._finish_locked(entry, result)
+        return result
+
+    def _track_pending(self, session_id, delta):
+        count = self._pending_by_session.get(session_id, 0) + delta
+        if count <= 0:
+            self._pending_by_session.pop(session_id, None)
+            for waiter in self._session_waiters.pop(session_id, ()):
+                _resolve_threadsafe(waiter, True)
+        else:
+            self._pending_by_session[session_id] = count
+
+    def _enqueue_locked(self, entries):
+        for entry in entries:
+            session_id = entry["session_id"]
+            queue = self._queues.get(session_id)
+            if queue is None:
+                queue = self._queues[session_id] = deque()
+                self._runnable.append(session_id)
+            queue.append(entry)
+
+    def _sync_locked(self):
+        if not self._unsynced:
+            return
+        if self._file is not None:
+            try:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError as e:
+                print(f"⚠️ JOURNAL FSYNC FAILED: {e}")
+        self._enqueue_locked(self._unsynced)
+        self._unsynced = []
+        self._cond.notify_all()
+
+    def _fsync_loop(self):
+        while True:
+            with self._cond:
+                while not self._unsynced and not self._stopping:
+                    self._cond.wait()
+                if self._stopping and not self._unsynced:
+                    return
+            # Batch window: let concurrent writers pile into the same fsync, unless a
+            # caller is blocked waiting on one of these entries.
+            with self._cond:
+                if not any(entry["seq"] in self._waiting_seqs or entry["seq"] in self._futures
+                           for entry in self._unsynced):
+                    self._cond.wait(self._fsync_interval)
+                self._sync_locked()
+
+    # ---------------------------------------------------------------- applying
+    def _apply_loop(self):
+        while True:
+            with self._cond:
+                session_id = self._next_session_locked()
+                while session_id is None:
+                    if self._stopping and not self._queues:
+                        return
+                    self._compact_locked()
+                    self._cond.wait(self._next_retry_in_locked())
+                    session_id = self._next_session_locked()
+                entry = self._queues[session_id][0]
+                self._applying.add(session_id)
+
+            try:
+                result = self._apply_one(entry, raise_transient=True)
+            except TRANSIENT_DB_ERRORS as e:
+                with self._cond:
+                    self._applying.discard(session_id)
+                    self.counters["retries"] += 1
+                    delay = self._retry_delay.get(session_id, 0.5)
+                    self._retry_delay[session_id] = min(delay * 2, self._retry_max_delay)
+                    self._retry_at[session_id] = time.monotonic() + delay
+                    if self._db_down_since is None:
+                        self._db_down_since = time.time()
+                        print(f"🛑 JOURNAL: database unavailable ({type(e).__name__}) — "
+                              f"{self._queued_count_locked()} entries held in the journal, retrying")
+                    self._cond.notify_all()
+                continue
+
+            with self._cond:
+                if self._db_down_since is not None:
+                    print(f"✅ JOURNAL: database back after {time.time() - self._db_down_since:.1f}s — draining")
+                    self._db_down_since = None
+                self._retry_delay.pop(session_id, None)
+                self._applying.discard(session_id)
+                queue = self._queues.get(session_id)
+                if queue and queue[0] is entry:
+                    queue.popleft()
+                if queue:
+                    self._runnable.append(session_id)
+                else:
+                    self._queues.pop(session_id, None)
+                self._finish_locked(entry, result)
+
+    def _next_session_locked(self):
+        if self._retry_at:
+            now = time.monotonic()
+            for session_id, retry_at in list(self._retry_at.items()):
+                if retry_at <= now:
+                    del self._retry_at[session_id]
+                    self._runnable.append(session_id)
+        return self._runnable.popleft() if self._runnable else None
+
+    def _next_retry_in_locked(self):
+        if not self._retry_at:
+            return None
+        return max(0.0, min(self._retry_at.values()) - time.monotonic())
+
+    def _queued_count_locked(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _apply_one(self, entry, raise_transient=False):
+        applier = self._appliers.get(entry["kind"])
+        db_session = self._session_factory()
+        try:
+            if applier is None:
+                raise KeyError(f"no applier registered for journal kind {entry['kind']!r}")
+            result = applier(db_session, entry)
+            return True if result is None else result
+        except TRANSIENT_DB_ERRORS:
+            db_session.rollback()
+            if raise_transient:
+                raise
+            return False
+        except Exception as e:
+            db_session.rollback()
+            self._dead_letter(entry, e)
+            return False
+        finally:
+            db_session.close()
+
+    def _finish_locked(self, entry, result):
+        self._track_pending(entry["session_id"], -1)
+        self.counters["applied"] += 1
+        if entry["seq"] in self._waiting_seqs:
+            self._results[entry["seq"]] = result
+        waiter = self._futures.pop(entry["seq"], None)
+        if waiter is not None:
+            _resolve_threadsafe(waiter, result)
+        self._cond.notify_all()
+
+    def _dead_letter(self, entry, error):
+        self.counters["dead_lettered"] += 1
+        print(f"🛑❌ JOURNAL ENTRY DEAD-LETTERED | {entry['kind']} | session {str(entry['session_id'])[:8]}... | "
+              f"seq {entry['seq']} | {type(error).__name__}: {error}")
+        try:
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                f.write(encode_entry({"entry": entry, "error": repr(error),
+                                      "traceback": traceback.format_exc()}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            print(f"⚠️ JOURNAL: could not write dead-letter file: {e}")
+
+    def _compact_locked(self):
+        """Everything written has been applied: the file's contents are no longer needed."""
+        if self._file is None or self._unsynced or self._queues:
+            return
+        try:
+            if self._file.tell() > 0:
+                self._file.flush()
+                self._file.truncate(0)
+                self._file.seek(0)
+        except OSError as e:
+            print(f"⚠️ JOURNAL: could not truncate {self.path}: {e}")
+
+    # ------------------------------------------------------------------ status
+    def pending_count(self):
+        with self._cond:
+            return len(self._unsynced) + self._queued_count_locked()
+
+    def wait_for_session(self, session_id, timeout=5.0):
+        """Block until no journaled write for session_id is outstanding (or timeout).
+        Call before reading or directly overwriting a row the journal may still touch."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._pending_by_session.get(session_id):
+                if not self._started:
+                    self._apply_inline_locked()
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.notify_all()
+                self._cond.wait(remaining)
+        return True
+
+    async def wait_for_session_async(self, session_id, timeout=5.0):
+        """wait_for_session() for the event loop: awaits the applier instead of blocking."""
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            if not self._pending_by_session.get(session_id):
+                return True
+            if not self._started:
+                self._apply_inline_locked()
+                return True
+            future = loop.create_future()
+            waiters = [waiter for waiter in self._session_waiters.get(session_id, ()) if not waiter[1].done()]
+            waiters.append((loop, future))
+            self._session_waiters[session_id] = waiters
+            self._cond.notify_all()
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return False
+
+    def drain(self, timeout=10.0):
+        """Block until every journaled entry has been applied (or timeout)."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._unsynced or self._queues:
+                if not self._started:
+                    self._apply_inline_locked()
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.notify_all()
+                self._cond.wait(remaining)
+        return True
+
+    def stats(self):
+        with self._cond:
+            return {
+                **self.counters,
+                "pending": len(self._unsynced) + self._queued_count_locked(),
+                "sessions_pending": len(self._pending_by_session),
+                "sessions_retrying": len(self._retry_at),
+                "database_unavailable_seconds": (
+                    round(time.time() - self._db_down_since, 1) if self._db_down_since else 0
+                ),
+            }
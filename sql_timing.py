@@ -0,0 +1,224 @@
+"""
+Per-statement SQL timing, aggregated by normalized fingerprint, plus a slow-query log.
+
+install(engine) hooks before/after_cursor_execute. Each statement's SQL is reduced to a
+fingerprint (bind parameters, literals and expanded IN / multi-row VALUES lists
+collapsed), so `SELECT ... WHERE id = %(id_1)s` issued 400 times by one sweep is one row
+with count=400 rather than 400 different strings. Per fingerprint we keep count, total,
+max, a log-bucket histogram for p50/p99, and which endpoints (or background threads)
+issued it.
+
+Statements slower than SLOW_QUERY_MS are logged (study_log category "slow_query") with
+the endpoint that issued them. Aggregates are exported on /metrics
+(db_statement_duration_seconds by operation + table, db_statement_top for the heaviest
+fingerprints) and in full on /admin/sql_stats.
+"""
+import bisect
+import hashlib
+import os
+import re
+import threading
+import time
+
+from sqlalchemy import event
+
+import metrics
+import study_log
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "250"))
+MAX_FINGERPRINTS = 500          # later distinct statements are counted under "other"
+MAX_ORIGINS_PER_FINGERPRINT = 10
+TOP_FINGERPRINTS_EXPORTED = 25
+_FINGERPRINT_CACHE_MAX = 5000
+
+# Log-spaced bucket bounds for quantiles: 50us .. ~130s, 25% apart (~5% median error).
+_QUANTILE_BOUNDS = tuple(0.00005 * 1.25 ** i for i in range(67))
+
+_PARAM = re.compile(r"%\(\w+\)s|%s|\?|(?<![:\w]):\w+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN \(\?(?:, \?)*\)", re.IGNORECASE)
+_VALUES_ROWS = re.compile(r"(\(\?(?:, \?)*\))(?:, \(\?(?:, \?)*\))+")
+_SPACE = re.compile(r"\s+")
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+\"?([\w.]+)", re.IGNORECASE)
+
+statement_seconds = metrics.histogram(
+    "db_statement_duration_seconds", "SQL statement execution time by operation and first table.",
+    ("operation", "table"),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+slow_statements_total = metrics.counter(
+    "db_slow_statements_total", "Statements slower than SLOW_QUERY_MS, by operation and table.",
+    ("operation", "table"),
+)
+
+
+def normalize(statement):
+    """Fingerprint text: whitespace collapsed, literals and bind parameters as ?, IN lists
+    and multi-row VALUES collapsed to one element."""
+    text = _SPACE.sub(" ", statement).strip()
+    text = _STRING.sub("?", text)
+    text = _PARAM.sub("?", text)
+    text = _NUMBER.sub("?", text)
+    text = _IN_LIST.sub("IN (?...)", text)
+    return _VALUES_ROWS.sub(r"\1, ...", text)
+
+
+class _Fingerprint:
+    __slots__ = ("id", "text", "operation", "table", "child", "slow_child", "count", "total", "max",
+                 "buckets", "origins", "slow")
+
+    def __init__(self, text):
+        self.id = hashlib.sha1(text.encode("utf-8", "replace")).hexdigest()[:12]
+        self.text = text
+        self.operation = (text.split(" ", 1)[0] or "?").upper()
+        table = _TABLE.search(text)
+        self.table = table.group(1).lower() if table else "-"
+        self.child = statement_seconds.labels(self.operation, self.table)
+        self.slow_child = slow_statements_total.labels(self.operation, self.table)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(_QUANTILE_BOUNDS) + 1)
+        self.origins = {}
+        self.slow = 0
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return _QUANTILE_BOUNDS[index] if index < len(_QUANTILE_BOUNDS) else self.max
+        return self.max
+
+    def snapshot(self):
+        return {
+            "fingerprint": self.id,
+            "statement": self.text,
+            "operation": self.operation,
+            "table": self.table,
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 2),
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else None,
+            "p50_ms": round(self.quantile(0.5) * 1000, 3) if self.count else None,
+            "p99_ms": round(self.quantile(0.99) * 1000, 3) if self.count else None,
+            "max_ms": round(self.max * 1000, 3),
+            "slow": self.slow,
+            "origins": dict(sorted(self.origins.items(), key=lambda item: -item[1])),
+        }
+
+
+_lock = threading.Lock()
+_fingerprints = {}          # fingerprint text -> _Fingerprint
+_by_statement = {}          # raw statement -> _Fingerprint (normalizing is the costly part)
+_OTHER = None
+
+
+def _fingerprint_for(statement):
+    global _OTHER
+    fingerprint = _by_statement.get(statement)
+    if fingerprint is not None:
+        return fingerprint
+    text = normalize(statement)
+    with _lock:
+        fingerprint = _fingerprints.get(text)
+        if fingerprint is None:
+            if len(_fingerprints) >= MAX_FINGERPRINTS:
+                if _OTHER is None:
+                    _OTHER = _Fingerprint("(other statements)")
+                fingerprint = _OTHER
+            else:
+                fingerprint = _fingerprints[text] = _Fingerprint(text)
+        if len(_by_statement) >= _FINGERPRINT_CACHE_MAX:
+            _by_statement.clear()
+        _by_statement[statement] = fingerprint
+    return fingerprint
+
+
+def current_origin():
+    """The endpoint (route template) of the request being served, else the thread name
+    (session-journal applier, cleanup sweep, ...)."""
+    scope = metrics.current_request_scope.get()
+    if scope is not None:
+        route = scope.get("route")
+        return f"{scope['method']} {getattr(route, 'path', None) or scope['path']}"
+    return f"thread:{threading.current_thread().name}"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._sql_timing_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_sql_timing_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    fingerprint = _fingerprint_for(statement)
+    origin = current_origin()
+    index = bisect.bisect_left(_QUANTILE_BOUNDS, elapsed)
+    with _lock:
+        fingerprint.count += 1
+        fingerprint.total += elapsed
+        if elapsed > fingerprint.max:
+            fingerprint.max = elapsed
+        fingerprint.buckets[index] += 1
+        if origin in fingerprint.origins or len(fingerprint.origins) < MAX_ORIGINS_PER_FINGERPRINT:
+            fingerprint.origins[origin] = fingerprint.origins.get(origin, 0) + 1
+    fingerprint.child.observe(elapsed)
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        with _lock:
+            fingerprint.slow += 1
+        fingerprint.slow_child.inc()
+        study_log.log_event(
+            "slow_query", fingerprint.text, level=study_log.WARNING, duration_ms=round(elapsed * 1000, 1),
+            origin=origin, fingerprint=fingerprint.id, executemany=executemany,
+        )
+
+
+@study_log.renderer("slow_query")
+def render_slow_query(message, fields):
+    return (f"🐢 SLOW SQL {fields['duration_ms']:.0f}ms [{fields['origin']}] "
+            f"({fields['fingerprint']}) {message[:500]}")
+
+
+def install(engine):
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def stats(sort="total", limit=50):
+    key = {"total": lambda f: f.total, "count": lambda f: f.count, "p99": lambda f: f.quantile(0.99) or 0,
+           "max": lambda f: f.max}[sort]
+    with _lock:
+        fingerprints = list(_fingerprints.values()) + ([_OTHER] if _OTHER is not None else [])
+        ranked = sorted(fingerprints, key=key, reverse=True)[:limit]
+        statements = [fingerprint.snapshot() for fingerprint in ranked]
+        totals = {"fingerprints": len(fingerprints), "statements": sum(f.count for f in fingerprints),
+                  "total_ms": round(sum(f.total for f in fingerprints) * 1000, 1)}
+    return {"slow_query_ms": SLOW_QUERY_MS, **totals, "top": statements}
+
+
+def _top_fingerprint_values():
+    with _lock:
+        ranked = sorted(_fingerprints.values(), key=lambda f: f.total, reverse=True)[:TOP_FINGERPRINTS_EXPORTED]
+        values = {}
+        for fingerprint in ranked:
+            if not fingerprint.count:
+                continue
+            labels = (fingerprint.id, fingerprint.operation, fingerprint.table)
+            values[labels + ("count",)] = fingerprint.count
+            values[labels + ("total_seconds",)] = round(fingerprint.total, 6)
+            values[labels + ("p50_seconds",)] = round(fingerprint.quantile(0.5), 6)
+            values[labels + ("p99_seconds",)] = round(fingerprint.quantile(0.99), 6)
+    return values
+
+
+metrics.gauge(
+    "db_statement_top", "Heaviest SQL fingerprints by total time (text on /admin/sql_stats).",
+    ("fingerprint", "operation", "table", "stat"), fn=_top_fingerprint_values,
+)
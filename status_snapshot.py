@@ -0,0 +1,69 @@
+"""
+Cached status snapshots for the monitoring endpoints.
+
+/health and /study_status_ping are polled (by Railway, dashboards and every participant's
+browser) far more often than the numbers they report change. A SnapshotCache computes
+its value at most once per max_age_seconds; every other call is served from memory.
+Recomputes are single-flight: concurrent callers that find the snapshot stale wait for
+the one refresh in progress instead of each running the queries.
+"""
+import asyncio
+import threading
+import time
+
+
+class SnapshotCache:
+    """compute() -> value, cached for max_age_seconds. A failed compute is not cached."""
+
+    def __init__(self, name, compute, max_age_seconds):
+        self.name = name
+        self._compute = compute
+        self.max_age_seconds = max_age_seconds
+        self._value = None
+        self._computed_at = None    # monotonic
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "refreshes": 0, "errors": 0}
+
+    def _fresh(self):
+        return self._computed_at is not None and time.monotonic() - self._computed_at < self.max_age_seconds
+
+    def peek(self):
+        """The cached value if it is still fresh, else None. Never computes."""
+        if self._fresh():
+            self.counters["hits"] += 1
+            return self._value
+        return None
+
+    def get(self):
+        value = self.peek()
+        if value is not None:
+            return value
+        with self._lock:
+            if self._fresh():   # another caller refreshed while we waited for the lock
+                self.counters["hits"] += 1
+                return self._value
+            try:
+                value = self._compute()
+            except Exception:
+                self.counters["errors"] += 1
+                raise
+            self._value = value
+            self._computed_at = time.monotonic()
+            self.counters["refreshes"] += 1
+            return value
+
+    async def get_async(self):
+        """get() for async endpoints: the fresh path stays on the event loop, a refresh
+        (which may query the database) runs in a worker thread."""
+        value = self.peek()
+        if value is not None:
+            return value
+        return await asyncio.to_thread(self.get)
+
+    def invalidate(self):
+        self._computed_at = None
+
+    def age_seconds(self):
+        if self._computed_at is None:
+            return None
+        return round(time.monotonic() - self._computed_at, 2)
@@ -0,0 +1,210 @@
+"""
+Structured, leveled logging written off the request path.
+
+log_event(category, message, **fields) only builds a LogRecord and drops it on a bounded
+queue; one background thread formats and writes it to stdout. Formatting (banners, JSON,
+tracebacks) therefore never runs on the event loop, and a slow stdout (Railway's log
+collector under load) can no longer stall requests — if the queue is full the record is
+dropped and counted instead.
+
+Output is LOG_FORMAT=text (default: the human-readable Railway banners, one renderer per
+category registered with @renderer) or LOG_FORMAT=json (one JSON object per line with
+ts/level/category/message and the structured fields). LOG_LEVEL filters by level.
+
+Noisy categories get a token bucket (CATEGORY_LIMITS): past the burst, records are
+dropped and the next one that passes carries suppressed=<count dropped since>.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_MAX = int(os.getenv("LOG_QUEUE_MAX", "10000"))
+
+# category -> (records per second, burst). Categories not listed are not limited.
+CATEGORY_LIMITS = {
+    "frontend_debug": (2.0, 20),
+    "gemini_retry": (1.0, 10),
+    "gemini_failure": (1.0, 10),
+    "turn_debug": (20.0, 200),
+    "slow_query": (2.0, 20),
+}
+
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+
+_logger = logging.getLogger("study")
+_logger.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+_logger.propagate = False
+
+_renderers = {}
+counters = {"queued": 0, "dropped_queue_full": 0, "dropped_rate_limited": 0, "write_errors": 0}
+
+
+def renderer(category):
+    """Register fn(message, fields) -> str as the LOG_FORMAT=text rendering of a category.
+    It runs on the writer thread."""
+    def register(fn):
+        _renderers[category] = fn
+        return fn
+    return register
+
+
+class _TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated", "suppressed")
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.suppressed = 0
+
+
+_buckets = {category: _TokenBucket(*limit) for category, limit in CATEGORY_LIMITS.items()}
+_bucket_lock = threading.Lock()
+
+
+def _admit(category):
+    """None if the category is over its limit, else the number suppressed since the last
+    admitted record (0 for unlimited categories)."""
+    bucket = _buckets.get(category)
+    if bucket is None:
+        return 0
+    with _bucket_lock:
+        now = time.monotonic()
+        bucket.tokens = min(bucket.burst, bucket.tokens + (now - bucket.updated) * bucket.rate)
+        bucket.updated = now
+        if bucket.tokens < 1:
+            bucket.suppressed += 1
+            counters["dropped_rate_limited"] += 1
+            return None
+        bucket.tokens -= 1
+        suppressed, bucket.suppressed = bucket.suppressed, 0
+        return suppressed
+
+
+def log_event(category, message="", level=INFO, exc_info=None, **fields):
+    """Queue one structured record. Cheap: no formatting happens on the caller's thread.
+    exc_info may be an exception (its traceback is rendered by the writer)."""
+    if not _logger.isEnabledFor(level):
+        return
+    suppressed = _admit(category)
+    if suppressed is None:
+        return
+    if suppressed:
+        fields["suppressed"] = suppressed
+    if isinstance(exc_info, BaseException):
+        exc_info = (type(exc_info), exc_info, exc_info.__traceback__)
+    _logger.log(level, message, exc_info=exc_info, extra={"category": category, "fields": fields})
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that hands the record over as-is (the stock prepare() formats it on the
+    caller's thread) and drops instead of blocking when the queue is full."""
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            counters["queued"] += 1
+        except queue.Full:
+            counters["dropped_queue_full"] += 1
+
+
+class StudyFormatter(logging.Formatter):
+    def __init__(self, fmt):
+        super().__init__()
+        self.fmt = fmt
+
+    def format(self, record):
+        category = getattr(record, "category", "general")
+        fields = getattr(record, "fields", {})
+        message = record.getMessage()
+        exc_text = "".join(traceback.format_exception(*record.exc_info)) if record.exc_info else None
+        if self.fmt == "json":
+            document = {
+                "ts": datetime.utcfromtimestamp(record.created).isoformat() + "Z",
+                "level": record.levelname.lower(),
+                "category": category,
+                "message": message,
+                **fields,
+            }
+            if exc_text:
+                document["exception"] = exc_text
+            return json.dumps(document, default=str, ensure_ascii=False)
+        render = _renderers.get(category)
+        text = render(message, fields) if render else message
+        if fields.get("suppressed"):
+            text += f"\n   (+{fields['suppressed']} similar {category} records suppressed)"
+        if exc_text:
+            text += "\n" + exc_text.rstrip("\n")
+        return text
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """Writes to whatever sys.stdout is at write time (it may be swapped after import)."""
+
+    def emit(self, record):
+        self.stream = sys.stdout
+        super().emit(record)
+
+    def flush(self):
+        # Called at exit too, when a swapped-in stdout (e.g. pytest's capture) may already
+        # be closed.
+        self.stream = sys.stdout
+        try:
+            super().flush()
+        except (ValueError, OSError):
+            counters["write_errors"] += 1
+
+    def handleError(self, record):
+        counters["write_errors"] += 1
+
+
+_queue = queue.Queue(maxsize=LOG_QUEUE_MAX)
+_stream_handler = _StdoutHandler(sys.stdout)
+_stream_handler.setFormatter(StudyFormatter(LOG_FORMAT))
+_listener = logging.handlers.QueueListener(_queue, _stream_handler, respect_handler_level=False)
+_logger.addHandler(_NonBlockingQueueHandler(_queue))
+_listener_started = False
+_listener_lock = threading.Lock()
+
+
+def start_log_writer():
+    global _listener_started
+    with _listener_lock:
+        if not _listener_started:
+            _listener.start()
+            _listener_started = True
+
+
+def stop_log_writer():
+    """Write everything still queued, then stop the writer thread (shutdown)."""
+    global _listener_started
+    with _listener_lock:
+        if _listener_started:
+            _listener.stop()
+            _listener_started = False
+            _stream_handler.flush()
+
+
+def stats():
+    return {**counters, "queue_depth": _queue.qsize(), "format": LOG_FORMAT, "level": LOG_LEVEL}
+
+
+start_log_writer()
+atexit.register(stop_log_writer)
@@ -0,0 +1,133 @@
+"""
+Text -> JSONB migration of the study_sessions log columns (database.ensure_json_columns)
+and the server-side append it enables (database.append_json_log).
+
+The swap must not happen while another service still runs Text-only code, must keep the
+original text in <name>_text_legacy, and append_json_log must behave the same before and
+after it. Postgres only, skipped unless DATABASE_URL points at Postgres. Every test runs
+in its own throwaway schema starting from the legacy Text layout.
+
+    DATABASE_URL=postgresql://... python -m pytest tests/test_json_storage.py
+"""
+import os
+import uuid
+
+import pytest
+
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+pytestmark = pytest.mark.skipif(
+    not DATABASE_URL.startswith(("postgres://", "postgresql")),
+    reason="the JSONB migration only runs on Postgres (set DATABASE_URL)",
+)
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+
+import database as db
+
+CONVERSATION = [{"turn": 1, "user": "hi", "assistant": "hello"}]
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    schema = f"json_storage_{uuid.uuid4().hex[:8]}"
+    with db.engine.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+    test_engine = create_engine(db.engine.url, connect_args={"options": f"-csearch_path={schema}"})
+    monkeypatch.setattr(db, "JSON_SWAP_SERVICES", ["AI_WITNESS", "HUMAN_WITNESS"])
+    monkeypatch.setattr(db, "SERVICE_STUDY_MODE", "HUMAN_WITNESS")
+    native = set(db.JSONB_NATIVE_COLUMNS)
+    try:
+        db.Base.metadata.create_all(test_engine)
+        with test_engine.begin() as conn:
+            for name in db.JSON_LOG_COLUMNS:   # the layout before the migration
+                conn.execute(text(f"ALTER TABLE study_sessions ALTER COLUMN {name} TYPE text USING {name}::text"))
+            conn.execute(db.StudySession.__table__.insert(), [
+                {"id": "with-log", "conversation_log": CONVERSATION},
+                {"id": "empty-log", "conversation_log": None},
+                {"id": "bad-log", "conversation_log": None},
+            ])
+            conn.execute(text("UPDATE study_sessions SET conversation_log = 'not json' WHERE id = 'bad-log'"))
+        yield test_engine
+    finally:
+        db.JSONB_NATIVE_COLUMNS.clear()
+        db.JSONB_NATIVE_COLUMNS.update(native)
+        test_engine.dispose()
+        with db.engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+
+
+def _column_types(engine):
+    return {column["name"]: column["type"] for column in inspect(engine).get_columns("study_sessions")}
+
+
+def _register_other_service(engine):
+    with engine.begin() as conn:
+        db.register_service(conn, "AI_WITNESS")
+
+
+def test_swap_waits_for_the_other_service(engine):
+    assert db.ensure_json_columns(bind=engine) is None
+
+    types = _column_types(engine)
+    assert not isinstance(types["conversation_log"], JSONB)
+    assert "conversation_log_text_legacy" not in types
+    assert isinstance(types["conversation_log__jsonb"], JSONB)
+    assert db.JSONB_NATIVE_COLUMNS == set()
+
+    # Text-only code keeps writing the original column; the shadow follows it.
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE study_sessions SET conversation_log = '[{\"turn\": 2}]' WHERE id = 'empty-log'"))
+        shadow = dict(conn.execute(text("SELECT id, conversation_log__jsonb FROM study_sessions")).all())
+    assert shadow == {"with-log": CONVERSATION, "empty-log": [{"turn": 2}], "bad-log": None}
+
+
+def test_swap_once_every_service_runs_jsonb_code(engine):
+    assert db.ensure_json_columns(bind=engine) is None
+    _register_other_service(engine)
+    assert db.ensure_json_columns(bind=engine) is True
+
+    types = _column_types(engine)
+    assert all(isinstance(types[name], JSONB) for name in db.JSON_LOG_COLUMNS)
+    assert not any(name.endswith("__jsonb") for name in types)
+    assert db.JSONB_NATIVE_COLUMNS == set(db.JSON_LOG_COLUMNS)
+    with engine.connect() as conn:
+        rows = {row.id: row for row in conn.execute(text(
+            "SELECT id, conversation_log, conversation_log_text_legacy FROM study_sessions"))}
+        triggers = conn.execute(text(
+            "SELECT count(*) FROM information_schema.triggers WHERE event_object_table = 'study_sessions'"
+        )).scalar()
+    assert rows["with-log"].conversation_log == CONVERSATION
+    assert rows["bad-log"].conversation_log is None
+    assert rows["bad-log"].conversation_log_text_legacy == "not json"
+    assert triggers == 0
+
+    # Idempotent: a later boot finds nothing to convert.
+    assert db.ensure_json_columns(bind=engine) is True
+
+
+@pytest.mark.parametrize("swapped", [False, True], ids=["text", "jsonb"])
+def test_append_json_log(engine, swapped):
+    if swapped:
+        _register_other_service(engine)
+    db.ensure_json_columns(bind=engine)
+    assert ("conversation_log" in db.JSONB_NATIVE_COLUMNS) == swapped
+
+    table = db.StudySession.__table__
+    with Session(engine) as session:
+        appended = db.append_json_log(session, "with-log", "conversation_log", [{"turn": 2}],
+                                      extra_values={"turn_count": 2}, returning=True)
+        assert appended == CONVERSATION + [{"turn": 2}]
+        assert db.append_json_log(session, "empty-log", "conversation_log", [{"turn": 1}]) is True
+        assert db.append_json_log(session, "missing", "conversation_log", [{"turn": 1}]) is None
+        assert db.append_json_log(session, "with-log", "conversation_log", [{"turn": 3}],
+                                  condition=table.c.turn_count > 5) is None
+        session.commit()
+
+    with Session(engine) as session:
+        rows = {row.id: row for row in session.query(
+            db.StudySession.id, db.StudySession.conversation_log, db.StudySession.turn_count)}
+    assert rows["with-log"].conversation_log == CONVERSATION + [{"turn": 2}]
+    assert rows["with-log"].turn_count == 2
+    assert rows["empty-log"].conversation_log == [{"turn": 1}]
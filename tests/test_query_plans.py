@@ -0,0 +1,175 @@
+"""
+Query-plan regression test for the study_sessions partial indexes (database.py
+__table_args__): the stale sweeps, the waiting-room matcher and the live-session counts
+must each use the index meant for them, never a sequential scan.
+
+Postgres only (the partial indexes and EXPLAIN output are what production runs), so it is
+skipped unless DATABASE_URL points at Postgres. Everything happens in a throwaway schema.
+
+    DATABASE_URL=postgresql://... python -m pytest tests/test_query_plans.py
+"""
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+pytestmark = pytest.mark.skipif(
+    not DATABASE_URL.startswith(("postgres://", "postgresql")),
+    reason="query plans are checked against Postgres only (set DATABASE_URL)",
+)
+
+from sqlalchemy import and_, create_engine, func, or_, select, text
+
+import database as db
+import main
+
+SEED_ROWS = 100_000
+
+
+@pytest.fixture(scope="module")
+def engine():
+    schema = f"query_plans_{uuid.uuid4().hex[:8]}"
+    with db.engine.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+    test_engine = create_engine(db.engine.url, connect_args={"options": f"-csearch_path={schema}"})
+    try:
+        db.Base.metadata.create_all(test_engine)
+        with test_engine.begin() as conn:
+            conn.execute(db.StudySession.__table__.insert(), _seed_rows())
+        with test_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM ANALYZE study_sessions"))   # as autovacuum leaves it
+        yield test_engine
+    finally:
+        test_engine.dispose()
+        with db.engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+
+
+def _seed_rows():
+    """A long history of finished sessions as each study mode leaves them (AI_WITNESS rows
+    keep match_status 'waiting', HUMAN_WITNESS rows keep 'matched'), plus a thin slice of
+    live sessions in each timed state."""
+    now = datetime.utcnow()
+    rows = []
+    for i in range(SEED_ROWS):
+        started = now - timedelta(minutes=10 + i % 5000)
+        human = i % 2 == 1
+        row = {
+            "id": f"seed-{i:06d}", "study_mode": "HUMAN_WITNESS" if human else "AI_WITNESS",
+            "role": "interrogator" if i % 3 or not human else "witness", "session_status": "completed",
+            "match_status": "matched" if human else "waiting", "start_time": started, "last_updated": started,
+            "matched_at": started if human else None, "waiting_room_entered_at": started, "turn_count": 6,
+            "conversation_phase_reached": True,
+        }
+        live = i % 1000
+        recent = now - timedelta(seconds=i % 400)
+        live_state = {"turn_count": 0, "conversation_phase_reached": False, "last_updated": recent}
+        if live in (0, 1):
+            row.update(live_state, session_status="pre_consent", match_status="waiting",
+                       matched_at=None, waiting_room_entered_at=recent)
+        elif live in (2, 3):
+            row.update(live_state, session_status="active", match_status="matched", matched_at=recent)
+        elif live in (4, 5):
+            row.update(live_state, session_status="pre_consent", match_status="assigned",
+                       matched_at=None, waiting_room_entered_at=None)
+        elif live in (6, 7):
+            row.update(live_state, session_status="pre_consent", match_status=None,
+                       matched_at=None, waiting_room_entered_at=None)
+        elif live in (8, 9):
+            row.update(session_status="active", turn_count=3, last_updated=recent)
+        rows.append(row)
+    return rows
+
+
+def _plan(engine, statement):
+    compiled = statement.compile(dialect=engine.dialect, compile_kwargs={"render_postcompile": True})
+    with engine.connect() as conn:
+        result = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+    return (json.loads(result) if isinstance(result, str) else result)[0]["Plan"]
+
+
+def _nodes(plan):
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from _nodes(child)
+
+
+def assert_uses_index(engine, statement, index_name):
+    nodes = list(_nodes(_plan(engine, statement)))
+    seq_scans = [node for node in nodes if node["Node Type"] == "Seq Scan"
+                 and node.get("Relation Name") == "study_sessions"]
+    indexes = {node.get("Index Name") for node in nodes} - {None}
+    summary = " -> ".join(node["Node Type"] + (f" using {node['Index Name']}" if "Index Name" in node else "")
+                          for node in nodes)
+    assert not seq_scans, f"sequential scan of study_sessions: {summary}"
+    assert index_name in indexes, f"expected {index_name}: {summary}"
+
+
+def _stale(kind, *criteria):
+    """The WHERE of expire_stale_sessions / the matched re-queue sweep."""
+    return select(db.StudySession.id).where(*main.stale_session_state_filters(kind), *criteria)
+
+
+def test_stale_matched_sweep_uses_matched_index(engine):
+    cutoff = datetime.utcnow() - main.STALE_SESSION_TIMEOUTS["matched"]
+    assert_uses_index(engine, _stale("matched", db.StudySession.matched_at < cutoff),
+                      "ix_study_sessions_matched_at")
+
+
+def test_stale_waiting_sweep_uses_waiting_index(engine):
+    cutoff = datetime.utcnow() - main.STALE_SESSION_TIMEOUTS["waiting"]
+    statement = _stale("waiting", or_(
+        db.StudySession.waiting_room_entered_at < cutoff,
+        and_(db.StudySession.waiting_room_entered_at.is_(None), db.StudySession.last_updated < cutoff),
+    ))
+    assert_uses_index(engine, statement, "ix_study_sessions_waiting_queue")
+
+
+def test_stale_assigned_sweep_uses_assigned_index(engine):
+    cutoff = datetime.utcnow() - main.STALE_SESSION_TIMEOUTS["assigned"]
+    assert_uses_index(engine, _stale("assigned", db.StudySession.last_updated < cutoff),
+                      "ix_study_sessions_assigned_idle")
+
+
+def test_stale_pre_consent_sweep_uses_session_status_index(engine):
+    """No partial index for this one: given one, Postgres still preferred this index."""
+    cutoff = datetime.utcnow() - main.STALE_SESSION_TIMEOUTS["pre_consent"]
+    assert_uses_index(engine, _stale("pre_consent", db.StudySession.last_updated < cutoff),
+                      "ix_study_sessions_session_status")
+
+
+def test_waiting_room_match_uses_waiting_index(engine):
+    """attempt_match's oldest-live-waiting-partner query."""
+    statement = (
+        select(db.StudySession)
+        .where(
+            db.StudySession.role == "witness",
+            db.StudySession.match_status == "waiting",
+            db.StudySession.study_mode == main.STUDY_MODE,
+            db.StudySession.session_status.notin_(["abandoned", "timeout", "interrupted", "completed"]),
+            db.StudySession.waiting_room_entered_at.isnot(None),
+            db.StudySession.waiting_room_entered_at > datetime.utcnow() - timedelta(minutes=5),
+        )
+        .order_by(db.StudySession.waiting_room_entered_at.asc())
+        .limit(10)
+    )
+    assert_uses_index(engine, statement, "ix_study_sessions_waiting_queue")
+
+
+def test_active_session_counts_use_live_counts_index(engine):
+    """_compute_study_status (/study_status_ping)."""
+    has_messages = func.coalesce(db.StudySession.turn_count, 0) > 0
+    statement = (
+        select(db.StudySession.role, db.StudySession.match_status, has_messages.label("has_messages"),
+               func.count().label("sessions"))
+        .where(
+            db.StudySession.session_status.in_(["active", "pre_consent"]),
+            db.StudySession.role.isnot(None),
+            db.StudySession.study_mode == main.STUDY_MODE,
+        )
+        .group_by(db.StudySession.role, db.StudySession.match_status, has_messages)
+    )
+    assert_uses_index(engine, statement, "ix_study_sessions_live_counts")
@@ -0,0 +1,55 @@
+"""
+database.ensure_study_session_indexes on an existing SQLite table: it must add the
+indexes a table created before them is missing, drop OBSOLETE_STUDY_SESSION_INDEXES, and
+change nothing on a second run. Runs on a temporary SQLite file, no DATABASE_URL needed.
+
+    python -m pytest tests/test_study_session_indexes.py
+"""
+from sqlalchemy import create_engine, inspect, text
+
+import database as db
+
+EXPECTED = {index.name for index in db.StudySession.__table__.indexes}
+
+
+def _index_sql(engine):
+    with engine.connect() as conn:
+        return dict(conn.execute(text(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'study_sessions' "
+            "AND sql IS NOT NULL"
+        )).all())
+
+
+def test_adds_missing_and_drops_obsolete_indexes(tmp_path, monkeypatch, capsys):
+    engine = create_engine(f"sqlite:///{tmp_path / 'indexes.db'}")
+    monkeypatch.setattr(db, "engine", engine)
+    db.Base.metadata.create_all(engine)
+    with engine.begin() as conn:   # an older table: two current indexes missing, one obsolete
+        conn.execute(text("DROP INDEX ix_study_sessions_live_counts"))
+        conn.execute(text("DROP INDEX ix_study_sessions_waiting_queue"))
+        conn.execute(text("CREATE INDEX ix_study_sessions_live_by_role ON study_sessions (study_mode, role)"))
+
+    assert db.ensure_study_session_indexes() is True
+    output = capsys.readouterr().out
+    assert "Added missing study_sessions index: ix_study_sessions_live_counts" in output
+    assert "Added missing study_sessions index: ix_study_sessions_waiting_queue" in output
+    assert "Dropped obsolete study_sessions index: ix_study_sessions_live_by_role" in output
+
+    names = {index["name"] for index in inspect(engine).get_indexes("study_sessions")}
+    assert EXPECTED <= names
+    assert not names & set(db.OBSOLETE_STUDY_SESSION_INDEXES)
+    # The partial indexes keep their WHERE clause when added after the fact.
+    assert "WHERE" in _index_sql(engine)["ix_study_sessions_live_counts"]
+
+
+def test_is_idempotent(tmp_path, monkeypatch, capsys):
+    engine = create_engine(f"sqlite:///{tmp_path / 'indexes.db'}")
+    monkeypatch.setattr(db, "engine", engine)
+    db.Base.metadata.create_all(engine)
+    before = _index_sql(engine)
+
+    assert db.ensure_study_session_indexes() is True
+    assert db.ensure_study_session_indexes() is True
+    assert capsys.readouterr().out == ""
+    assert _index_sql(engine) == before
+    assert EXPECTED <= set(before)
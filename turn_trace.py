@@ -0,0 +1,129 @@
+"""
+Per-turn latency trace for AI turns, stored in the turn's timing block as timing["trace"].
+
+timing already had api_call_time_seconds (everything before the pacing sleep) and
+sleep_duration_seconds. The trace breaks the backend part down:
+
+  tactic_selection_seconds / response_generation_seconds   the two LLM stages
+  gemini_calls            every Gemini attempt: call, model, primary/fallback, outcome,
+                          thread-pool queue wait and model latency, offset into the turn
+  answered_by             model (and role) whose response the participant saw
+  thread_pool_queue_wait_seconds   summed wait for a to_thread worker
+  time_to_first_token_seconds      turn start -> the answering response was available
+                                   (generate_content is not streamed, so first token =
+                                   whole response)
+  pacing_sleep_seconds
+  journal_enqueue_seconds  saving the turn: building and encoding the session snapshot
+                          for the write-ahead journal (the database write itself happens
+                          later, in the journal's applier)
+  exceeded_target_delay / backend_overrun_seconds   backend time vs the paper model's
+                          target visible response time (when True, no pacing sleep could
+                          hide the latency from the participant)
+
+start() binds a new trace to the current request; call_gemini_timed records into whatever
+trace is current, so the tactic / generation helpers need no extra parameters.
+export_rows() flattens stored traces for /admin/turn_latency_export.
+"""
+import contextvars
+import time
+
+_current = contextvars.ContextVar("turn_trace", default=None)
+
+
+def current():
+    return _current.get()
+
+
+class TurnTrace:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.calls = []
+        self.answered_by = None
+        self.first_token_at = None
+        self.target_seconds = None
+        self.backend_seconds = None
+
+    def add_span(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def record_call(self, call, model, model_role, outcome, submitted, worker_started, finished):
+        """One Gemini attempt (perf_counter timestamps). worker_started is None if it never
+        reached a worker thread."""
+        started = worker_started if worker_started is not None else finished
+        self.calls.append({
+            "call": call,
+            "model": model,
+            "model_role": model_role,
+            "outcome": outcome,
+            "offset_seconds": round(submitted - self.started, 4),
+            "queue_wait_seconds": round(started - submitted, 4),
+            "seconds": round(finished - started, 4),
+        })
+        if call == "response" and outcome == "ok":
+            self.answered_by = {"model": model, "model_role": model_role}
+            self.first_token_at = finished
+
+    def set_backend(self, backend_seconds, target_seconds):
+        self.backend_seconds = backend_seconds
+        self.target_seconds = target_seconds
+
+    def to_dict(self):
+        result = {name: round(seconds, 4) for name, seconds in self.spans.items()}
+        result["answered_by"] = self.answered_by
+        result["time_to_first_token_seconds"] = (
+            round(self.first_token_at - self.started, 4) if self.first_token_at is not None else None
+        )
+        result["thread_pool_queue_wait_seconds"] = round(sum(c["queue_wait_seconds"] for c in self.calls), 4)
+        result["gemini_calls"] = self.calls
+        if self.backend_seconds is not None and self.target_seconds is not None:
+            overrun = self.backend_seconds - self.target_seconds
+            result["exceeded_target_delay"] = overrun > 0
+            result["backend_overrun_seconds"] = round(max(0.0, overrun), 4)
+        return result
+
+
+def start():
+    """New trace, current for the rest of this request (each request runs in its own
+    context, so it never leaks into another one)."""
+    trace = TurnTrace()
+    _current.set(trace)
+    return trace
+
+
+EXPORT_COLUMNS = (
+    "session_id", "turn", "ai_detected_final", "turn_judgment", "api_call_time_seconds",
+    "target_visible_response_time_seconds", "sleep_duration_seconds", "exceeded_target_delay",
+    "backend_overrun_seconds", "tactic_selection_seconds", "response_generation_seconds",
+    "time_to_first_token_seconds", "thread_pool_queue_wait_seconds", "pacing_sleep_seconds",
+    "journal_enqueue_seconds", "answered_model", "answered_model_role", "gemini_attempts",
+    "gemini_failed_attempts", "network_delay_seconds",
+)
+
+
+def export_rows(session_id, conversation_log, judgment_log, ai_detected_final):
+    """One row per AI turn (EXPORT_COLUMNS order). Turns from before tracing existed get the
+    timing-block fields only (the overrun is derived from those); turn_judgment is the
+    interrogator's choice after that turn."""
+    judgments = {entry.get("turn"): entry.get("binary_choice") for entry in judgment_log or [] if isinstance(entry, dict)}
+    for entry in conversation_log or []:
+        timing = entry.get("timing") or {}
+        if entry.get("sender_role") or "api_call_time_seconds" not in timing:
+            continue   # human-partner turns have no backend latency
+        trace = timing.get("trace") or {}
+        answered_by = trace.get("answered_by") or {}
+        calls = trace.get("gemini_calls") or []
+        backend = timing.get("api_call_time_seconds")
+        target = timing.get("target_visible_response_time_seconds")
+        overrun = backend - target if backend is not None and target is not None else None
+        yield (
+            session_id, entry.get("turn"), ai_detected_final, judgments.get(entry.get("turn")),
+            backend, target, timing.get("sleep_duration_seconds"),
+            overrun > 0 if overrun is not None else None,
+            round(max(0.0, overrun), 4) if overrun is not None else None, trace.get("tactic_selection_seconds"),
+            trace.get("response_generation_seconds"), trace.get("time_to_first_token_seconds"),
+            trace.get("thread_pool_queue_wait_seconds"), trace.get("pacing_sleep_seconds"),
+            trace.get("journal_enqueue_seconds"), answered_by.get("model"), answered_by.get("model_role"),
+            len(calls) if calls else None, sum(1 for c in calls if c.get("outcome") != "ok") if calls else None,
+            timing.get("network_delay_seconds"),
+        )